@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chatgpt.settings')
+# Route play, streaming and search to their async views (music/urls.py)
+os.environ.setdefault('DJANGO_MUSIC_ASYNC_VIEWS', 'true')
+os.environ.setdefault('DJANGO_DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
\ No newline at end of file
@@ -30,7 +30,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    # Static assets should be served by a real web server in production (e.g., Nginx)
+    # Static assets should be served by a real web server in production (e.g., Nginx);
+    # without one, set DJANGO_MUSIC_SERVE_STATIC=true (music.static_assets)
+    'music.static_assets.StaticAssetsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,6 +66,34 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Writing transactions take the lock at BEGIN; see music/sqlite.py
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        # Persistent connections; chatgpt/asgi.py sets 0, as Django recommends under ASGI
+        'CONN_MAX_AGE': int(os.getenv('DJANGO_DB_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# PRAGMAs applied to every new SQLite connection (music.sqlite)
+MUSIC_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.getenv('DJANGO_SQLITE_BUSY_TIMEOUT', '20000')),
+    'mmap_size': int(os.getenv('DJANGO_SQLITE_MMAP_SIZE', str(256 * 1024 ** 2))),
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+
+# Cache
+# Local memory by default (one cache per process); point DJANGO_CACHE_LOCATION at a
+# directory to share the fragment cache between worker processes via the file backend.
+# Required for catalog API 304s without a query (music.catalog_api) under several workers
+_cache_location = os.getenv('DJANGO_CACHE_LOCATION', '')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache' if _cache_location
+                   else 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': _cache_location or 'musicstream',
     }
 }
 
@@ -98,6 +128,82 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads are stored once per content hash and reference-counted (music.storage)
+STORAGES = {
+    'default': {'BACKEND': 'music.storage.ContentAddressedStorage'},
+    # collectstatic bundles, minifies, hashes and precompresses (music.static_assets)
+    'staticfiles': {'BACKEND': 'music.static_assets.BundledStaticFilesStorage'},
+}
+
+# CSS/JS bundles built by collectstatic: name -> source files, in load order.
+# Templates include them with {% static_bundle %}; unbundled while developing
+MUSIC_STATIC_BUNDLES = {
+    # Every page
+    'base.css': ['css/base.css', 'css/media-player.css'],
+    'base.js': ['js/media_player.js', 'js/base.js'],
+    # Per page
+    'discover.css': ['css/music_discover.css'],
+    'discover.js': ['js/discover-music.js'],
+    'music_list.js': ['js/music_list.js'],
+    'podcast_list.js': ['js/music_list.js', 'js/podcast_filters.js'],
+    'upload_episode.js': ['js/upload_episode.js'],
+}
+MUSIC_STATIC_BUNDLED = os.getenv('DJANGO_MUSIC_STATIC_BUNDLED', str(not DEBUG)).lower() in ['1', 'true', 'yes']
+# Serve STATIC_ROOT from Django (precompressed, immutable caching) when no front-end server does
+MUSIC_SERVE_STATIC = os.getenv('DJANGO_MUSIC_SERVE_STATIC', 'false').lower() in ['1', 'true', 'yes']
+
+# Resumable chunked uploads (music.uploads): part files live outside MEDIA_ROOT
+MUSIC_UPLOAD_DIR = os.getenv('DJANGO_MUSIC_UPLOAD_DIR', os.path.join(BASE_DIR, 'upload_sessions'))
+MUSIC_UPLOAD_MAX_SIZE = int(os.getenv('DJANGO_MUSIC_UPLOAD_MAX_SIZE', str(2 * 1024 ** 3)))
+MUSIC_UPLOAD_MAX_CHUNK_SIZE = int(os.getenv('DJANGO_MUSIC_UPLOAD_MAX_CHUNK_SIZE', str(32 * 1024 ** 2)))
+
+# Audio streaming (music.streaming)
+# Optional handoff to the front-end server: '' (Django serves the bytes),
+# 'x-accel-redirect' (Nginx, internal location at the prefix below) or 'x-sendfile'
+MUSIC_STREAM_HANDOFF = os.getenv('DJANGO_MUSIC_STREAM_HANDOFF', '').lower()
+MUSIC_STREAM_ACCEL_PREFIX = os.getenv('DJANGO_MUSIC_STREAM_ACCEL_PREFIX', '/protected-media/')
+MUSIC_STREAM_CHUNK_SIZE = int(os.getenv('DJANGO_MUSIC_STREAM_CHUNK_SIZE', str(64 * 1024)))
+
+# Async play/stream/search views under ASGI (set by chatgpt/asgi.py); file
+# reads for async streams share this many threads
+MUSIC_ASYNC_VIEWS = os.getenv('DJANGO_MUSIC_ASYNC_VIEWS', 'false').lower() in ['1', 'true', 'yes']
+MUSIC_STREAM_IO_THREADS = int(os.getenv('DJANGO_MUSIC_STREAM_IO_THREADS', '32'))
+
+# Widths (px) of the resized cover/profile image derivatives (music.images)
+MUSIC_IMAGE_WIDTHS = (160, 320, 640)
+
+# Waveform peak sample width: 8 (int8, default) or 16 (int16) bits (music.waveforms)
+MUSIC_WAVEFORM_BITS = int(os.getenv('DJANGO_MUSIC_WAVEFORM_BITS', '8'))
+
+# Play counts are buffered in memory and flushed in batches (music.play_counter)
+MUSIC_PLAY_COUNT_FLUSH_SIZE = int(os.getenv('DJANGO_MUSIC_PLAY_COUNT_FLUSH_SIZE', '500'))
+MUSIC_PLAY_COUNT_FLUSH_INTERVAL = float(os.getenv('DJANGO_MUSIC_PLAY_COUNT_FLUSH_INTERVAL', '5'))
+
+# Player telemetry is buffered in memory and written by a background thread (music.telemetry)
+MUSIC_TELEMETRY_BUFFER_SIZE = int(os.getenv('DJANGO_MUSIC_TELEMETRY_BUFFER_SIZE', '10000'))
+MUSIC_TELEMETRY_FLUSH_SIZE = 500
+MUSIC_TELEMETRY_FLUSH_INTERVAL = float(os.getenv('DJANGO_MUSIC_TELEMETRY_FLUSH_INTERVAL', '2'))
+MUSIC_TELEMETRY_MAX_BATCH = 100
+MUSIC_TELEMETRY_RETENTION_DAYS = 30
+
+# Resume positions: latest per user and item, upserted every N seconds (music.listening)
+MUSIC_RESUME_FLUSH_INTERVAL = float(os.getenv('DJANGO_MUSIC_RESUME_FLUSH_INTERVAL', '15'))
+MUSIC_RESUME_BUFFER_KEYS = 50000
+
+# Trending charts (music.charts), rebuilt by `manage.py update_charts` from cron
+MUSIC_TRENDING_HALF_LIFE_HOURS = float(os.getenv('DJANGO_MUSIC_TRENDING_HALF_LIFE_HOURS', '24'))
+MUSIC_CHART_SIZE = 50
+MUSIC_PLAY_EVENT_RETENTION_DAYS = 30
+MUSIC_HOURLY_ROLLUP_RETENTION_DAYS = 14
+
+# Up-next recommendations (music.recommendations), rebuilt by `manage.py build_recommendations`
+MUSIC_RECOMMENDATION_NEIGHBORS = 20
+
+# Upload notifications are fanned out to followers in chunks, off the request
+# path, keeping at most MUSIC_NOTIFICATION_BACKLOG unread per user (music.notifications)
+MUSIC_NOTIFICATION_CHUNK_SIZE = int(os.getenv('DJANGO_MUSIC_NOTIFICATION_CHUNK_SIZE', '1000'))
+MUSIC_NOTIFICATION_BACKLOG = int(os.getenv('DJANGO_MUSIC_NOTIFICATION_BACKLOG', '200'))
+
 # Login Redirect
 LOGIN_REDIRECT_URL = 'music:home'
 LOGOUT_REDIRECT_URL = 'music:home'
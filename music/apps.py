@@ -3,4 +3,12 @@ from django.apps import AppConfig
 class MusicConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'music'
-    verbose_name = 'Music'
\ No newline at end of file
+    verbose_name = 'Music'
+
+    def ready(self):
+        # Import signals here to ensure they're connected when the app is ready
+        import music.signals  # noqa: F401
+
+        from django.db.backends.signals import connection_created
+        from music import sqlite
+        connection_created.connect(sqlite.configure, dispatch_uid='music_sqlite_configure')
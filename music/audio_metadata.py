@@ -0,0 +1,515 @@
+# music/audio_metadata.py
+
+"""
+Header-only metadata extraction for the formats validate_audio_file accepts
+(mp3, wav, ogg, m4a, flac).
+
+Only container headers, the first MPEG frame (plus its Xing/VBRI header) and,
+for Ogg, the last page are read; audio payloads are skipped with seek(). The
+module only uses the standard library and does not import Django, so the
+backfill command can run it in worker processes.
+
+extract_metadata() returns a dict:
+    {'duration': seconds (float) or None, 'bitrate': kbps or None,
+     'sample_rate': Hz or None, 'channels': int or None,
+     'tags': {'title': ..., 'artist': ..., 'album': ..., 'genre': ...}}
+"""
+
+import os
+import struct
+
+TAG_KEYS = ('title', 'artist', 'album', 'genre')
+
+# How much of the file we are willing to scan looking for the first MPEG frame
+MP3_SYNC_SEARCH = 64 * 1024
+OGG_TAIL = 64 * 1024
+
+
+class AudioMetadataError(Exception):
+    pass
+
+
+def empty_metadata():
+    return {'duration': None, 'bitrate': None, 'sample_rate': None, 'channels': None, 'tags': {}}
+
+
+def _file_size(fileobj):
+    position = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(position)
+    return size
+
+
+def _read_exact(fileobj, n):
+    data = fileobj.read(n)
+    if len(data) < n:
+        raise AudioMetadataError('Unexpected end of file')
+    return data
+
+
+def _average_bitrate(audio_bytes, duration):
+    if not duration:
+        return None
+    return int(round(audio_bytes * 8 / duration / 1000))
+
+
+# ---------------------------------------------------------------------------
+# MP3 (MPEG audio + ID3v2)
+# ---------------------------------------------------------------------------
+
+# kbps, indexed [version_key][layer][bitrate_index]; version_key 1 = MPEG1, 2 = MPEG2/2.5
+MP3_BITRATES = {
+    1: {
+        1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+        2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+        3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    },
+    2: {
+        1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+        2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+        3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    },
+}
+
+# Hz, indexed by the 2-bit version field: 0 = MPEG2.5, 2 = MPEG2, 3 = MPEG1
+MP3_SAMPLE_RATES = {
+    0: [11025, 12000, 8000],
+    2: [22050, 24000, 16000],
+    3: [44100, 48000, 32000],
+}
+
+ID3_FRAMES = {
+    'TIT2': 'title', 'TPE1': 'artist', 'TALB': 'album', 'TCON': 'genre',
+    'TT2': 'title', 'TP1': 'artist', 'TAL': 'album', 'TCO': 'genre',
+}
+
+
+def _syncsafe(data):
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _decode_id3_text(data):
+    if not data:
+        return ''
+    encoding, payload = data[0], data[1:]
+    codec = {0: 'latin-1', 1: 'utf-16', 2: 'utf-16-be', 3: 'utf-8'}.get(encoding, 'latin-1')
+    text = payload.decode(codec, errors='replace')
+    return text.split('\x00')[0].strip()
+
+
+def _read_id3v2(fileobj):
+    """Parse an ID3v2 tag at the start of the file. Returns (tags, audio_start)."""
+    fileobj.seek(0)
+    header = fileobj.read(10)
+    if len(header) < 10 or header[:3] != b'ID3':
+        return {}, 0
+
+    major, flags = header[3], header[5]
+    tag_size = _syncsafe(header[6:10])
+    audio_start = 10 + tag_size + (10 if flags & 0x10 else 0)
+    tags = {}
+
+    if flags & 0x40 and major >= 3:
+        # Skip the extended header
+        ext = _read_exact(fileobj, 4)
+        ext_size = _syncsafe(ext) if major == 4 else struct.unpack('>I', ext)[0] + 4
+        fileobj.seek(ext_size - 4, os.SEEK_CUR)
+
+    id_len, header_len = (3, 6) if major == 2 else (4, 10)
+    end = 10 + tag_size
+    while fileobj.tell() + header_len <= end:
+        frame_header = fileobj.read(header_len)
+        frame_id = frame_header[:id_len]
+        if not frame_id.strip(b'\x00'):
+            break  # padding
+        if major == 2:
+            size = int.from_bytes(frame_header[3:6], 'big')
+        elif major == 4:
+            size = _syncsafe(frame_header[4:8])
+        else:
+            size = struct.unpack('>I', frame_header[4:8])[0]
+        key = ID3_FRAMES.get(frame_id.decode('latin-1', errors='replace'))
+        if key and size <= 4096:
+            tags[key] = _decode_id3_text(fileobj.read(size))
+        else:
+            # Pictures, lyrics, etc. are skipped without reading them
+            fileobj.seek(size, os.SEEK_CUR)
+
+    return {k: v for k, v in tags.items() if v}, audio_start
+
+
+def _parse_mpeg_header(b):
+    if b[0] != 0xFF or (b[1] & 0xE0) != 0xE0:
+        return None
+    version = (b[1] >> 3) & 0x03
+    layer = 4 - ((b[1] >> 1) & 0x03)
+    bitrate_index = (b[2] >> 4) & 0x0F
+    rate_index = (b[2] >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    version_key = 1 if version == 3 else 2
+    if layer == 1:
+        samples_per_frame = 384
+    elif layer == 3 and version_key == 2:
+        samples_per_frame = 576
+    else:
+        samples_per_frame = 1152
+    return {
+        'version': version,
+        'layer': layer,
+        'bitrate': MP3_BITRATES[version_key][layer][bitrate_index],
+        'sample_rate': MP3_SAMPLE_RATES[version][rate_index],
+        'channels': 1 if (b[3] >> 6) == 3 else 2,
+        'samples_per_frame': samples_per_frame,
+    }
+
+
+def _extract_mp3(fileobj, size):
+    meta = empty_metadata()
+    meta['tags'], audio_start = _read_id3v2(fileobj)
+
+    fileobj.seek(audio_start)
+    window = fileobj.read(MP3_SYNC_SEARCH)
+    frame = None
+    for i in range(len(window) - 4):
+        if window[i] == 0xFF:
+            frame = _parse_mpeg_header(window[i:i + 4])
+            if frame:
+                audio_start += i
+                window = window[i:]
+                break
+    if frame is None:
+        raise AudioMetadataError('No MPEG frame found')
+
+    meta['sample_rate'] = frame['sample_rate']
+    meta['channels'] = frame['channels']
+
+    # A Xing/Info (LAME) or VBRI header in the first frame carries the frame count
+    side_info = (32 if frame['channels'] == 2 else 17) if frame['version'] == 3 else (17 if frame['channels'] == 2 else 9)
+    frames = None
+    xing = window[4 + side_info:4 + side_info + 12]
+    if xing[:4] in (b'Xing', b'Info') and len(xing) == 12:
+        if struct.unpack('>I', xing[4:8])[0] & 0x01:
+            frames = struct.unpack('>I', xing[8:12])[0]
+    elif window[36:40] == b'VBRI' and len(window) >= 54:
+        frames = struct.unpack('>I', window[50:54])[0]
+
+    audio_bytes = size - audio_start
+    if frames:
+        meta['duration'] = frames * frame['samples_per_frame'] / frame['sample_rate']
+        meta['bitrate'] = _average_bitrate(audio_bytes, meta['duration'])
+    else:
+        # Constant bitrate: the first frame's bitrate holds for the whole stream
+        meta['bitrate'] = frame['bitrate']
+        meta['duration'] = audio_bytes * 8 / (frame['bitrate'] * 1000)
+    return meta
+
+
+# ---------------------------------------------------------------------------
+# WAV (RIFF)
+# ---------------------------------------------------------------------------
+
+def _extract_wav(fileobj, size):
+    meta = empty_metadata()
+    fileobj.seek(0)
+    header = _read_exact(fileobj, 12)
+    if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        raise AudioMetadataError('Not a RIFF/WAVE file')
+
+    byte_rate = None
+    while True:
+        chunk = fileobj.read(8)
+        if len(chunk) < 8:
+            break
+        chunk_id, chunk_size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+        if chunk_id == b'fmt ':
+            fmt = _read_exact(fileobj, 16)
+            _, channels, sample_rate, byte_rate = struct.unpack('<HHII', fmt[:12])
+            meta['channels'] = channels
+            meta['sample_rate'] = sample_rate
+            meta['bitrate'] = int(round(byte_rate * 8 / 1000))
+            fileobj.seek(chunk_size - 16 + (chunk_size & 1), os.SEEK_CUR)
+        elif chunk_id == b'data':
+            # Some writers leave 0/0xFFFFFFFF when streaming; fall back to the file size
+            data_size = chunk_size if 0 < chunk_size < 0xFFFFFFFF else size - fileobj.tell()
+            if byte_rate:
+                meta['duration'] = data_size / byte_rate
+            break
+        else:
+            fileobj.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+    return meta
+
+
+# ---------------------------------------------------------------------------
+# Vorbis comments (shared by FLAC and Ogg)
+# ---------------------------------------------------------------------------
+
+def _parse_vorbis_comment(data):
+    tags = {}
+    try:
+        vendor_len = struct.unpack('<I', data[:4])[0]
+        offset = 4 + vendor_len
+        count = struct.unpack('<I', data[offset:offset + 4])[0]
+        offset += 4
+        for _ in range(count):
+            length = struct.unpack('<I', data[offset:offset + 4])[0]
+            offset += 4
+            entry = data[offset:offset + length].decode('utf-8', errors='replace')
+            offset += length
+            key, _, value = entry.partition('=')
+            key = key.lower()
+            if key in TAG_KEYS and value and key not in tags:
+                tags[key] = value.strip()
+    except struct.error:
+        pass  # truncated comment block; keep what we have
+    return tags
+
+
+# ---------------------------------------------------------------------------
+# FLAC
+# ---------------------------------------------------------------------------
+
+def _extract_flac(fileobj, size):
+    meta = empty_metadata()
+    fileobj.seek(0)
+    start = 0
+    if fileobj.read(3) == b'ID3':
+        # ID3v2 in front of FLAC is non-standard but common
+        _, start = _read_id3v2(fileobj)
+    fileobj.seek(start)
+    if _read_exact(fileobj, 4) != b'fLaC':
+        raise AudioMetadataError('Not a FLAC file')
+
+    last = False
+    while not last:
+        block_header = _read_exact(fileobj, 4)
+        last = bool(block_header[0] & 0x80)
+        block_type = block_header[0] & 0x7F
+        length = int.from_bytes(block_header[1:4], 'big')
+        if block_type == 0:
+            info = _read_exact(fileobj, length)
+            packed = int.from_bytes(info[10:18], 'big')
+            sample_rate = packed >> 44
+            channels = ((packed >> 41) & 0x07) + 1
+            total_samples = packed & 0xFFFFFFFFF
+            meta['sample_rate'] = sample_rate
+            meta['channels'] = channels
+            if sample_rate and total_samples:
+                meta['duration'] = total_samples / sample_rate
+        elif block_type == 4:
+            meta['tags'] = _parse_vorbis_comment(_read_exact(fileobj, length))
+        else:
+            fileobj.seek(length, os.SEEK_CUR)
+
+    meta['bitrate'] = _average_bitrate(size - fileobj.tell(), meta['duration'])
+    return meta
+
+
+# ---------------------------------------------------------------------------
+# Ogg (Vorbis / Opus)
+# ---------------------------------------------------------------------------
+
+def _ogg_packets(fileobj, limit=2):
+    """Reassemble the first ``limit`` packets from the start of an Ogg stream."""
+    fileobj.seek(0)
+    packets, current = [], b''
+    while len(packets) < limit:
+        header = fileobj.read(27)
+        if len(header) < 27 or header[:4] != b'OggS':
+            break
+        segments = fileobj.read(header[26])
+        for lacing in segments:
+            current += fileobj.read(lacing)
+            if lacing < 255:
+                packets.append(current)
+                current = b''
+                if len(packets) >= limit:
+                    break
+    return packets
+
+
+def _ogg_last_granule(fileobj, size):
+    fileobj.seek(max(size - OGG_TAIL, 0))
+    tail = fileobj.read(OGG_TAIL)
+    index = tail.rfind(b'OggS')
+    while index != -1:
+        if len(tail) >= index + 14:
+            granule = struct.unpack('<q', tail[index + 6:index + 14])[0]
+            if granule > 0:
+                return granule
+        index = tail.rfind(b'OggS', 0, index)
+    return None
+
+
+def _extract_ogg(fileobj, size):
+    meta = empty_metadata()
+    packets = _ogg_packets(fileobj)
+    if not packets:
+        raise AudioMetadataError('Not an Ogg file')
+
+    ident = packets[0]
+    pre_skip = 0
+    if ident[:7] == b'\x01vorbis' and len(ident) >= 30:
+        channels, sample_rate, _, nominal = struct.unpack('<BIiI', ident[11:24])
+        meta['channels'] = channels
+        meta['sample_rate'] = sample_rate
+        if nominal:
+            meta['bitrate'] = int(round(nominal / 1000))
+        granule_rate = sample_rate
+        if len(packets) > 1 and packets[1][:7] == b'\x03vorbis':
+            meta['tags'] = _parse_vorbis_comment(packets[1][7:])
+    elif ident[:8] == b'OpusHead' and len(ident) >= 19:
+        meta['channels'] = ident[9]
+        pre_skip = struct.unpack('<H', ident[10:12])[0]
+        meta['sample_rate'] = struct.unpack('<I', ident[12:16])[0] or 48000
+        # Opus granule positions always count 48 kHz samples
+        granule_rate = 48000
+        if len(packets) > 1 and packets[1][:8] == b'OpusTags':
+            meta['tags'] = _parse_vorbis_comment(packets[1][8:])
+    else:
+        raise AudioMetadataError('Unsupported Ogg codec')
+
+    granule = _ogg_last_granule(fileobj, size)
+    if granule and granule_rate:
+        meta['duration'] = max(granule - pre_skip, 0) / granule_rate
+    if meta['bitrate'] is None:
+        meta['bitrate'] = _average_bitrate(size, meta['duration'])
+    return meta
+
+
+# ---------------------------------------------------------------------------
+# M4A (MP4 / ISO base media)
+# ---------------------------------------------------------------------------
+
+MP4_CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl', b'udta', b'ilst'}
+MP4_TAGS = {b'\xa9nam': 'title', b'\xa9ART': 'artist', b'\xa9alb': 'album', b'\xa9gen': 'genre'}
+
+
+def _mp4_atoms(fileobj, start, end):
+    """Yield (type, payload_start, atom_end) for the atoms between start and end."""
+    position = start
+    while position + 8 <= end:
+        fileobj.seek(position)
+        header = fileobj.read(8)
+        if len(header) < 8:
+            return
+        atom_size, atom_type = struct.unpack('>I4s', header)
+        payload = position + 8
+        if atom_size == 1:
+            atom_size = struct.unpack('>Q', _read_exact(fileobj, 8))[0]
+            payload += 8
+        elif atom_size == 0:
+            atom_size = end - position
+        if atom_size < 8:
+            return
+        yield atom_type, payload, position + atom_size
+        position += atom_size
+
+
+def _walk_mp4(fileobj, start, end, meta):
+    for atom_type, payload, atom_end in _mp4_atoms(fileobj, start, end):
+        if atom_type in MP4_CONTAINERS:
+            _walk_mp4(fileobj, payload, atom_end, meta)
+        elif atom_type == b'meta':
+            # Full box: 4 bytes of version/flags before the children
+            _walk_mp4(fileobj, payload + 4, atom_end, meta)
+        elif atom_type == b'mvhd':
+            fileobj.seek(payload)
+            version = _read_exact(fileobj, 4)[0]
+            if version == 1:
+                timescale, duration = struct.unpack('>16xIQ', _read_exact(fileobj, 28))
+            else:
+                timescale, duration = struct.unpack('>8xII', _read_exact(fileobj, 16))
+            if timescale:
+                meta['duration'] = duration / timescale
+        elif atom_type == b'stsd' and meta['sample_rate'] is None:
+            fileobj.seek(payload + 8)  # version/flags + entry count
+            entry = fileobj.read(36)
+            if len(entry) == 36 and entry[4:8] in (b'mp4a', b'alac'):
+                channels, _, _, _, rate = struct.unpack('>HHHHI', entry[24:36])
+                meta['channels'] = channels
+                meta['sample_rate'] = rate >> 16
+        elif atom_type in MP4_TAGS:
+            for data_type, data_payload, data_end in _mp4_atoms(fileobj, payload, atom_end):
+                if data_type == b'data' and data_end - data_payload <= 4096:
+                    fileobj.seek(data_payload + 8)  # type indicator + locale
+                    value = fileobj.read(data_end - data_payload - 8).decode('utf-8', errors='replace').strip()
+                    if value:
+                        meta['tags'][MP4_TAGS[atom_type]] = value
+                    break
+
+
+def _extract_m4a(fileobj, size):
+    meta = empty_metadata()
+    fileobj.seek(4)
+    if fileobj.read(4) != b'ftyp':
+        raise AudioMetadataError('Not an MP4 file')
+    # mdat is never descended into, so its payload is never read
+    _walk_mp4(fileobj, 0, size, meta)
+    meta['bitrate'] = _average_bitrate(size, meta['duration'])
+    return meta
+
+
+EXTRACTORS = {
+    '.mp3': _extract_mp3,
+    '.wav': _extract_wav,
+    '.flac': _extract_flac,
+    '.ogg': _extract_ogg,
+    '.m4a': _extract_m4a,
+}
+
+
+def extract_metadata(fileobj, name):
+    """
+    Read metadata from an open binary file; ``name`` picks the parser by extension.
+    Raises AudioMetadataError for unsupported or unparseable files.
+    """
+    ext = os.path.splitext(name)[1].lower()
+    extractor = EXTRACTORS.get(ext)
+    if extractor is None:
+        raise AudioMetadataError(f'Unsupported audio format: {ext}')
+    try:
+        return extractor(fileobj, _file_size(fileobj))
+    except (struct.error, IndexError, ValueError) as exc:
+        raise AudioMetadataError(str(exc)) from exc
+
+
+def extract_metadata_from_path(path):
+    with open(path, 'rb') as fileobj:
+        return extract_metadata(fileobj, path)
+
+
+def apply_metadata(instance, meta, fill_tags=()):
+    """
+    Copy extracted values onto a Song/Episode. ``fill_tags`` names model fields
+    that should be filled from the file's tags when the uploader left them blank.
+    """
+    instance.duration = meta['duration']
+    instance.bitrate = meta['bitrate']
+    instance.sample_rate = meta['sample_rate']
+    for key in fill_tags:
+        if not getattr(instance, key) and meta['tags'].get(key):
+            # Tags are free text; cut them to the column (genre is shorter than the rest)
+            max_length = instance._meta.get_field(key).max_length
+            setattr(instance, key, meta['tags'][key][:max_length])
+
+
+def read_audio_metadata(instance, fill_tags=()):
+    """
+    Extract metadata from ``instance.audio_file`` (a fresh upload or a stored
+    file) and apply it. Returns False if the file could not be parsed; uploads
+    are never rejected because of that.
+    """
+    field_file = instance.audio_file
+    try:
+        fileobj = field_file.file
+        fileobj.seek(0)
+        try:
+            meta = extract_metadata(fileobj, field_file.name)
+        finally:
+            fileobj.seek(0)
+    except (AudioMetadataError, OSError):
+        return False
+    apply_metadata(instance, meta, fill_tags)
+    return True
@@ -0,0 +1,231 @@
+# music/catalog_api.py
+
+"""
+Read-only JSON catalog of songs, podcasts, episodes and creators.
+
+Lists are newest-first keyset pages (see music/pagination.py): ``?cursor=``
+comes from the previous page's ``next`` URL and ``?page_size=`` is capped at
+MAX_PAGE_SIZE. ``?fields=title,artist`` picks the fields to return, and only
+the columns, joins and annotations those fields need are queried. Rows are
+fetched with ``values()`` and serialized as they are, so no model instances
+are built.
+
+Conditional GET: when every requested field only changes through a model
+save or delete, the validators come from the fragment cache counters (see
+music/fragment_cache.py). The ETag is derived from the dependency versions and
+the request URL, Last-Modified is the time of the last bump, and a matching
+request gets a 304 without touching the database. Bulk writes that send no
+signals either bump the counters themselves (backfill_audio_metadata and
+dedupe_media do) or only touch "volatile" fields (play counts, follower
+counts, usernames). Requesting any volatile field switches to an ETag hashed
+from the response body.
+
+The counters only cover writes made in other processes when the cache is
+shared between them (DJANGO_CACHE_LOCATION). With the default per-process
+local-memory cache every response is revalidated by body hash instead.
+"""
+
+import hashlib
+import json
+from functools import lru_cache
+
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+
+from . import fragment_cache
+from .models import Episode, Podcast, Song
+
+
+class Field:
+    """
+    One output field: the ``values()`` lookup it reads, an optional transform
+    applied to the value, and an optional annotation that provides the lookup.
+    """
+
+    def __init__(self, source, transform=None, annotation=None):
+        self.source = source
+        self.transform = transform
+        self.annotation = annotation
+
+
+def media_url(name):
+    return default_storage.url(name) if name else None
+
+
+def route(viewname):
+    """Transform a pk into the URL of ``viewname``, reversing the pattern once."""
+
+    @lru_cache(maxsize=1)
+    def template():
+        # Reverse lazily: the URLconf is not loaded when this module is imported
+        return reverse(viewname, args=[0]).replace('/0/', '/%d/')
+
+    return lambda pk: template() % pk
+
+
+def episode_count():
+    counts = (
+        Episode.objects.filter(podcast=OuterRef('pk')).order_by()
+        .values('podcast').annotate(n=Count('pk')).values('n')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+class Resource:
+    def __init__(self, queryset, time_field, fields, default_fields, dependencies=(), volatile=(), filters=None):
+        self.queryset = queryset
+        self.time_field = time_field
+        self.fields = fields
+        self.default_fields = default_fields
+        # fragment_cache dependencies covering every non-volatile field
+        self.dependencies = dependencies
+        self.volatile = frozenset(volatile)
+        # query parameter -> (lookup, parser)
+        self.filters = filters or {}
+
+    def parse_fields(self, value):
+        """The requested field names, in order. Raises ValueError for unknown names."""
+        if not value:
+            return list(self.default_fields)
+        names = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}' if unknown else 'No fields requested')
+        return names
+
+    def filter(self, queryset, params):
+        """Apply the filters present in ``params``. Raises ValueError for malformed values."""
+        for param, (lookup, parse) in self.filters.items():
+            value = params.get(param)
+            if value:
+                queryset = queryset.filter(**{lookup: parse(value)})
+        return queryset
+
+    def rows(self, fields, queryset=None):
+        """A ``values()`` queryset with the columns ``fields`` need plus the cursor keys."""
+        queryset = self.queryset() if queryset is None else queryset
+        annotations = {
+            self.fields[name].source: self.fields[name].annotation()
+            for name in fields if self.fields[name].annotation
+        }
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        sources = {'id'}
+        if self.time_field:
+            sources.add(self.time_field)
+        sources.update(self.fields[name].source for name in fields)
+        return queryset.values(*sources)
+
+    def serialize(self, row, fields):
+        data = {}
+        for name in fields:
+            field = self.fields[name]
+            value = row[field.source]
+            data[name] = field.transform(value) if field.transform else value
+        return data
+
+    def cacheable(self, fields):
+        """Whether validators can be computed before querying (see module docstring)."""
+        return bool(self.dependencies) and self.volatile.isdisjoint(fields) and fragment_cache.is_shared()
+
+    def validators(self, url):
+        """``(etag, last_modified)`` from the dependency versions, without a query."""
+        changed = fragment_cache.changed_at(self.dependencies)
+        versions = fragment_cache.versions(self.dependencies)
+        # The change time is part of the tag, so a counter reset by eviction
+        # can never reproduce a tag a client saw before
+        key = f'{url}|{versions}|{changed}'
+        return '"%s"' % hashlib.md5(key.encode()).hexdigest(), int(changed)
+
+
+def dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+
+RESOURCES = {
+    'songs': Resource(
+        queryset=Song.objects.all,
+        time_field='upload_date',
+        fields={
+            'id': Field('id'),
+            'title': Field('title'),
+            'artist': Field('artist'),
+            'album': Field('album'),
+            'genre': Field('genre'),
+            'duration': Field('duration'),
+            'bitrate': Field('bitrate'),
+            'sample_rate': Field('sample_rate'),
+            'play_count': Field('play_count'),
+            'uploaded_at': Field('upload_date'),
+            'creator_id': Field('uploaded_by_id'),
+            'creator': Field('uploaded_by__username'),
+            'cover_url': Field('cover_image', media_url),
+            'audio_url': Field('id', route('music:stream_song')),
+        },
+        default_fields=('id', 'title', 'artist', 'album', 'genre', 'duration', 'uploaded_at', 'creator_id', 'cover_url', 'audio_url'),
+        dependencies=('song',),
+        volatile=('play_count', 'creator'),
+        filters={'genre': ('genre', str), 'creator': ('uploaded_by_id', int)},
+    ),
+    'podcasts': Resource(
+        queryset=Podcast.objects.all,
+        time_field='created_at',
+        fields={
+            'id': Field('id'),
+            'title': Field('title'),
+            'description': Field('description'),
+            'created_at': Field('created_at'),
+            'host_id': Field('host_id'),
+            'host': Field('host__username'),
+            'cover_url': Field('cover_image', media_url),
+            'episode_count': Field('episode_count', annotation=episode_count),
+        },
+        default_fields=('id', 'title', 'description', 'created_at', 'host_id', 'cover_url'),
+        dependencies=('podcast', 'episode'),
+        volatile=('host',),
+        filters={'host': ('host_id', int)},
+    ),
+    'episodes': Resource(
+        queryset=Episode.objects.all,
+        time_field='published_date',
+        fields={
+            'id': Field('id'),
+            'title': Field('title'),
+            'description': Field('description'),
+            'published_at': Field('published_date'),
+            'podcast_id': Field('podcast_id'),
+            'podcast': Field('podcast__title'),
+            'duration': Field('duration'),
+            'bitrate': Field('bitrate'),
+            'sample_rate': Field('sample_rate'),
+            'play_count': Field('play_count'),
+            'cover_url': Field('podcast__cover_image', media_url),
+            'audio_url': Field('id', route('music:stream_episode')),
+        },
+        default_fields=('id', 'title', 'published_at', 'podcast_id', 'duration', 'audio_url'),
+        dependencies=('episode', 'podcast'),
+        volatile=('play_count',),
+        filters={'podcast': ('podcast_id', int)},
+    ),
+    # Creators are users in the creator pool; most of their fields are
+    # updated without signals, so they are always revalidated by body hash
+    'creators': Resource(
+        queryset=lambda: User.objects.filter(creator_pool_entry__isnull=False),
+        time_field=None,
+        fields={
+            'id': Field('id'),
+            'username': Field('username'),
+            'first_name': Field('first_name'),
+            'last_name': Field('last_name'),
+            'joined_at': Field('date_joined'),
+            'song_count': Field('creator_pool_entry__song_count'),
+            'follower_count': Field('follow_stats__follower_count', lambda count: count or 0),
+            'profile_image_url': Field('profile__profile_image', media_url),
+        },
+        default_fields=('id', 'username', 'first_name', 'last_name', 'song_count', 'follower_count', 'profile_image_url'),
+    ),
+}
@@ -0,0 +1,237 @@
+# music/charts.py
+
+"""
+Trending charts from the play event log.
+
+``update()`` is meant to run periodically (``manage.py update_charts`` from
+cron). Each run:
+
+1. Rolls the PlayEvents logged since the last run up into hourly and daily
+   PlayRollup rows, in bounded slices of event ids.
+2. Adds the new hourly plays to each item's TrendingScore with exponential
+   decay (half-life ``MUSIC_TRENDING_HALF_LIFE_HOURS``). A play at time t is
+   stored as ``exp(rate * (t - epoch))``. Every score therefore decays by the
+   same factor, so rankings never need a global update. The epoch is moved
+   forward before the values get large.
+3. Rebuilds the top-N ChartEntry rows: overall and per genre for songs,
+   overall for episodes.
+4. Prunes raw events and hourly rollups past their retention.
+
+Chart requests read ChartEntry by (kind, genre, rank) and never see raw plays.
+"""
+
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import ChartEntry, ChartState, Episode, PlayEvent, PlayRollup, RecommenderState, Song, TrendingScore
+
+EVENT_SLICE = 50000
+
+# Move the score epoch forward before exp() values approach float overflow
+MAX_EXPONENT = 300
+
+
+def half_life_hours():
+    return getattr(settings, 'MUSIC_TRENDING_HALF_LIFE_HOURS', 24)
+
+
+def chart_size():
+    return getattr(settings, 'MUSIC_CHART_SIZE', 50)
+
+
+def decay_rate():
+    """Decay per second."""
+    return math.log(2) / (half_life_hours() * 3600)
+
+
+def get_state():
+    state = ChartState.objects.select_for_update().filter(pk=1).first()
+    if state is None:
+        state = ChartState.objects.create(pk=1, score_epoch=timezone.now())
+    return state
+
+
+def _merge_rollups(period, deltas):
+    """Add ``{(kind, object_id, bucket): plays}`` onto the PlayRollup rows of ``period``."""
+    if not deltas:
+        return
+    existing = {
+        (row.kind, row.object_id, row.bucket): row
+        for row in PlayRollup.objects.filter(
+            period=period,
+            bucket__in={bucket for _, _, bucket in deltas},
+            object_id__in={object_id for _, object_id, _ in deltas},
+        )
+    }
+    changed, created = [], []
+    for (kind, object_id, bucket), plays in deltas.items():
+        row = existing.get((kind, object_id, bucket))
+        if row is None:
+            created.append(PlayRollup(period=period, kind=kind, object_id=object_id, bucket=bucket, plays=plays))
+        else:
+            row.plays += plays
+            changed.append(row)
+    PlayRollup.objects.bulk_update(changed, ['plays'], batch_size=1000)
+    PlayRollup.objects.bulk_create(created, batch_size=1000)
+
+
+def _add_scores(state, hourly):
+    """Add decayed contributions of new hourly plays to TrendingScore."""
+    rate = decay_rate()
+    contributions = defaultdict(float)
+    for (kind, object_id, bucket), plays in hourly.items():
+        # Count the plays at the middle of their hour
+        age = (bucket - state.score_epoch).total_seconds() + 1800
+        contributions[(kind, object_id)] += plays * math.exp(rate * age)
+
+    genres = dict(
+        Song.objects.filter(pk__in=[pk for kind, pk in contributions if kind == 'song']).values_list('pk', 'genre')
+    )
+    existing = {
+        (row.kind, row.object_id): row
+        for row in TrendingScore.objects.filter(object_id__in={pk for _, pk in contributions})
+    }
+    changed, created = [], []
+    for (kind, object_id), value in contributions.items():
+        genre = genres.get(object_id, '') if kind == 'song' else ''
+        row = existing.get((kind, object_id))
+        if row is None:
+            created.append(TrendingScore(kind=kind, object_id=object_id, genre=genre, score=value))
+        else:
+            row.score += value
+            row.genre = genre
+            changed.append(row)
+    TrendingScore.objects.bulk_update(changed, ['score', 'genre'], batch_size=1000)
+    TrendingScore.objects.bulk_create(created, batch_size=1000)
+
+
+def _rebase(state, now):
+    """Move the epoch to ``now`` if stored scores are getting too large."""
+    exponent = decay_rate() * (now - state.score_epoch).total_seconds()
+    if exponent < MAX_EXPONENT:
+        return
+    TrendingScore.objects.update(score=F('score') * math.exp(-exponent))
+    state.score_epoch = now
+
+
+def current_factor(state, now):
+    """Multiply a stored score by this to get its decayed value at ``now``."""
+    return math.exp(-decay_rate() * (now - state.score_epoch).total_seconds())
+
+
+def roll_up():
+    """Roll up and score every PlayEvent logged since the last run. Returns the number of events."""
+    total = 0
+    while True:
+        with transaction.atomic():
+            state = get_state()
+            top = PlayEvent.objects.filter(pk__gt=state.last_event_id).aggregate(top=Max('pk'))['top']
+            if top is None:
+                return total
+            top = min(top, state.last_event_id + EVENT_SLICE)
+            events = PlayEvent.objects.filter(pk__gt=state.last_event_id, pk__lte=top)
+
+            hourly = {
+                (row['kind'], row['object_id'], row['bucket']): row['plays']
+                for row in events.annotate(bucket=TruncHour('played_at'))
+                .values('kind', 'object_id', 'bucket').annotate(plays=Count('pk')).order_by()
+            }
+            daily = defaultdict(int)
+            for (kind, object_id, bucket), plays in hourly.items():
+                daily[(kind, object_id, bucket.replace(hour=0))] += plays
+
+            _merge_rollups(PlayRollup.HOUR, hourly)
+            _merge_rollups(PlayRollup.DAY, daily)
+            _add_scores(state, hourly)
+            total += sum(hourly.values())
+            state.last_event_id = top
+            state.save()
+
+
+def build_charts(now=None):
+    """Rebuild every ChartEntry from the current trending scores. Returns the number of charts."""
+    now = now or timezone.now()
+    size = chart_size()
+    with transaction.atomic():
+        state = get_state()
+        _rebase(state, now)
+        state.save()
+        factor = current_factor(state, now)
+
+        # Forget items whose decayed score has fallen below a hundredth of a play
+        TrendingScore.objects.filter(score__lt=0.01 / factor).delete()
+
+        charts = [('song', ''), ('episode', '')]
+        charts += [
+            ('song', genre) for genre in
+            TrendingScore.objects.filter(kind='song').exclude(genre='')
+            .order_by().values_list('genre', flat=True).distinct()
+        ]
+        entries = []
+        for kind, genre in charts:
+            ranked = TrendingScore.objects.filter(kind=kind)
+            if genre:
+                ranked = ranked.filter(genre=genre)
+            for rank, (object_id, score) in enumerate(
+                ranked.order_by('-score', 'object_id').values_list('object_id', 'score')[:size], 1
+            ):
+                entries.append(ChartEntry(kind=kind, genre=genre, rank=rank, object_id=object_id, score=score * factor))
+        ChartEntry.objects.all().delete()
+        ChartEntry.objects.bulk_create(entries, batch_size=1000)
+    return len(charts)
+
+
+def prune(now=None):
+    """Delete rolled-up raw events and hourly rollups past their retention."""
+    now = now or timezone.now()
+    state = ChartState.objects.filter(pk=1).first()
+    if state is None:
+        return
+    event_days = getattr(settings, 'MUSIC_PLAY_EVENT_RETENTION_DAYS', 30)
+    hourly_days = getattr(settings, 'MUSIC_HOURLY_ROLLUP_RETENTION_DAYS', 14)
+    # Raw events also feed the recommender; keep those it has not ingested yet
+    consumed = state.last_event_id
+    recommender = RecommenderState.objects.filter(pk=1).first()
+    if recommender is not None:
+        consumed = min(consumed, recommender.last_event_id)
+    PlayEvent.objects.filter(pk__lte=consumed, played_at__lt=now - timedelta(days=event_days)).delete()
+    PlayRollup.objects.filter(period=PlayRollup.HOUR, bucket__lt=now - timedelta(hours=24 * hourly_days)).delete()
+
+
+def update():
+    """The periodic job: roll up, rescore, rebuild charts, prune."""
+    events = roll_up()
+    charts = build_charts()
+    prune()
+    return events, charts
+
+
+def chart(kind, genre='', limit=None):
+    """Ranked Song/Episode objects for a chart, with ``chart_rank``/``chart_score`` set."""
+    queryset = Song.objects.all() if kind == 'song' else Episode.objects.select_related('podcast')
+    entries = list(
+        ChartEntry.objects.filter(kind=kind, genre=genre).order_by('rank')
+        .values_list('rank', 'object_id', 'score')[:limit or chart_size()]
+    )
+    objects = queryset.in_bulk([object_id for _, object_id, _ in entries])
+    ranked = []
+    for rank, object_id, score in entries:
+        obj = objects.get(object_id)
+        if obj is not None:  # deleted since the chart was built
+            obj.chart_rank, obj.chart_score = rank, score
+            ranked.append(obj)
+    return ranked
+
+
+def chart_genres():
+    return list(
+        ChartEntry.objects.filter(kind='song').exclude(genre='')
+        .order_by('genre').values_list('genre', flat=True).distinct()
+    )
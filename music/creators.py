@@ -0,0 +1,76 @@
+# music/creators.py
+
+"""
+Creator pool: users who have uploaded at least one song.
+
+Pool entries occupy dense slots 0..n-1, so picking k random creators is k
+random integers plus one indexed ``slot IN (...)`` lookup, no matter how many
+users or songs exist. Removing an entry moves the highest slot into the gap.
+"""
+
+import random
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, F, Max
+
+from .models import CreatorPoolEntry, Song
+
+
+def add_song(user_id, count=1):
+    """Count ``count`` new songs for ``user_id``, adding them to the pool on their first upload."""
+    with transaction.atomic():
+        updated = CreatorPoolEntry.objects.filter(user_id=user_id).update(song_count=F('song_count') + count)
+        if not updated:
+            top = CreatorPoolEntry.objects.aggregate(top=Max('slot'))['top']
+            CreatorPoolEntry.objects.create(
+                user_id=user_id,
+                slot=0 if top is None else top + 1,
+                song_count=count,
+            )
+
+
+def remove_song(user_id):
+    """Uncount a deleted song, dropping the user from the pool when it was their last one."""
+    with transaction.atomic():
+        CreatorPoolEntry.objects.filter(user_id=user_id, song_count__gt=0).update(song_count=F('song_count') - 1)
+        # Deleting the entry fires post_delete, which compacts the slots
+        for entry in CreatorPoolEntry.objects.filter(user_id=user_id, song_count=0):
+            entry.delete()
+
+
+def fill_slot(slot):
+    """Move the highest-numbered entry into the freed ``slot`` to keep slots dense."""
+    with transaction.atomic():
+        last = CreatorPoolEntry.objects.order_by('-slot').first()
+        if last is not None and last.slot > slot:
+            CreatorPoolEntry.objects.filter(pk=last.pk).update(slot=slot)
+
+
+def rebuild():
+    """Renumber the whole pool from the Song table, e.g. after bulk inserts. Returns the pool size."""
+    counts = (
+        Song.objects.order_by().values('uploaded_by').annotate(n=Count('pk')).order_by('uploaded_by')
+    )
+    with transaction.atomic():
+        # Plain DELETE: going through the ORM would run fill_slot() once per entry
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {CreatorPoolEntry._meta.db_table}')
+        CreatorPoolEntry.objects.bulk_create(
+            (CreatorPoolEntry(user_id=row['uploaded_by'], slot=slot, song_count=row['n'])
+             for slot, row in enumerate(counts)),
+            batch_size=1000,
+        )
+    return CreatorPoolEntry.objects.count()
+
+
+def sample_creators(k):
+    """Return up to ``k`` distinct random users from the creator pool."""
+    top = CreatorPoolEntry.objects.aggregate(top=Max('slot'))['top']
+    if top is None:
+        return []
+    slots = random.sample(range(top + 1), min(k, top + 1))
+    users = list(User.objects.filter(creator_pool_entry__slot__in=slots))
+    random.shuffle(users)
+    return users
+
@@ -0,0 +1,130 @@
+# music/follows.py
+
+"""
+Follow lookups and denormalised follower/following counts.
+
+Follows live in the ``users.Profile.followers`` many-to-many table, which has
+a unique (profile_id, user_id) index. "Does A follow B" is therefore a single
+indexed EXISTS, and "which of these creators does A follow" is one IN query.
+Neither loads the follower set into Python.
+
+Counts are kept per user in ``FollowStats``. The m2m_changed and pre_delete
+handlers in music/signals.py adjust them inside the same transaction as the
+follow rows, using only the pairs that really changed.
+"""
+
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import FollowStats
+
+
+def follow_model():
+    """The auto-created through model of ``Profile.followers``."""
+    return apps.get_model('users', 'Profile').followers.through
+
+
+def is_following(user, creator_id):
+    """True if ``user`` follows the user with id ``creator_id``."""
+    if not user.is_authenticated:
+        return False
+    return follow_model().objects.filter(profile__user_id=creator_id, user_id=user.pk).exists()
+
+
+def following_ids(user, creator_ids):
+    """The subset of ``creator_ids`` (user ids) that ``user`` follows."""
+    creator_ids = list(creator_ids)
+    if not user.is_authenticated or not creator_ids:
+        return set()
+    return set(
+        follow_model().objects
+        .filter(user_id=user.pk, profile__user_id__in=creator_ids)
+        .values_list('profile__user_id', flat=True)
+    )
+
+
+def counts(user_id):
+    """``(follower_count, following_count)`` for one user."""
+    row = FollowStats.objects.filter(user_id=user_id).values_list('follower_count', 'following_count').first()
+    return row or (0, 0)
+
+
+def counts_for(user_ids):
+    """``{user_id: (follower_count, following_count)}``; users without a row are omitted."""
+    return {
+        user_id: (followers, following)
+        for user_id, followers, following in FollowStats.objects.filter(user_id__in=list(user_ids))
+        .values_list('user_id', 'follower_count', 'following_count')
+    }
+
+
+def existing_pairs(instance, reverse, pk_set=None):
+    """
+    ``(followed_user_id, follower_user_id)`` rows touched by an m2m change.
+    ``instance`` is a Profile (forward) or a User (``reverse``), as in the
+    m2m_changed signal; ``pk_set`` narrows to the other side's ids.
+    """
+    rows = follow_model().objects.all()
+    if reverse:
+        rows = rows.filter(user_id=instance.pk)
+        if pk_set is not None:
+            rows = rows.filter(profile_id__in=pk_set)
+    else:
+        rows = rows.filter(profile_id=instance.pk)
+        if pk_set is not None:
+            rows = rows.filter(user_id__in=pk_set)
+    return list(rows.values_list('profile__user_id', 'user_id'))
+
+
+def _apply(field, deltas):
+    # One UPDATE per distinct delta, like the play counter flush
+    by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(user_id)
+    for delta, user_ids in by_delta.items():
+        FollowStats.objects.filter(user_id__in=user_ids).update(**{field: F(field) + delta})
+
+
+def apply_pairs(pairs, sign):
+    """Add (``sign=1``) or remove (``sign=-1``) follow pairs from the stored counts."""
+    if not pairs:
+        return
+    followers = Counter(followed for followed, _ in pairs)
+    following = Counter(follower for _, follower in pairs)
+    with transaction.atomic():
+        FollowStats.objects.bulk_create(
+            [FollowStats(user_id=user_id) for user_id in set(followers) | set(following)],
+            ignore_conflicts=True,
+        )
+        _apply('follower_count', {user_id: sign * n for user_id, n in followers.items()})
+        _apply('following_count', {user_id: sign * n for user_id, n in following.items()})
+
+
+def rebuild(user_ids=None):
+    """Recompute stored counts from the follow table, for all users or just ``user_ids``."""
+    Follow = follow_model()
+    rows = Follow.objects.order_by()
+    followers = rows.values('profile__user_id').annotate(n=Count('pk'))
+    following = rows.values('user_id').annotate(n=Count('pk'))
+    stats = FollowStats.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        followers = followers.filter(profile__user_id__in=user_ids)
+        following = following.filter(user_id__in=user_ids)
+        stats = stats.filter(user_id__in=user_ids)
+
+    totals = defaultdict(lambda: [0, 0])
+    for row in followers:
+        totals[row['profile__user_id']][0] = row['n']
+    for row in following:
+        totals[row['user_id']][1] = row['n']
+    with transaction.atomic():
+        stats.delete()
+        FollowStats.objects.bulk_create(
+            (FollowStats(user_id=user_id, follower_count=f, following_count=g) for user_id, (f, g) in totals.items()),
+            batch_size=1000,
+        )
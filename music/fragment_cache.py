@@ -0,0 +1,130 @@
+# music/fragment_cache.py
+
+"""
+Versioned fragment cache for shared page markup.
+
+Every cached fragment declares the models it depends on ('song', 'podcast',
+'episode', 'profile'). Each of those has a version counter in the cache, and
+the counters are part of the fragment key. Saving or deleting a row bumps its
+model's counter (see music/signals.py), so every dependent fragment misses on
+the next request. Nothing has to be deleted explicitly, and stale entries
+simply age out.
+
+Per-user markup (follow buttons, owner-only links) stays outside the cached
+blocks or is varied on explicitly, e.g. ``user.is_authenticated``.
+
+Works with any cache backend; the default local-memory cache is enough for a
+single process and the tests. With several worker processes, or with
+management commands that bump versions, only a shared backend (see
+DJANGO_CACHE_LOCATION) makes every process see every bump.
+"""
+
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+DEPENDENCIES = ('song', 'podcast', 'episode', 'profile')
+
+KEY_PREFIX = 'music:fc'
+
+
+class FragmentStats:
+    """Process-local hit/miss counters, per fragment name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, name, hit):
+        with self._lock:
+            hits, misses = self._counts.get(name, (0, 0))
+            self._counts[name] = (hits + 1, misses) if hit else (hits, misses + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: {'hits': h, 'misses': m} for name, (h, m) in self._counts.items()}
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = FragmentStats()
+
+
+def _version_key(dependency):
+    return f'{KEY_PREFIX}:v:{dependency}'
+
+
+def versions(dependencies):
+    """Current version counter for each dependency, fetched in one round trip."""
+    keys = [_version_key(dep) for dep in dependencies]
+    found = cache.get_many(keys)
+    return [found.get(key, 1) for key in keys]
+
+
+def _changed_key(dependency):
+    return f'{KEY_PREFIX}:t:{dependency}'
+
+
+def bump(dependency):
+    """Invalidate every fragment that depends on ``dependency``."""
+    key = _version_key(dependency)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First bump (or evicted): start past the implicit version 1
+        cache.set(key, 2, None)
+    cache.set(_changed_key(dependency), time.time(), None)
+
+
+def bump_model(model):
+    """Bump ``model``'s dependency, if it has one, after writes that send no signals."""
+    if model._meta.model_name in DEPENDENCIES:
+        bump(model._meta.model_name)
+
+
+def is_shared():
+    """Whether bumps made by other processes are visible to this one."""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def changed_at(dependencies):
+    """
+    Unix time of the last bump of any of ``dependencies``. An unknown time
+    (first use, or evicted) is recorded as now, which at worst makes clients
+    refetch once.
+    """
+    keys = [_changed_key(dep) for dep in dependencies]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time(), None)
+            found[key] = cache.get(key, time.time())
+    return max(found.values())
+
+
+def fragment_key(name, dependencies, vary_on=()):
+    version_part = '.'.join(str(v) for v in versions(dependencies))
+    vary_part = hashlib.md5(':'.join(str(v) for v in vary_on).encode()).hexdigest()
+    return f'{KEY_PREFIX}:{name}:{version_part}:{vary_part}'
+
+
+def get_or_render(name, dependencies, vary_on, render, timeout=None):
+    """Return the cached markup for a fragment, calling ``render()`` on a miss."""
+    for dep in dependencies:
+        if dep not in DEPENDENCIES:
+            raise ValueError(f'Unknown fragment cache dependency: {dep}')
+    key = fragment_key(name, dependencies, vary_on)
+    html = cache.get(key)
+    if html is not None:
+        stats.record(name, hit=True)
+        return html
+    stats.record(name, hit=False)
+    html = render()
+    cache.set(key, html, timeout if timeout is not None else 3600)
+    return html
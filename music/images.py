@@ -0,0 +1,124 @@
+# music/images.py
+
+"""
+Resized cover/profile image derivatives.
+
+Derivatives are generated lazily with Pillow the first time a width/format is
+requested and cached on disk under MEDIA_ROOT/derivatives/. Their file names
+embed a hash of the source image's bytes plus the width and format, so a
+replaced image never reuses a stale thumbnail and the files can be cached
+forever by browsers and proxies.
+"""
+
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.http import urlencode
+
+DERIVATIVE_DIR = 'derivatives'
+
+# format -> (Pillow format, file extension, save options)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Only images uploaded through these fields may be resized on demand
+SOURCE_DIRS = ('covers/', 'podcast_covers/', 'profile_images/')
+
+
+def widths():
+    return getattr(settings, 'MUSIC_IMAGE_WIDTHS', (160, 320, 640))
+
+
+def is_allowed_source(name):
+    return (
+        bool(name)
+        and name.startswith(SOURCE_DIRS)
+        and '..' not in name.split('/')
+        and not os.path.isabs(name)
+    )
+
+
+def source_errors():
+    """
+    Exceptions meaning a source image can't be read or resized. Pillow's
+    DecompressionBombError, for oversized images, is not an OSError.
+    """
+    from PIL import Image
+
+    return (OSError, ValueError, Image.DecompressionBombError)
+
+
+def source_hash(name):
+    """
+    Short SHA-256 of the source image's bytes. Memoised in the cache keyed by
+    path, size and mtime, so the original is read only once per version.
+    """
+    path = default_storage.path(name)
+    stat = os.stat(path)
+    key = 'music:imghash:%s' % hashlib.md5(f'{name}:{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()
+    digest = cache.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as source:
+            for block in iter(lambda: source.read(1024 * 1024), b''):
+                sha.update(block)
+        digest = sha.hexdigest()[:16]
+        cache.set(key, digest, None)
+    return digest
+
+
+def derivative_name(name, width, fmt):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f'{DERIVATIVE_DIR}/{stem}-{source_hash(name)}-{width}w.{FORMATS[fmt][1]}'
+
+
+def generate(name, width, fmt):
+    """Create the derivative for ``name`` if it is missing and return its storage name."""
+    from PIL import Image, ImageOps
+
+    target = derivative_name(name, width, fmt)
+    target_path = default_storage.path(target)
+    if os.path.exists(target_path):
+        return target
+
+    pil_format, _, options = FORMATS[fmt]
+    with Image.open(default_storage.path(name)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            image.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+        if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGBA')
+        buffer = BytesIO()
+        image.save(buffer, pil_format, **options)
+
+    # Write to a temp file and rename so concurrent requests never see a partial image
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target_path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as tmp:
+        tmp.write(buffer.getvalue())
+    os.replace(tmp_path, target_path)
+    return target
+
+
+def derivative_url(name, width, fmt):
+    """
+    URL for a derivative: the media URL when it already exists on disk,
+    otherwise the on-demand view that generates it.
+    """
+    try:
+        target = derivative_name(name, width, fmt)
+    except source_errors():
+        return default_storage.url(name)
+    if os.path.exists(default_storage.path(target)):
+        return default_storage.url(target)
+    return reverse('music:image_derivative', args=[width, fmt]) + '?' + urlencode({'src': name})
@@ -0,0 +1,221 @@
+# music/listening.py
+
+"""
+Per-user resume positions and listening history.
+
+The player reports its position through the telemetry beacon (progress
+heartbeats, pause, seek, stop, ended). Only the latest position per
+(user, item) is kept in memory, and a background thread writes those as one
+bulk upsert every ``MUSIC_RESUME_FLUSH_INTERVAL`` seconds. Each listener and
+item therefore costs at most one row write per interval, however often the
+client reports.
+
+ListeningPosition keeps one row per (user, item). Ordered by ``updated_at``
+it is the listening history, and the unfinished rows are "continue
+listening"; both are served from the (user, completed, -updated_at) index.
+"""
+
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Episode, ListeningPosition, Song
+from .write_queue import writer
+
+logger = logging.getLogger(__name__)
+
+# Items stopped before this many seconds are not offered for resuming
+MIN_RESUME_POSITION = 10
+
+MODELS = {'song': Song, 'episode': Episode}
+
+
+class PositionBuffer:
+    def __init__(self, flush_interval=None, max_keys=None):
+        self.flush_interval = flush_interval or getattr(settings, 'MUSIC_RESUME_FLUSH_INTERVAL', 15.0)
+        self.max_keys = max_keys or getattr(settings, 'MUSIC_RESUME_BUFFER_KEYS', 50000)
+        self._latest = {}  # (user_id, kind, object_id) -> (position, completed, at)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, user_id, kind, object_id, position, completed=False, at=None):
+        """Remember a position; only the newest per user and item is written."""
+        self._ensure_started()
+        at = at or timezone.now()
+        key = (user_id, kind, object_id)
+        with self._lock:
+            current = self._latest.get(key)
+            if current is None or at >= current[2]:
+                self._latest[key] = (max(position, 0.0), completed, at)
+            should_wake = len(self._latest) >= self.max_keys
+        if should_wake:
+            self._wake.set()
+
+    def record_events(self, events):
+        """Take the positions out of parsed telemetry events (see music/telemetry.py)."""
+        for action, kind, object_id, user_id, position, value, occurred_at, _ in events:
+            if user_id is None:
+                continue
+            if action == 'seek' and value is not None:
+                position = value
+            if position is None:
+                continue
+            self.record(user_id, kind, object_id, position, completed=action == 'ended', at=occurred_at)
+
+    def pending(self, user_id, kind, object_id):
+        """The buffered ``(position, completed)`` for an item, or None."""
+        with self._lock:
+            entry = self._latest.get((user_id, kind, object_id))
+        return entry[:2] if entry else None
+
+    def flush(self):
+        """Upsert every buffered position. Returns the number of rows written."""
+        # Through the writer thread, after any flush already queued there
+        return writer.call(self._flush)
+
+    def _flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._latest = self._latest, {}
+            if not batch:
+                return 0
+            try:
+                with transaction.atomic():
+                    # Heartbeats name items by id only; skip ones that don't (or no longer) exist
+                    existing = {
+                        kind: set(model.objects.filter(
+                            pk__in={object_id for _, k, object_id in batch if k == kind}
+                        ).values_list('pk', flat=True))
+                        for kind, model in MODELS.items()
+                    }
+                    # The user FK's CASCADE is applied by the ORM, not the database, so
+                    # positions of users deleted since they were buffered would fail
+                    # the FK check on every retry; they are dropped like the user's rows
+                    users = set(get_user_model().objects.filter(
+                        pk__in={user_id for user_id, _, _ in batch}
+                    ).values_list('pk', flat=True))
+                    rows = [
+                        ListeningPosition(
+                            user_id=user_id, kind=kind, object_id=object_id,
+                            position=position, completed=completed, updated_at=at,
+                        )
+                        for (user_id, kind, object_id), (position, completed, at) in batch.items()
+                        if object_id in existing[kind] and user_id in users
+                    ]
+                    ListeningPosition.objects.bulk_create(
+                        rows,
+                        batch_size=500,
+                        update_conflicts=True,
+                        unique_fields=['user', 'kind', 'object_id'],
+                        update_fields=['position', 'completed', 'updated_at'],
+                    )
+            except Exception:
+                # Retry on the next flush unless a newer position arrived meanwhile
+                with self._lock:
+                    for key, entry in batch.items():
+                        self._latest.setdefault(key, entry)
+                raise
+            return len(rows)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='listening-position-flush', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to write buffered listening positions')
+            finally:
+                connection.close()
+
+    def shutdown(self):
+        """Stop the background thread and write whatever is still buffered."""
+        self._stop.set()
+        self._wake.set()
+        self.flush()
+
+
+positions = PositionBuffer()
+
+
+def _resume_from(entry):
+    if entry is None or entry[1]:
+        return 0
+    return entry[0]
+
+
+def resume_position(user_id, kind, object_id):
+    """Seconds to resume an item from: the buffered position, else the stored one, else 0."""
+    if user_id is None:
+        return 0
+    entry = positions.pending(user_id, kind, object_id)
+    if entry is None:
+        entry = ListeningPosition.objects.filter(
+            user_id=user_id, kind=kind, object_id=object_id,
+        ).values_list('position', 'completed').first()
+    return _resume_from(entry)
+
+
+async def aresume_position(user_id, kind, object_id):
+    """Async resume_position."""
+    if user_id is None:
+        return 0
+    entry = positions.pending(user_id, kind, object_id)
+    if entry is None:
+        entry = await ListeningPosition.objects.filter(
+            user_id=user_id, kind=kind, object_id=object_id,
+        ).values_list('position', 'completed').afirst()
+    return _resume_from(entry)
+
+
+def recent(user, limit=20, in_progress=False):
+    """
+    The user's most recently played songs/episodes, newest first, with
+    ``listening_kind``, ``resume_position`` and ``listened_at`` set. With
+    ``in_progress`` only unfinished items worth resuming ("continue listening").
+    At most three queries: the index scan plus one per kind on the page.
+    """
+    rows = ListeningPosition.objects.filter(user=user)
+    if in_progress:
+        rows = rows.filter(completed=False, position__gte=MIN_RESUME_POSITION)
+    rows = list(rows.order_by('-updated_at').values_list('kind', 'object_id', 'position', 'completed', 'updated_at')[:limit])
+
+    objects = {
+        'song': Song.objects.in_bulk([object_id for kind, object_id, *_ in rows if kind == 'song']),
+        'episode': Episode.objects.select_related('podcast').in_bulk(
+            [object_id for kind, object_id, *_ in rows if kind == 'episode']
+        ),
+    }
+    items = []
+    for kind, object_id, position, completed, updated_at in rows:
+        obj = objects[kind].get(object_id)
+        if obj is None:
+            continue
+        obj.listening_kind = kind
+        obj.resume_position = 0 if completed else position
+        obj.listened_at = updated_at
+        items.append(obj)
+    return items
+
+
+def forget(kind, object_id):
+    """Drop every user's position for a deleted song/episode."""
+    ListeningPosition.objects.filter(kind=kind, object_id=object_id).delete()
@@ -0,0 +1,69 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from music import fragment_cache
+from music.audio_metadata import AudioMetadataError, apply_metadata, extract_metadata_from_path
+from music.models import Episode, Song
+
+
+def _extract(job):
+    # Runs in a worker process: pure file parsing, no database access
+    pk, path = job
+    try:
+        return pk, extract_metadata_from_path(path), None
+    except (AudioMetadataError, OSError) as exc:
+        return pk, None, str(exc)
+
+
+class Command(BaseCommand):
+    help = 'Extract duration/bitrate/sample rate for songs and episodes that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true', help='Re-extract rows that already have metadata')
+
+    def handle(self, *args, **options):
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for model in (Song, Episode):
+                self._backfill(pool, model, options['batch_size'], options['all'])
+
+    def _backfill(self, pool, model, batch_size, everything):
+        queryset = model.objects.order_by('pk')
+        if not everything:
+            queryset = queryset.filter(duration__isnull=True)
+
+        updated = failed = 0
+        last_pk = 0
+        while True:
+            # Walk by primary key so rows updated in earlier batches don't shift the window
+            rows = list(queryset.filter(pk__gt=last_pk).only('pk', 'audio_file')[:batch_size])
+            if not rows:
+                break
+            last_pk = rows[-1].pk
+            by_pk = {row.pk: row for row in rows}
+
+            jobs = []
+            for row in rows:
+                try:
+                    jobs.append((row.pk, row.audio_file.path))
+                except (ValueError, NotImplementedError):
+                    failed += 1  # no file, or storage without local paths
+
+            changed = []
+            for pk, meta, error in pool.map(_extract, jobs, chunksize=16):
+                if meta is None:
+                    failed += 1
+                    self.stderr.write(f'{model.__name__} {pk}: {error}')
+                    continue
+                apply_metadata(by_pk[pk], meta)
+                changed.append(by_pk[pk])
+
+            model.objects.bulk_update(changed, ['duration', 'bitrate', 'sample_rate'])
+            if changed:
+                # bulk_update sends no post_save
+                fragment_cache.bump_model(model)
+            updated += len(changed)
+
+        self.stdout.write(self.style.SUCCESS(f'{model.__name__}: updated {updated}, failed {failed}'))
@@ -0,0 +1,280 @@
+import json
+import math
+import random
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.client import HTTPConnection
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import Max, Min
+from django.test import Client
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from music.models import Episode, Podcast, Song
+from music.play_counter import play_counter
+
+ENDPOINTS = (
+    'home', 'discover', 'search_results', 'song_detail', 'podcast_detail',
+    'increment_play_count', 'increment_episode_play_count',
+)
+
+
+class QueryRecorder:
+    """Execute wrapper that counts and times SQL on every connection it is installed on."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.count += 1
+                self.seconds += elapsed
+
+    def install(self, conn):
+        if self not in conn.execute_wrappers:
+            conn.execute_wrappers.append(self)
+
+    def reset(self):
+        with self._lock:
+            self.count, self.seconds = 0, 0.0
+
+
+class TestClientTransport:
+    name = 'test-client'
+
+    def __init__(self, user):
+        self.user = user
+        self._local = threading.local()
+
+    def request(self, method, path):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client(HTTP_HOST='localhost')
+            client.force_login(self.user)
+        return getattr(client, method)(path).status_code
+
+    def close(self):
+        pass
+
+
+def auth_headers(user):
+    """Session and CSRF headers that let plain HTTP requests act as ``user``."""
+    client = Client()
+    client.force_login(user)
+    session = client.cookies[settings.SESSION_COOKIE_NAME].value
+    # An unmasked secret is accepted both as the cookie and as the header token
+    csrf = get_random_string(32)
+    return {
+        'Cookie': f'{settings.SESSION_COOKIE_NAME}={session}; {settings.CSRF_COOKIE_NAME}={csrf}',
+        'X-CSRFToken': csrf,
+    }
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class _ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class WSGITransport:
+    """Real HTTP against a wsgiref server on a random local port, one thread per request."""
+
+    name = 'wsgi'
+
+    def __init__(self, user):
+        self.server = make_server('127.0.0.1', 0, get_wsgi_application(),
+                                  server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.headers = auth_headers(user)
+
+    def request(self, method, path):
+        conn = HTTPConnection('127.0.0.1', self.server.server_port, timeout=30)
+        try:
+            conn.request(method.upper(), path, headers=self.headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        finally:
+            conn.close()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Measure latency, throughput and SQL cost of the main music endpoints, reported as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--transport', choices=('client', 'wsgi'), default='client',
+                            help='Django test client in-process, or HTTP against a local WSGI server')
+        parser.add_argument('--username', default='seed_user_0', help='User to log in as (see seed_catalog)')
+        parser.add_argument('--query', default='midnight river', help='search_results query')
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f'User {options["username"]!r} not found; run seed_catalog first or pass --username')
+        names = [n.strip() for n in options['endpoints'].split(',') if n.strip()]
+        unknown = set(names) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+
+        self.random = random.Random(options['seed'])
+        paths = self._paths(options['query'])
+        recorder = QueryRecorder()
+        recorder.install(connection)
+
+        def on_connect(sender, connection, **kwargs):
+            recorder.install(connection)
+
+        connection_created.connect(on_connect, weak=False)
+        transport = (WSGITransport if options['transport'] == 'wsgi' else TestClientTransport)(user)
+        try:
+            results = {
+                name: self._measure(transport, recorder, paths[name], options)
+                for name in names
+            }
+        finally:
+            transport.close()
+            connection_created.disconnect(on_connect)
+            play_counter.flush()
+
+        report = {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'transport': transport.name,
+                'concurrency': options['concurrency'],
+                'requests': options['requests'],
+                'warmup': options['warmup'],
+                'database': connection.vendor,
+                'rows': {
+                    'users': User.objects.count(),
+                    'songs': Song.objects.count(),
+                    'podcasts': Podcast.objects.count(),
+                    'episodes': Episode.objects.count(),
+                },
+            },
+            'endpoints': results,
+        }
+        payload = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as out:
+                out.write(payload + '\n')
+            self.stderr.write(f'Wrote {options["output"]}')
+        else:
+            self.stdout.write(payload)
+
+    def _sample_ids(self, model, n=50):
+        bounds = model.objects.aggregate(lo=Min('pk'), hi=Max('pk'))
+        if bounds['lo'] is None:
+            raise CommandError(f'No {model._meta.verbose_name_plural} to benchmark; run seed_catalog first')
+        ids = set()
+        for _ in range(n):
+            pivot = self.random.randint(bounds['lo'], bounds['hi'])
+            ids.add(model.objects.filter(pk__gte=pivot).order_by('pk').values_list('pk', flat=True).first())
+        return sorted(ids)
+
+    def _paths(self, query):
+        song_ids = self._sample_ids(Song)
+        podcast_ids = self._sample_ids(Podcast)
+        episode_ids = self._sample_ids(Episode)
+        pick = self.random.choice
+        search_url = reverse('music:search_results') + '?' + 'q=' + '+'.join(query.split())
+        # endpoint -> (method, path factory)
+        return {
+            'home': ('get', lambda: reverse('music:home')),
+            'discover': ('get', lambda: reverse('music:discover')),
+            'search_results': ('get', lambda: search_url),
+            'song_detail': ('get', lambda: reverse('music:song_detail', args=[pick(song_ids)])),
+            'podcast_detail': ('get', lambda: reverse('music:podcast_detail', args=[pick(podcast_ids)])),
+            'increment_play_count': ('post', lambda: reverse('music:increment_play_count', args=[pick(song_ids)])),
+            'increment_episode_play_count': (
+                'post', lambda: reverse('music:increment_episode_play_count', args=[pick(episode_ids)])
+            ),
+        }
+
+    def _measure(self, transport, recorder, endpoint, options):
+        method, path = endpoint
+        for _ in range(options['warmup']):
+            transport.request(method, path())
+
+        total = options['requests']
+        workers = max(1, options['concurrency'])
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def worker(n):
+            local_latencies, local_errors = [], []
+            for _ in range(n):
+                url = path()
+                start = time.perf_counter()
+                try:
+                    status = transport.request(method, url)
+                except Exception as exc:
+                    local_errors.append(repr(exc))
+                    continue
+                local_latencies.append(time.perf_counter() - start)
+                if status >= 400:
+                    local_errors.append(f'HTTP {status} {url}')
+            with lock:
+                latencies.extend(local_latencies)
+                errors.extend(local_errors)
+            connection.close()
+
+        recorder.reset()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(worker, [total // workers + (1 if i < total % workers else 0) for i in range(workers)]))
+        wall = time.perf_counter() - started
+
+        latencies.sort()
+
+        def ms(value):
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            'requests': total,
+            'errors': len(errors),
+            'first_errors': errors[:5],
+            'p50_ms': ms(percentile(latencies, 50)),
+            'p95_ms': ms(percentile(latencies, 95)),
+            'p99_ms': ms(percentile(latencies, 99)),
+            'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+            'throughput_rps': round(total / wall, 1) if wall else None,
+            'sql_queries_per_request': round(recorder.count / total, 2) if total else None,
+            'sql_ms_per_request': round(recorder.seconds * 1000 / total, 3) if total else None,
+        }
@@ -0,0 +1,89 @@
+import statistics
+import time
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from music import follows
+from music.models import Song
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Show song page cost and follow lookups staying flat as a creator gains followers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,1000,100000,1000000',
+                            help='Comma-separated follower counts to measure, ascending')
+        parser.add_argument('--repeat', type=int, default=20, help='Requests per size')
+        parser.add_argument('--legacy-max', type=int, default=100000,
+                            help='Largest size at which to also time the old "user in followers.all()" check')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(s) for s in options['sizes'].split(','))
+        try:
+            with transaction.atomic():
+                self._run(sizes, options['repeat'], options['legacy_max'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, sizes, repeat, legacy_max):
+        Profile = apps.get_model('users', 'Profile')
+        Follow = follows.follow_model()
+
+        creator = User.objects.create_user('__bench_follow_creator__')
+        viewer = User.objects.create_user('__bench_follow_viewer__', password='bench-follow-viewer')
+        profile, _ = Profile.objects.get_or_create(user=creator)
+        song = Song.objects.create(title='Benchmark', artist='Benchmark', audio_file='songs/benchmark.mp3', uploaded_by=creator)
+        url = reverse('music:song_detail', args=[song.pk])
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(viewer)
+
+        current = 0
+        for size in sizes:
+            # Bulk inserts bypass m2m_changed, so resync the creator's counts afterwards
+            while current < size:
+                batch = min(size - current, 5000)
+                users = User.objects.bulk_create(
+                    User(username=f'__bench_follower_{current + i}__') for i in range(batch)
+                )
+                Follow.objects.bulk_create(Follow(profile_id=profile.pk, user_id=user.pk) for user in users)
+                current += batch
+            follows.rebuild([creator.pk])
+
+            timings = []
+            for _ in range(repeat):
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    timings.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    self.stderr.write(f'song_detail returned HTTP {response.status_code}')
+                    return
+
+            start = time.perf_counter()
+            for _ in range(repeat):
+                follows.is_following(viewer, creator.pk)
+            exists_ms = (time.perf_counter() - start) / repeat * 1000
+
+            legacy = 'skipped'
+            if size <= legacy_max:
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    viewer in profile.followers.all()
+                legacy = f'{(time.perf_counter() - start) / repeat * 1000:.2f}ms'
+
+            self.stdout.write(
+                f'followers={size:>9,}  page p50={statistics.median(timings) * 1000:7.2f}ms '
+                f'queries={len(queries):>2}  stored count={follows.counts(creator.pk)[0]:>9,}  '
+                f'EXISTS={exists_ms:.2f}ms  followers.all()={legacy}'
+            )
@@ -0,0 +1,79 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from music.models import PlayEvent, Song
+from music.play_counter import PlayCounterBuffer
+
+
+class Command(BaseCommand):
+    help = 'Compare per-play save() against the buffered play counter under concurrent threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--plays', type=int, default=2000, help='Total plays per run')
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        plays = options['plays']
+
+        user, _ = User.objects.get_or_create(username='__bench_play_counts__')
+        song = Song.objects.create(title='Benchmark', artist='Benchmark', audio_file='songs/benchmark.mp3', uploaded_by=user)
+        try:
+            self._report('save()', plays, *self._run(threads, plays, lambda: self._legacy_play(song.pk), song))
+
+            song.play_count = 0
+            song.save(update_fields=['play_count'])
+            buffer = PlayCounterBuffer(flush_size=max(plays // 10, 1), flush_interval=3600)
+            elapsed, final = self._run(threads, plays, lambda: buffer.record(Song, song.pk), song, after=buffer.flush)
+            self._report('buffered', plays, elapsed, final)
+            if final != plays:
+                raise CommandError(f'Buffered counter lost {plays - final} plays')
+        finally:
+            # Not tied to the song by a foreign key; left behind they would be
+            # rolled up into the trending charts
+            PlayEvent.objects.filter(kind='song', object_id=song.pk).delete()
+            song.delete()
+            user.delete()
+
+    def _legacy_play(self, pk):
+        # The pre-buffer code path: read, increment in Python, full-row save
+        song = Song.objects.get(pk=pk)
+        song.play_count += 1
+        song.save()
+
+    def _run(self, threads, plays, play, song, after=None):
+        errors = []
+        lock = threading.Lock()
+
+        def worker(n):
+            try:
+                for _ in range(n):
+                    play()
+            except Exception as exc:
+                with lock:
+                    errors.append(exc)
+            finally:
+                connection.close()
+
+        per_thread = [plays // threads + (1 if i < plays % threads else 0) for i in range(threads)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(worker, per_thread))
+        if after:
+            after()
+        elapsed = time.perf_counter() - start
+        if errors:
+            self.stderr.write(f'{len(errors)} thread(s) failed, first error: {errors[0]!r}')
+        song.refresh_from_db(fields=['play_count'])
+        return elapsed, song.play_count
+
+    def _report(self, label, plays, elapsed, final):
+        self.stdout.write(
+            f'{label:>9}: {plays} plays in {elapsed:.3f}s '
+            f'({plays / elapsed:,.0f} plays/s), stored play_count={final}, lost={plays - final}'
+        )
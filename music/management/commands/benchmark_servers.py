@@ -0,0 +1,260 @@
+import asyncio
+import json
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from music.management.commands.benchmark_endpoints import auth_headers, percentile
+from music.models import Song
+
+# Each server runs as its own single-process subprocess on the same machine.
+# runserver is Django's threaded WSGI server (one thread per connection);
+# uvicorn must be installed for the ASGI side.
+SERVERS = {
+    'wsgi': '{python} manage.py runserver 127.0.0.1:{port} --noreload --nostatic',
+    'asgi': '{python} -m uvicorn chatgpt.asgi:application --host 127.0.0.1 --port {port} --no-access-log',
+}
+
+READ_SIZE = 16 * 1024
+
+
+async def open_request(port, method, path, headers, timeout):
+    """Send one HTTP/1.1 request; return the status and the stream positioned at the body."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+    lines = [f'{method} {path} HTTP/1.1', 'Host: localhost', 'Connection: close', 'Content-Length: 0']
+    lines += [f'{name}: {value}' for name, value in headers.items()]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+    await writer.drain()
+    status_line = await asyncio.wait_for(reader.readline(), timeout)
+    if not status_line:
+        writer.close()
+        raise ConnectionError('Connection closed before a response')
+    while (await asyncio.wait_for(reader.readline(), timeout)) not in (b'\r\n', b''):
+        pass
+    return int(status_line.split()[1]), reader, writer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare WSGI and ASGI serving under concurrent audio listeners: holds --listeners slow '
+        'streams open while timing play and search requests, and reports JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', default='wsgi,asgi')
+        parser.add_argument('--listeners', type=int, default=500, help='Concurrent audio streams held open')
+        parser.add_argument('--listener-rate', type=int, default=32000, help='Bytes/s each listener reads (~256 kbps)')
+        parser.add_argument('--requests', type=int, default=500, help='Timed requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=50, help='Concurrent timed requests')
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--username', default='seed_user_0', help='User to log in as (see seed_catalog)')
+        parser.add_argument('--query', default='midnight river', help='search_results query')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--wsgi-command', default=SERVERS['wsgi'], help='Command line; {python} and {port} are filled in')
+        parser.add_argument('--asgi-command', default=SERVERS['asgi'], help='Command line; {python} and {port} are filled in')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f'User {options["username"]!r} not found; run seed_catalog first or pass --username')
+        servers = [name.strip() for name in options['servers'].split(',') if name.strip()]
+        unknown = set(servers) - set(SERVERS)
+        if unknown:
+            raise CommandError(f'Unknown servers: {", ".join(sorted(unknown))}')
+
+        self.random = random.Random(options['seed'])
+        self.song_ids = self._streamable_song_ids()
+        self.headers = auth_headers(user)
+        self.search_path = reverse('music:search_results') + '?q=' + '+'.join(options['query'].split())
+        self._raise_fd_limit()
+
+        results = {}
+        for name in servers:
+            command = options[f'{name}_command'].format(python=shlex.quote(sys.executable), port=options['port'])
+            self.stderr.write(f'Benchmarking {name}: {command}')
+            process = subprocess.Popen(
+                shlex.split(command), cwd=settings.BASE_DIR,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                self._wait_for_port(options['port'], process, options['timeout'])
+                results[name] = {'command': command, **asyncio.run(self._run(options))}
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+        report = {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'listeners': options['listeners'],
+                'listener_rate': options['listener_rate'],
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'cpu_count': os.cpu_count(),
+            },
+            'servers': results,
+        }
+        payload = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as out:
+                out.write(payload + '\n')
+            self.stderr.write(f'Wrote {options["output"]}')
+        else:
+            self.stdout.write(payload)
+
+    def _streamable_song_ids(self):
+        ids = []
+        for song in Song.objects.order_by('-pk').only('audio_file')[:1000].iterator():
+            if song.audio_file and os.path.exists(song.audio_file.path):
+                ids.append(song.pk)
+                if len(ids) >= 100:
+                    break
+        if not ids:
+            raise CommandError('No song has its audio file on disk; upload or import_catalog some first')
+        return ids
+
+    def _raise_fd_limit(self):
+        # Every listener is a socket on both ends; the servers inherit the limit
+        try:
+            import resource
+        except ImportError:
+            return
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY and (hard == resource.RLIM_INFINITY or soft < hard):
+            try:
+                resource.setrlimit(resource.RLIMIT_NOFILE, (hard if hard != resource.RLIM_INFINITY else 65536, hard))
+            except (ValueError, OSError):
+                pass
+
+    def _wait_for_port(self, port, process, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'Server exited with status {process.returncode}; is it installed?')
+            try:
+                with socket.create_connection(('127.0.0.1', port), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'Server did not start listening on port {port}')
+
+    async def _run(self, options):
+        port, timeout = options['port'], options['timeout']
+        stop = asyncio.Event()
+        listeners = {'connected': 0, 'failed': 0, 'bytes': 0, 'connect_latencies': []}
+
+        async def listen():
+            # Reconnect when a track ends, so the number of open streams stays constant
+            while not stop.is_set():
+                path = reverse('music:stream_song', args=[self.random.choice(self.song_ids)])
+                start = time.perf_counter()
+                try:
+                    status, reader, writer = await open_request(port, 'GET', path, self.headers, timeout)
+                except (OSError, asyncio.TimeoutError, ConnectionError, ValueError):
+                    listeners['failed'] += 1
+                    await asyncio.sleep(1)
+                    continue
+                listeners['connect_latencies'].append(time.perf_counter() - start)
+                try:
+                    if status >= 400:
+                        listeners['failed'] += 1
+                        await asyncio.sleep(1)
+                        continue
+                    listeners['connected'] += 1
+                    while not stop.is_set():
+                        data = await reader.read(READ_SIZE)
+                        if not data:
+                            break
+                        listeners['bytes'] += len(data)
+                        await asyncio.sleep(len(data) / options['listener_rate'])
+                except OSError:
+                    listeners['failed'] += 1
+                finally:
+                    writer.close()
+
+        listener_tasks = [asyncio.create_task(listen()) for _ in range(options['listeners'])]
+        # Let the streams open before timing anything
+        deadline = time.monotonic() + timeout
+        while len(listeners['connect_latencies']) + listeners['failed'] < options['listeners'] and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+        endpoints = {
+            'increment_play_count': ('POST', lambda: reverse('music:increment_play_count', args=[self.random.choice(self.song_ids)])),
+            'search_results': ('GET', lambda: self.search_path),
+        }
+        measured = {}
+        for name, (method, path) in endpoints.items():
+            measured[name] = await self._measure(port, method, path, options)
+
+        stop.set()
+        for task in listener_tasks:
+            task.cancel()
+        await asyncio.gather(*listener_tasks, return_exceptions=True)
+
+        connect = sorted(listeners['connect_latencies'])
+        return {
+            'listeners': {
+                'requested': options['listeners'],
+                'streams_opened': listeners['connected'],
+                'failures': listeners['failed'],
+                'megabytes_streamed': round(listeners['bytes'] / 1024 ** 2, 1),
+                'connect_p50_ms': _ms(percentile(connect, 50)),
+                'connect_p95_ms': _ms(percentile(connect, 95)),
+            },
+            'endpoints': measured,
+        }
+
+    async def _measure(self, port, method, path, options):
+        total, timeout = options['requests'], options['timeout']
+        latencies, errors = [], []
+        remaining = iter(range(total))
+
+        async def worker():
+            for _ in remaining:
+                url = path()
+                start = time.perf_counter()
+                try:
+                    status, reader, writer = await open_request(port, method, url, self.headers, timeout)
+                    try:
+                        await asyncio.wait_for(reader.read(), timeout)
+                    finally:
+                        writer.close()
+                except (OSError, asyncio.TimeoutError, ConnectionError, ValueError) as exc:
+                    errors.append(repr(exc))
+                    continue
+                latencies.append(time.perf_counter() - start)
+                if status >= 400:
+                    errors.append(f'HTTP {status} {url}')
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, options['concurrency']))))
+        wall = time.perf_counter() - started
+        latencies.sort()
+        return {
+            'requests': total,
+            'errors': len(errors),
+            'first_errors': errors[:5],
+            'p50_ms': _ms(percentile(latencies, 50)),
+            'p95_ms': _ms(percentile(latencies, 95)),
+            'p99_ms': _ms(percentile(latencies, 99)),
+            'throughput_rps': round(total / wall, 1) if wall else None,
+        }
+
+
+def _ms(value):
+    return None if value is None else round(value * 1000, 3)
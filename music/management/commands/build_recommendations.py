@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from music import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Ingest new plays and refresh the up-next neighbour lists of songs that changed (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every song instead of only those with new plays')
+        parser.add_argument('--k', type=int, default=None, help='Neighbours kept per song (default: MUSIC_RECOMMENDATION_NEIGHBORS)')
+        parser.add_argument('--block-size', type=int, default=recommendations.DEFAULT_BLOCK_SIZE,
+                            help='Songs whose similarities are computed together')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        songs = recommendations.build(full=options['full'], block_size=options['block_size'], k=options['k'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed neighbours for {songs} songs in {time.perf_counter() - start:.2f}s'
+        ))
@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from music import waveforms
+from music.models import Episode, Song
+
+
+class Command(BaseCommand):
+    help = 'Precompute waveform peaks for songs and episodes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild peaks that already exist')
+        parser.add_argument('--workers', type=int, default=2, help='Concurrent decodes (ffmpeg runs out of process)')
+
+    def handle(self, *args, **options):
+        jobs = []
+        for kind, model in (('song', Song), ('episode', Episode)):
+            for obj in model.objects.only('pk', 'audio_file', 'duration').iterator():
+                if options['all'] or waveforms.existing_version(kind, obj) is None:
+                    jobs.append((kind, obj))
+
+        def run(job):
+            kind, obj = job
+            try:
+                waveforms.build(kind, obj)
+                return None
+            except (waveforms.WaveformError, OSError, ValueError) as exc:
+                return f'{kind} {obj.pk}: {exc}'
+
+        failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for error in pool.map(run, jobs):
+                if error:
+                    failed += 1
+                    self.stderr.write(error)
+
+        self.stdout.write(self.style.SUCCESS(f'Built waveforms for {len(jobs) - failed} item(s), {failed} failed'))
@@ -0,0 +1,156 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from music.models import Episode, ListeningPosition, Podcast, Song
+
+# Ceiling on SQL queries per request. Authenticated pages include the session
+# and user lookups. The stricter check is that the count is identical for the
+# small and large seeded datasets, i.e. it does not grow with the rows.
+BUDGETS = {
+    'home': 10,
+    'discover': 8,
+    'discover_feed_songs': 6,
+    'discover_feed_podcasts': 6,
+    'podcasts': 6,
+    'search_results': 10,
+    'song_detail': 8,
+    'podcast_detail': 10,
+    'episode_detail': 6,
+    'my_songs': 6,
+    'my_podcasts': 6,
+    # Play endpoints include the resume position lookup
+    'increment_play_count': 5,
+    'increment_episode_play_count': 5,
+    'player_metadata': 4,
+    'continue_listening': 6,
+    'listening_history': 6,
+    # One values() query each; ?fields= only changes the columns and joins
+    'catalog_songs': 3,
+    'catalog_podcasts': 3,
+    'catalog_episodes': 3,
+    'catalog_creators': 3,
+    'catalog_song_detail': 3,
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Check that music views run a bounded, row-count-independent number of SQL queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--small', type=int, default=3, help='Rows per creator in the small dataset')
+        parser.add_argument('--large', type=int, default=40, help='Rows per creator in the large dataset')
+
+    def handle(self, *args, **options):
+        # Private local-memory cache so fragment cache hits don't hide queries
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'query-budgets'}}):
+            small = self._measure(options['small'])
+            large = self._measure(options['large'])
+
+        failures = []
+        for name, budget in BUDGETS.items():
+            line = f'{name:<30} small={small[name]:>3}  large={large[name]:>3}  budget={budget:>3}'
+            if large[name] != small[name]:
+                failures.append(f'{name}: query count grows with rows ({small[name]} -> {large[name]})')
+                line += '  GROWS'
+            elif large[name] > budget:
+                failures.append(f'{name}: {large[name]} queries, budget is {budget}')
+                line += '  OVER'
+            self.stdout.write(line)
+
+        if failures:
+            raise CommandError('Query budget check failed:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('All views are within their query budgets'))
+
+    def _measure(self, per_creator):
+        counts = {}
+        # Start cold: per-user entries (e.g. unread counts) must not leak between runs
+        cache.clear()
+        try:
+            with transaction.atomic():
+                song, podcast, episode, listener = self._seed(per_creator)
+                client = Client(HTTP_HOST='localhost')
+                client.force_login(listener)
+
+                requests = {
+                    'home': ('get', reverse('music:home'), {}),
+                    'discover': ('get', reverse('music:discover'), {}),
+                    'discover_feed_songs': ('get', reverse('music:discover_feed'), {'kind': 'songs'}),
+                    'discover_feed_podcasts': ('get', reverse('music:discover_feed'), {'kind': 'podcasts'}),
+                    'podcasts': ('get', reverse('music:podcasts'), {}),
+                    'search_results': ('get', reverse('music:search_results'), {'q': 'budget'}),
+                    'song_detail': ('get', reverse('music:song_detail', args=[song.pk]), {}),
+                    'podcast_detail': ('get', reverse('music:podcast_detail', args=[podcast.pk]), {}),
+                    'episode_detail': ('get', reverse('music:episode_detail', args=[episode.pk]), {}),
+                    'my_songs': ('get', reverse('music:my_songs'), {}),
+                    'my_podcasts': ('get', reverse('music:my_podcasts'), {}),
+                    'increment_play_count': ('post', reverse('music:increment_play_count', args=[song.pk]), {}),
+                    'increment_episode_play_count': ('post', reverse('music:increment_episode_play_count', args=[episode.pk]), {}),
+                    'continue_listening': ('get', reverse('music:continue_listening'), {}),
+                    'listening_history': ('get', reverse('music:listening_history'), {}),
+                    'player_metadata': ('get', reverse('music:player_metadata'), {'songs': str(song.pk), 'episodes': str(episode.pk)}),
+                    'catalog_songs': ('get', reverse('music:catalog_list', args=['songs']), {'fields': 'title,creator,play_count'}),
+                    'catalog_podcasts': ('get', reverse('music:catalog_list', args=['podcasts']), {'fields': 'title,host,episode_count'}),
+                    'catalog_episodes': ('get', reverse('music:catalog_list', args=['episodes']), {'fields': 'title,podcast,cover_url'}),
+                    'catalog_creators': ('get', reverse('music:catalog_list', args=['creators']), {}),
+                    'catalog_song_detail': ('get', reverse('music:catalog_detail', args=['songs', song.pk]), {'fields': 'title,play_count'}),
+                }
+                for name, (method, url, data) in requests.items():
+                    # Seeding alone can fill the bounded queries_log (9000 entries);
+                    # once it is full CaptureQueriesContext counts 0, so start empty
+                    reset_queries()
+                    with CaptureQueriesContext(connection) as queries:
+                        response = getattr(client, method)(url, data)
+                    if response.status_code >= 400:
+                        raise CommandError(f'{name} returned HTTP {response.status_code}')
+                    counts[name] = len(queries)
+                raise Rollback
+        except Rollback:
+            pass
+        return counts
+
+    def _seed(self, per_creator):
+        listener = User.objects.create_user('budget_listener', password='budget-listener')
+        creators = User.objects.bulk_create(
+            User(username=f'budget_creator_{i}', first_name='Budget') for i in range(per_creator)
+        )
+        # The listener owns rows too, so the "my_*" pages have something to render
+        owners = creators + [listener]
+        songs = [
+            Song(title=f'Budget song {i}', artist=f'Budget artist {i}', genre='Pop',
+                 audio_file=f'songs/budget_{i}.mp3', uploaded_by=owner)
+            for owner in owners for i in range(per_creator)
+        ]
+        for song in songs:
+            song.save()  # save() rather than bulk_create so search/creator signals run
+        podcasts = [
+            Podcast.objects.create(title=f'Budget podcast {i}', description='Budget', host=owner)
+            for owner in owners for i in range(max(per_creator // 2, 1))
+        ]
+        Episode.objects.bulk_create(
+            Episode(title=f'Budget episode {i}', description='Budget', audio_file=f'episodes/budget_{i}.mp3', podcast=podcast)
+            for podcast in podcasts for i in range(per_creator)
+        )
+        episodes = list(Episode.objects.filter(podcast__in=podcasts))
+        # Listening history that grows with the dataset. recent() runs one query
+        # per kind present in the page, so alternate songs and episodes by
+        # time: every page then holds both, whatever the dataset size.
+        now = timezone.now()
+        ListeningPosition.objects.bulk_create(
+            ListeningPosition(user=listener, kind=kind, object_id=obj.pk, position=60,
+                              updated_at=now - timedelta(seconds=2 * i + offset))
+            for offset, (kind, objects) in enumerate((('song', songs), ('episode', episodes)))
+            for i, obj in enumerate(objects)
+        )
+        return songs[0], podcasts[0], Episode.objects.filter(podcast=podcasts[0]).first(), listener
@@ -0,0 +1,63 @@
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+# Pages rendered with the collected, hashed assets; between them they use
+# every template that loads static files
+PAGES = (
+    ('home', 'music:home', False),
+    ('discover', 'music:discover', False),
+    ('podcasts', 'music:podcasts', False),
+    ('search_results', 'music:search_results', False),
+    ('home (signed in)', 'music:home', True),
+    ('my_songs', 'music:my_songs', True),
+    ('my_podcasts', 'music:my_podcasts', True),
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Run collectstatic into a temporary STATIC_ROOT and render pages with DEBUG off'
+
+    def handle(self, *args, **options):
+        failures = []
+        with tempfile.TemporaryDirectory() as static_root:
+            # Changing STATIC_ROOT resets staticfiles_storage, so collectstatic
+            # and the page renders below share the freshly built manifest
+            with override_settings(DEBUG=False, STATIC_ROOT=static_root, MUSIC_STATIC_BUNDLED=True):
+                call_command('collectstatic', interactive=False, verbosity=0)
+                try:
+                    with transaction.atomic():
+                        failures = self._render()
+                        raise Rollback
+                except Rollback:
+                    pass
+
+        if failures:
+            raise CommandError('Pages failed with the collected static files:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('All pages render with the collected static files'))
+
+    def _render(self):
+        failures = []
+        user = User.objects.create_user('static_build_check', password='static-build-check')
+        anonymous = Client(HTTP_HOST='localhost', raise_request_exception=False)
+        signed_in = Client(HTTP_HOST='localhost', raise_request_exception=False)
+        signed_in.force_login(user)
+        for name, viewname, login in PAGES:
+            client = signed_in if login else anonymous
+            response = client.get(reverse(viewname), {'q': 'static'} if name == 'search_results' else {})
+            line = f'{name:<20} HTTP {response.status_code}'
+            if response.status_code >= 500:
+                failures.append(line)
+                line += '  FAILED'
+            self.stdout.write(line)
+        return failures
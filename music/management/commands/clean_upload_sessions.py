@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from music import uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked upload sessions (and their part files) that have been idle too long'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Idle time after which a session is abandoned')
+
+    def handle(self, *args, **options):
+        removed = uploads.expire(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} abandoned upload sessions'))
@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from music import fragment_cache, storage
+from music.models import Blob
+from music.signals import FILE_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'Move files stored before content addressing into deduplicated blobs, and prune unreferenced blobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be moved')
+        parser.add_argument('--prune-after', type=int, default=24,
+                            help='Delete unreferenced blobs older than this many hours (0 disables)')
+
+    def handle(self, *args, **options):
+        moved = moved_bytes = freed = 0
+        for sender, fields in FILE_FIELDS.items():
+            model = apps.get_model(sender) if isinstance(sender, str) else sender
+            for field_name in fields:
+                field = model._meta.get_field(field_name)
+                m, b, f = self._migrate_field(model, field, options['dry_run'])
+                moved += m
+                moved_bytes += b
+                freed += f
+
+        pruned = 0
+        if options['prune_after'] and not options['dry_run']:
+            cutoff = timezone.now() - timedelta(hours=options['prune_after'])
+            for name in Blob.objects.filter(refcount=0, created_at__lt=cutoff).values_list('name', flat=True):
+                storage.delete_if_unreferenced(name)
+                pruned += 1
+
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {moved} files ({moved_bytes / 1024 / 1024:.1f} MB) into blobs, '
+            f'{freed / 1024 / 1024:.1f} MB freed as duplicates; pruned {pruned} unreferenced blobs'
+        ))
+
+    def _migrate_field(self, model, field, dry_run):
+        moved = moved_bytes = freed = 0
+        legacy = (
+            model.objects.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+            .order_by().values_list(field.name, flat=True).distinct()
+        )
+        for name in legacy.iterator():
+            # Field defaults (e.g. the stock profile image) are shared and never moved
+            if storage.is_content_addressed(name) or name == field.default or not default_storage.exists(name):
+                continue
+            size = default_storage.size(name)
+            moved += 1
+            moved_bytes += size
+            if dry_run:
+                continue
+            with default_storage.open(name, 'rb') as source:
+                new_name = default_storage.save(name, source)
+            # save() has already claimed one reference; any other means the
+            # content was stored before and this copy is freed
+            duplicate = Blob.objects.filter(name=new_name, refcount__gt=1).exists()
+            with transaction.atomic():
+                count = model.objects.filter(**{field.name: name}).update(**{field.name: new_name})
+                storage.retain(new_name, count)
+            # update() sends no post_save; the media URLs of these rows changed
+            fragment_cache.bump_model(model)
+            default_storage.delete(name)
+            if duplicate:
+                freed += size
+            self.stdout.write(f'{model._meta.label}.{field.name}: {name} -> {new_name} ({count} rows)')
+        return moved, moved_bytes, freed
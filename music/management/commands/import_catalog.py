@@ -0,0 +1,189 @@
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django import forms
+from django.contrib.auth.models import User
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from music import creators, fragment_cache, search, storage
+from music.audio_metadata import AudioMetadataError, apply_metadata, extract_metadata_from_path
+from music.forms import validate_audio_file
+from music.models import ImportCheckpoint, Song
+
+# Model fields filled from the file's tags when the manifest leaves them blank
+TAG_FIELDS = ('title', 'artist', 'album', 'genre')
+
+
+def read_manifest(path):
+    """Yield manifest records one at a time, as dicts, or the exception for a bad JSONL line."""
+    with open(path, newline='', encoding='utf-8-sig') as manifest:
+        if path.lower().endswith('.jsonl'):
+            for line in manifest:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as exc:
+                    yield exc
+        else:
+            yield from csv.DictReader(manifest)
+
+
+class Command(BaseCommand):
+    help = 'Import songs from a CSV/JSONL manifest and a directory of audio files, resumably'
+
+    def add_arguments(self, parser):
+        parser.add_argument('manifest', help='CSV or .jsonl with file, title, artist, album, genre per record')
+        parser.add_argument('audio_dir', help='Directory that manifest "file" paths are relative to')
+        parser.add_argument('--uploader', required=True, help='Username the songs are uploaded as')
+        parser.add_argument('--workers', type=int, default=8, help='Threads copying files')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+
+    def handle(self, *args, **options):
+        manifest = os.path.abspath(options['manifest'])
+        self.audio_dir = os.path.abspath(options['audio_dir'])
+        if not os.path.isfile(manifest):
+            raise CommandError(f'Manifest not found: {manifest}')
+        if not os.path.isdir(self.audio_dir):
+            raise CommandError(f'Audio directory not found: {self.audio_dir}')
+        uploader = User.objects.filter(username=options['uploader']).first()
+        if uploader is None:
+            raise CommandError(f'User {options["uploader"]!r} not found')
+
+        state = self._load_checkpoint(manifest, options['restart'])
+        if state.done:
+            self.stdout.write(f'Resuming after record {state.done}')
+
+        batch = []
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for number, record in enumerate(read_manifest(manifest), 1):
+                if number <= state.done:
+                    continue
+                batch.append((number, record))
+                if len(batch) >= options['batch_size']:
+                    self._import_batch(pool, uploader, batch, state)
+                    batch = []
+            if batch:
+                self._import_batch(pool, uploader, batch, state)
+
+        if state.imported:
+            fragment_cache.bump('song')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {state.imported} songs, rejected {state.rejected} records '
+            f'({state.done} records processed)'
+        ))
+
+    def _load_checkpoint(self, manifest, restart):
+        # The checkpoint row is saved in the same transaction as each batch,
+        # so a crash can never leave committed songs it doesn't account for
+        size = os.path.getsize(manifest)
+        state, created = ImportCheckpoint.objects.get_or_create(manifest=manifest, defaults={'size': size})
+        if restart and not created:
+            state.size, state.done, state.imported, state.rejected = size, 0, 0, 0
+            state.save()
+        elif state.size != size:
+            raise CommandError(f'{manifest} changed since the last run; pass --restart')
+        return state
+
+    def _reject(self, number, reason, state):
+        state.rejected += 1
+        self.stderr.write(f'Record {number}: {reason}')
+
+    def _validate(self, number, record, state):
+        """Return the source path for a usable record, or None after reporting why not."""
+        if isinstance(record, Exception):
+            self._reject(number, f'invalid JSON ({record})', state)
+            return None
+        relative = (record.get('file') or '').strip()
+        if not relative:
+            self._reject(number, 'no "file" given', state)
+            return None
+        source = os.path.normpath(os.path.join(self.audio_dir, relative))
+        if not source.startswith(self.audio_dir + os.sep):
+            self._reject(number, f'{relative} is outside the audio directory', state)
+            return None
+        try:
+            validate_audio_file(File(None, name=source))
+        except forms.ValidationError:
+            self._reject(number, f'{relative} is not an mp3, wav, ogg, m4a or flac file', state)
+            return None
+        if not os.path.isfile(source):
+            self._reject(number, f'{relative} does not exist', state)
+            return None
+        return source
+
+    def _copy(self, job):
+        # Runs on a pool thread: the content-addressed storage hashes and
+        # stores the file (a file copied before an interruption, or identical
+        # to an existing upload, is not written again). Saving takes a blob
+        # reference; give it back here and retain it in the batch transaction
+        # instead, so a batch that never commits holds no reference.
+        number, record, source = job
+        try:
+            with open(source, 'rb') as src:
+                name = default_storage.save(f'songs/{os.path.basename(source)}', File(src))
+            storage.unclaim(name)
+        except OSError as exc:
+            return number, record, source, None, None, exc
+        finally:
+            connections.close_all()
+        try:
+            meta = extract_metadata_from_path(default_storage.path(name))
+        except (AudioMetadataError, OSError):
+            meta = None
+        return number, record, source, name, meta, None
+
+    def _import_batch(self, pool, uploader, batch, state):
+        jobs = []
+        for number, record in batch:
+            source = self._validate(number, record, state)
+            if source is not None:
+                jobs.append((number, record, source))
+
+        songs, sources = [], []
+        for number, record, source, name, meta, error in pool.map(self._copy, jobs):
+            if error is not None:
+                self._reject(number, f'{os.path.relpath(source, self.audio_dir)} could not be copied ({error})', state)
+                continue
+            song = Song(
+                title=(record.get('title') or '').strip()[:200],
+                artist=(record.get('artist') or '').strip()[:200],
+                album=(record.get('album') or '').strip()[:200],
+                genre=(record.get('genre') or '').strip()[:100],
+                audio_file=name,
+                uploaded_by=uploader,
+            )
+            if meta is not None:
+                apply_metadata(song, meta, fill_tags=TAG_FIELDS)
+            song.title = song.title or os.path.splitext(os.path.basename(source))[0]
+            song.artist = song.artist or 'Unknown artist'
+            songs.append(song)
+            sources.append(source)
+
+        # bulk_create skips the Song signals, so do their bookkeeping here.
+        # The blob references are taken in this transaction, so they are
+        # rolled back with the songs if it never commits.
+        with transaction.atomic():
+            for song, source in zip(songs, sources):
+                if not default_storage.exists(song.audio_file.name):
+                    # Unreferenced since the copy, and deleted with the last
+                    # release of identical content: store it again
+                    with open(source, 'rb') as src:
+                        song.audio_file = default_storage.save(f'songs/{os.path.basename(source)}', File(src))
+                storage.retain(song.audio_file.name)
+            Song.objects.bulk_create(songs)
+            if songs:
+                creators.add_song(uploader.pk, len(songs))
+                for song in songs:
+                    if song.pk is not None:
+                        search.index_object(search.SONG, song)
+            state.imported += len(songs)
+            state.done = batch[-1][0]
+            state.save()
+        self.stdout.write(f'{state.done} records processed, {state.imported} imported')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from music import telemetry
+
+
+class Command(BaseCommand):
+    help = 'Delete player telemetry events older than MUSIC_TELEMETRY_RETENTION_DAYS (run daily)'
+
+    def handle(self, *args, **options):
+        deleted = telemetry.prune()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} telemetry events'))
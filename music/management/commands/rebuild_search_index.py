@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from music import search
+
+
+class Command(BaseCommand):
+    help = 'Drop and rebuild the FTS5 search index for songs, podcasts and users'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The search index requires SQLite with FTS5; other databases use the icontains fallback.')
+        with transaction.atomic():
+            total = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} rows into {search.TABLE}'))
@@ -0,0 +1,156 @@
+import random
+import time
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from music import creators, follows, search
+from music.models import Episode, Podcast, Song
+
+WORDS = (
+    'midnight', 'river', 'neon', 'summer', 'echo', 'velvet', 'gravity', 'paper', 'golden', 'static',
+    'ocean', 'signal', 'ember', 'harbor', 'crystal', 'shadow', 'satellite', 'honey', 'thunder', 'violet',
+    'highway', 'lantern', 'orbit', 'wild', 'silver', 'garden', 'fever', 'atlas', 'cinder', 'horizon',
+)
+
+GENRES = ('Pop', 'Rock', 'Hip Hop', 'Jazz', 'Electronic', 'Classical', 'R&B', 'Country', 'Folk', 'Metal')
+
+SEED_PASSWORD = 'seed-password'
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic catalog of users, songs, podcasts, episodes and follows with bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--creator-ratio', type=float, default=0.1,
+                            help='Fraction of users that upload songs and host podcasts')
+        parser.add_argument('--songs', type=int, default=10000)
+        parser.add_argument('--podcasts', type=int, default=500)
+        parser.add_argument('--episodes', type=int, default=5000)
+        parser.add_argument('--follows', type=int, default=20, help='Creators followed per user')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='seed', help='Username prefix; must not be in use yet')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for reproducible catalogs')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f'Users prefixed "{prefix}_" already exist; pass another --prefix')
+        if options['users'] < 2:
+            raise CommandError('--users must be at least 2')
+
+        started = time.perf_counter()
+        user_ids = self._seed_users(prefix, options['users'])
+        creator_ids = user_ids[:max(1, int(len(user_ids) * options['creator_ratio']))]
+        self._seed_profiles(user_ids)
+        self._seed_songs(creator_ids, options['songs'])
+        podcast_ids = self._seed_podcasts(creator_ids, options['podcasts'])
+        self._seed_episodes(podcast_ids, options['episodes'])
+        self._seed_follows(user_ids, creator_ids, options['follows'])
+
+        # Bulk inserts skip the model signals; rebuild what they would have maintained
+        self._step('Rebuilding creator pool', creators.rebuild)
+        self._step('Rebuilding follow counts', follows.rebuild)
+        if connection.vendor == 'sqlite':
+            self._step('Rebuilding search index', search.rebuild)
+        self.stdout.write(self.style.SUCCESS(f'Seeded catalog in {time.perf_counter() - started:.1f}s '
+                                             f'(log in as {prefix}_user_0 / {SEED_PASSWORD})'))
+
+    def _step(self, label, func):
+        start = time.perf_counter()
+        with transaction.atomic():
+            func()
+        self.stdout.write(f'{label}: {time.perf_counter() - start:.1f}s')
+
+    def _insert(self, label, model, objects, total):
+        """bulk_create ``objects`` (a generator) in batches, one transaction per batch."""
+        start = time.perf_counter()
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                with transaction.atomic():
+                    model.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'{label}: {total:,} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f}/s)')
+
+    def _title(self, words=3):
+        return ' '.join(self.random.choice(WORDS) for _ in range(words)).title()
+
+    def _seed_users(self, prefix, count):
+        # Hashing once keeps seeding fast; every seeded user shares the password
+        password = make_password(SEED_PASSWORD)
+        self._insert('Users', User, (
+            User(username=f'{prefix}_user_{n}', first_name=self.random.choice(WORDS).title(), password=password)
+            for n in range(count)
+        ), count)
+        return list(
+            User.objects.filter(username__startswith=f'{prefix}_user_').order_by('pk').values_list('pk', flat=True)
+        )
+
+    def _seed_profiles(self, user_ids):
+        Profile = apps.get_model('users', 'Profile')
+        self._insert('Profiles', Profile, (Profile(user_id=user_id) for user_id in user_ids), len(user_ids))
+
+    def _seed_songs(self, creator_ids, count):
+        self._insert('Songs', Song, (
+            Song(
+                title=self._title(),
+                artist=self._title(2),
+                album=self._title(2),
+                genre=self.random.choice(GENRES),
+                audio_file=f'songs/seed_{n}.mp3',
+                uploaded_by_id=self.random.choice(creator_ids),
+                duration=self.random.uniform(90, 420),
+            )
+            for n in range(count)
+        ), count)
+
+    def _seed_podcasts(self, creator_ids, count):
+        first = Podcast.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        self._insert('Podcasts', Podcast, (
+            Podcast(title=self._title(), description=self._title(12), host_id=self.random.choice(creator_ids))
+            for _ in range(count)
+        ), count)
+        return list(Podcast.objects.filter(pk__gt=first).values_list('pk', flat=True))
+
+    def _seed_episodes(self, podcast_ids, count):
+        if not podcast_ids:
+            return
+        self._insert('Episodes', Episode, (
+            Episode(
+                title=self._title(),
+                description=self._title(12),
+                audio_file=f'episodes/seed_{n}.mp3',
+                podcast_id=self.random.choice(podcast_ids),
+                duration=self.random.uniform(600, 5400),
+            )
+            for n in range(count)
+        ), count)
+
+    def _seed_follows(self, user_ids, creator_ids, per_user):
+        Profile = apps.get_model('users', 'Profile')
+        Follow = follows.follow_model()
+        profile_of = dict(Profile.objects.filter(user_id__in=creator_ids).values_list('user_id', 'pk'))
+        per_user = min(per_user, len(creator_ids) - 1)
+        if per_user <= 0:
+            return
+
+        def rows():
+            for user_id in user_ids:
+                # One spare pick so skipping the user themself still leaves per_user
+                picks = [c for c in self.random.sample(creator_ids, per_user + 1) if c != user_id]
+                for creator_id in picks[:per_user]:
+                    yield Follow(profile_id=profile_of[creator_id], user_id=user_id)
+
+        self._insert('Follows', Follow, rows(), len(user_ids) * per_user)
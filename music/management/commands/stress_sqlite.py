@@ -0,0 +1,134 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+
+from music import sqlite
+from music.management.commands.benchmark_endpoints import percentile
+from music.models import Song, TelemetryEvent
+from music.write_queue import writer
+
+# Rows written by the stress test carry this receive time and are deleted afterwards
+MARKER = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer the database with concurrent readers and writers and count "database is locked" '
+        'errors, writing directly and through the single-writer queue'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=16)
+        parser.add_argument('--writers', type=int, default=16)
+        parser.add_argument('--seconds', type=float, default=10.0, help='Duration of each mode')
+        parser.add_argument('--modes', default='direct,queue', help='direct: each thread commits its own writes; queue: via music.write_queue')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This stress test is for the SQLite backend')
+        modes = [m.strip() for m in options['modes'].split(',') if m.strip()]
+        if set(modes) - {'direct', 'queue'}:
+            raise CommandError('--modes takes direct and/or queue')
+
+        self.song_ids = list(Song.objects.values_list('pk', flat=True)[:1000]) or [1]
+        self.stdout.write(f'PRAGMAs: {sqlite.current(connection)}')
+        failed = False
+        try:
+            for mode in modes:
+                result = self._run(mode, options)
+                self.stdout.write(
+                    f'{mode:<7} reads={result["reads"]:>7} ({result["reads_per_s"]:.0f}/s, p95 {result["read_p95_ms"]} ms)  '
+                    f'writes={result["writes"]:>7} ({result["writes_per_s"]:.0f}/s, p95 {result["write_p95_ms"]} ms)  '
+                    f'lock_errors={result["lock_errors"]}  other_errors={result["other_errors"]}'
+                )
+                for error in result['first_errors']:
+                    self.stdout.write(f'        {error}')
+                failed = failed or result['lock_errors'] > 0 or result['other_errors'] > 0
+        finally:
+            deleted, _ = TelemetryEvent.objects.filter(received_at=MARKER).delete()
+            self.stdout.write(f'Removed {deleted} stress rows')
+        if failed:
+            raise CommandError('Errors under concurrent load')
+        self.stdout.write(self.style.SUCCESS('No lock errors'))
+
+    def _write(self, rng):
+        song_id = rng.choice(self.song_ids)
+        # Its own transaction either way, like a flush (see music/write_queue.py)
+        with transaction.atomic():
+            TelemetryEvent.objects.create(
+                action='progress', kind='song', object_id=song_id, position=rng.random() * 300,
+                occurred_at=MARKER, received_at=MARKER,
+            )
+            # A no-op update still needs the write lock, like a play count flush
+            Song.objects.filter(pk=song_id).update(play_count=F('play_count'))
+
+    def _read(self, rng):
+        list(Song.objects.order_by('-upload_date', '-id').values_list('pk', 'title')[:20])
+        Song.objects.filter(pk=rng.choice(self.song_ids)).values('title', 'play_count').first()
+
+    def _run(self, mode, options):
+        stop = threading.Event()
+        lock = threading.Lock()
+        totals = {'reads': [], 'writes': [], 'lock_errors': 0, 'other_errors': 0, 'first_errors': []}
+
+        def record_error(exc):
+            with lock:
+                if isinstance(exc, OperationalError) and 'locked' in str(exc):
+                    totals['lock_errors'] += 1
+                else:
+                    totals['other_errors'] += 1
+                if len(totals['first_errors']) < 5:
+                    totals['first_errors'].append(repr(exc))
+
+        def loop(kind, seed):
+            rng = random.Random(seed)
+            latencies = []
+            try:
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    try:
+                        if kind == 'reads':
+                            self._read(rng)
+                        elif mode == 'queue':
+                            writer.call(self._write, rng)
+                        else:
+                            self._write(rng)
+                    except Exception as exc:
+                        record_error(exc)
+                        continue
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                with lock:
+                    totals[kind].extend(latencies)
+                connection.close()
+
+        threads = [
+            threading.Thread(target=loop, args=('reads', options['seed'] + i)) for i in range(options['readers'])
+        ] + [
+            threading.Thread(target=loop, args=('writes', options['seed'] + 1000 + i)) for i in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        reads, writes = sorted(totals['reads']), sorted(totals['writes'])
+        return {
+            'reads': len(reads),
+            'writes': len(writes),
+            'reads_per_s': len(reads) / options['seconds'],
+            'writes_per_s': len(writes) / options['seconds'],
+            'read_p95_ms': round(percentile(reads, 95) * 1000, 2) if reads else None,
+            'write_p95_ms': round(percentile(writes, 95) * 1000, 2) if writes else None,
+            'lock_errors': totals['lock_errors'],
+            'other_errors': totals['other_errors'],
+            'first_errors': totals['first_errors'],
+        }
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from music import charts
+
+
+class Command(BaseCommand):
+    help = 'Roll up new play events, update trending scores and rebuild the charts (run periodically)'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        events, built = charts.update()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rolled up {events} plays and rebuilt {built} charts in {time.perf_counter() - start:.2f}s'
+        ))
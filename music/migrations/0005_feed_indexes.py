@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0004_podcast_episode'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(fields=['-upload_date', '-id'], name='music_song_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='podcast',
+            index=models.Index(fields=['-created_at', '-id'], name='music_podcast_feed_idx'),
+        ),
+    ]
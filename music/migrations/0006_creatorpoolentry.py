@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-17 10:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_creator_pool(apps, schema_editor):
+    Song = apps.get_model('music', 'Song')
+    CreatorPoolEntry = apps.get_model('music', 'CreatorPoolEntry')
+    counts = (
+        Song.objects.order_by().values('uploaded_by').annotate(n=models.Count('pk')).order_by('uploaded_by')
+    )
+    CreatorPoolEntry.objects.bulk_create(
+        CreatorPoolEntry(user_id=row['uploaded_by'], slot=slot, song_count=row['n'])
+        for slot, row in enumerate(counts)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0005_feed_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreatorPoolEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveIntegerField(unique=True)),
+                ('song_count', models.PositiveIntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='creator_pool_entry', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(build_creator_pool, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0 on 2026-10-17 11:30
+
+from django.db import OperationalError, migrations
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS music_search USING fts5("
+    "title, subtitle, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+POPULATE_SQL = [
+    "INSERT INTO music_search(rowid, title, subtitle, body) "
+    "SELECT id * 4 + 1, title, artist, genre || ' ' || album FROM music_song",
+    "INSERT INTO music_search(rowid, title, subtitle, body) "
+    "SELECT id * 4 + 2, title, '', description FROM music_podcast",
+    "INSERT INTO music_search(rowid, title, subtitle, body) "
+    "SELECT id * 4 + 3, username, first_name || ' ' || last_name, '' FROM auth_user",
+]
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite-only; other backends keep using the icontains search
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(CREATE_SQL)
+        except OperationalError:
+            # SQLite built without FTS5
+            return
+        for sql in POPULATE_SQL:
+            cursor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS music_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0006_creatorpoolentry'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-17 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='episode',
+            name='bitrate',
+            field=models.PositiveIntegerField(blank=True, help_text='Average bitrate in kbps', null=True),
+        ),
+        migrations.AddField(
+            model_name='episode',
+            name='duration',
+            field=models.FloatField(blank=True, help_text='Duration in seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='episode',
+            name='sample_rate',
+            field=models.PositiveIntegerField(blank=True, help_text='Sample rate in Hz', null=True),
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='bitrate',
+            field=models.PositiveIntegerField(blank=True, help_text='Average bitrate in kbps', null=True),
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='duration',
+            field=models.FloatField(blank=True, help_text='Duration in seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='sample_rate',
+            field=models.PositiveIntegerField(blank=True, help_text='Sample rate in Hz', null=True),
+        ),
+    ]
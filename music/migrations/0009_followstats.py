@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-17 13:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_follow_stats(apps, schema_editor):
+    Profile = apps.get_model('users', 'Profile')
+    FollowStats = apps.get_model('music', 'FollowStats')
+    Follow = Profile._meta.get_field('followers').remote_field.through
+    totals = {}
+    for row in Follow.objects.order_by().values('profile__user').annotate(n=models.Count('pk')):
+        totals.setdefault(row['profile__user'], [0, 0])[0] = row['n']
+    for row in Follow.objects.order_by().values('user').annotate(n=models.Count('pk')):
+        totals.setdefault(row['user'], [0, 0])[1] = row['n']
+    FollowStats.objects.bulk_create(
+        (FollowStats(user_id=user_id, follower_count=f, following_count=g) for user_id, (f, g) in totals.items()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0008_audio_metadata'),
+        ('users', '0002_profile_followers_profile_profile_image'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('follower_count', models.PositiveIntegerField(default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='follow_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(build_follow_stats, migrations.RunPython.noop),
+    ]
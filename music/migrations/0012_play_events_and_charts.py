@@ -0,0 +1,79 @@
+# Generated by Django 6.0 on 2026-10-17 15:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0011_uploadsession'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChartEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('song', 'Song'), ('episode', 'Episode')], max_length=10)),
+                ('genre', models.CharField(blank=True, max_length=100)),
+                ('rank', models.PositiveIntegerField()),
+                ('object_id', models.PositiveIntegerField()),
+                ('score', models.FloatField(help_text='Decayed score when the chart was built')),
+            ],
+            options={
+                'ordering': ['kind', 'genre', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'genre', 'rank'), name='music_chartentry_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ChartState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_event_id', models.BigIntegerField(default=0, help_text='Highest PlayEvent id rolled up')),
+                ('score_epoch', models.DateTimeField(help_text='Reference time the stored trending scores are relative to')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PlayEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('song', 'Song'), ('episode', 'Episode')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('played_at', models.DateTimeField()),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='play_events', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PlayRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket', models.DateTimeField(help_text='Start of the hour or day (UTC)')),
+                ('kind', models.CharField(choices=[('song', 'Song'), ('episode', 'Episode')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('plays', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'bucket'], name='music_playrollup_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'kind', 'object_id', 'bucket'), name='music_playrollup_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('song', 'Song'), ('episode', 'Episode')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('genre', models.CharField(blank=True, max_length=100)),
+                ('score', models.FloatField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'genre', '-score'], name='music_trending_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='music_trendingscore_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0 on 2026-10-17 15:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0012_play_events_and_charts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommenderState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_event_id', models.BigIntegerField(default=0, help_text='Highest PlayEvent id ingested')),
+                ('built_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SongListener',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plays', models.PositiveIntegerField(default=0)),
+                ('song', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listeners', to='music.song')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='song_listens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'song'), name='music_songlistener_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SongSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='music.song')),
+                ('song', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar', to='music.song')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['song', '-score'], name='music_songsimilarity_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('song', 'neighbor'), name='music_songsimilarity_unique')],
+            },
+        ),
+    ]
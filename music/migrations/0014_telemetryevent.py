@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 16:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0013_recommendations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelemetryEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('play', 'Play'), ('pause', 'Pause'), ('stop', 'Stop'), ('seek', 'Seek'), ('speed', 'Speed change'), ('progress', 'Progress'), ('ended', 'Ended')], max_length=10)),
+                ('kind', models.CharField(choices=[('song', 'Song'), ('episode', 'Episode')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('position', models.FloatField(blank=True, help_text='Playback position in seconds', null=True)),
+                ('value', models.FloatField(blank=True, help_text='Seek target or playback speed', null=True)),
+                ('occurred_at', models.DateTimeField(help_text='Client timestamp, clamped to the receive time')),
+                ('received_at', models.DateTimeField()),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='telemetry_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'object_id'], name='music_telemetry_object_idx'), models.Index(fields=['received_at'], name='music_telemetry_received_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-17 16:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0014_telemetryevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListeningPosition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('song', 'Song'), ('episode', 'Episode')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('position', models.FloatField(default=0, help_text='Seconds from the start')),
+                ('completed', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listening_positions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'completed', '-updated_at'], name='music_listening_recent_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'kind', 'object_id'), name='music_listeningposition_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-17 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0015_listeningposition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('manifest', models.CharField(help_text='Absolute path of the manifest', max_length=500, unique=True)),
+                ('size', models.BigIntegerField(help_text='Manifest size when the import started')),
+                ('done', models.PositiveIntegerField(default=0, help_text='Manifest records processed')),
+                ('imported', models.PositiveIntegerField(default=0)),
+                ('rejected', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
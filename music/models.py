@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -11,12 +13,19 @@ class Song(models.Model):
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
     upload_date = models.DateTimeField(auto_now_add=True)
     play_count = models.IntegerField(default=0)
+    duration = models.FloatField(blank=True, null=True, help_text='Duration in seconds')
+    bitrate = models.PositiveIntegerField(blank=True, null=True, help_text='Average bitrate in kbps')
+    sample_rate = models.PositiveIntegerField(blank=True, null=True, help_text='Sample rate in Hz')
 
     def __str__(self):
         return f"{self.title} - {self.artist}"
 
     class Meta:
         ordering = ['-upload_date']
+        indexes = [
+            # Keyset pagination for the home/discover feeds walks (upload_date, id)
+            models.Index(fields=['-upload_date', '-id'], name='music_song_feed_idx'),
+        ]
 
 class Podcast(models.Model):
     title = models.CharField(max_length=200)
@@ -30,6 +39,9 @@ class Podcast(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='music_podcast_feed_idx'),
+        ]
 
 class Episode(models.Model):
     title = models.CharField(max_length=200)
@@ -38,9 +50,257 @@ class Episode(models.Model):
     podcast = models.ForeignKey(Podcast, on_delete=models.CASCADE, related_name='episodes')
     published_date = models.DateTimeField(auto_now_add=True)
     play_count = models.IntegerField(default=0)
+    duration = models.FloatField(blank=True, null=True, help_text='Duration in seconds')
+    bitrate = models.PositiveIntegerField(blank=True, null=True, help_text='Average bitrate in kbps')
+    sample_rate = models.PositiveIntegerField(blank=True, null=True, help_text='Sample rate in Hz')
     
     def __str__(self):
         return f"{self.podcast.title} - {self.title}"
     
     class Meta:
-        ordering = ['-published_date']
\ No newline at end of file
+        ordering = ['-published_date']
+
+class CreatorPoolEntry(models.Model):
+    """
+    One row per user with at least one uploaded song, numbered with dense
+    slots 0..n-1 so the home page can sample suggested creators by slot.
+    Maintained by the Song signals in music/signals.py.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='creator_pool_entry')
+    slot = models.PositiveIntegerField(unique=True)
+    song_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user.username} (slot {self.slot})"
+
+class FollowStats(models.Model):
+    """
+    Denormalised follow counts for a user, so profile and detail pages never
+    count the follower table. Maintained by the follow signals in
+    music/signals.py; see music/follows.py.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='follow_stats')
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.follower_count} followers, {self.following_count} following"
+
+class Blob(models.Model):
+    """
+    A content-addressed media file and the number of model fields pointing
+    at it. Maintained by music/storage.py and the file field signals.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+class UploadSession(models.Model):
+    """A resumable chunked upload in progress; see music/uploads.py."""
+    KIND_CHOICES = [
+        ('song', 'Song'),
+        ('episode', 'Episode'),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    podcast = models.ForeignKey(Podcast, on_delete=models.CASCADE, blank=True, null=True)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(help_text='Total size in bytes')
+    offset = models.BigIntegerField(default=0, help_text='Bytes received so far')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size} bytes)"
+
+PLAYABLE_KINDS = [
+    ('song', 'Song'),
+    ('episode', 'Episode'),
+]
+
+class PlayEvent(models.Model):
+    """One play, as logged by the play counter. Rolled up and pruned by music/charts.py."""
+    kind = models.CharField(max_length=10, choices=PLAYABLE_KINDS)
+    object_id = models.PositiveIntegerField()
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='play_events')
+    played_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} at {self.played_at}"
+
+class PlayRollup(models.Model):
+    """Plays of one song/episode in one hour or day bucket."""
+    HOUR = 'hour'
+    DAY = 'day'
+    PERIOD_CHOICES = [
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    ]
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    bucket = models.DateTimeField(help_text='Start of the hour or day (UTC)')
+    kind = models.CharField(max_length=10, choices=PLAYABLE_KINDS)
+    object_id = models.PositiveIntegerField()
+    plays = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'kind', 'object_id', 'bucket'], name='music_playrollup_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'bucket'], name='music_playrollup_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.plays} plays ({self.period} of {self.bucket})"
+
+class TrendingScore(models.Model):
+    """
+    Exponentially decayed play score of a song/episode. Stored relative to
+    ChartState.score_epoch, so adding new plays never touches other rows.
+    """
+    kind = models.CharField(max_length=10, choices=PLAYABLE_KINDS)
+    object_id = models.PositiveIntegerField()
+    genre = models.CharField(max_length=100, blank=True)
+    score = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='music_trendingscore_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'genre', '-score'], name='music_trending_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.score:.3g}"
+
+class ChartEntry(models.Model):
+    """A precomputed chart position; genre '' is the all-genres chart."""
+    kind = models.CharField(max_length=10, choices=PLAYABLE_KINDS)
+    genre = models.CharField(max_length=100, blank=True)
+    rank = models.PositiveIntegerField()
+    object_id = models.PositiveIntegerField()
+    score = models.FloatField(help_text='Decayed score when the chart was built')
+
+    class Meta:
+        ordering = ['kind', 'genre', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'genre', 'rank'], name='music_chartentry_unique'),
+        ]
+
+    def __str__(self):
+        return f"#{self.rank} {self.kind} {self.object_id} ({self.genre or 'all'})"
+
+class ChartState(models.Model):
+    """Single row of bookkeeping for the chart job."""
+    last_event_id = models.BigIntegerField(default=0, help_text='Highest PlayEvent id rolled up')
+    score_epoch = models.DateTimeField(help_text='Reference time the stored trending scores are relative to')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Charts rolled up to event {self.last_event_id}"
+
+class SongListener(models.Model):
+    """How often a user has played a song; the input to the recommender (music/recommendations.py)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='song_listens')
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='listeners')
+    plays = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'song'], name='music_songlistener_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.song.title} x{self.plays}"
+
+class SongSimilarity(models.Model):
+    """One of a song's top-K most co-listened neighbours, by cosine similarity."""
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='similar')
+    neighbor = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['song', 'neighbor'], name='music_songsimilarity_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['song', '-score'], name='music_songsimilarity_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.song_id} -> {self.neighbor_id} ({self.score:.3f})"
+
+class RecommenderState(models.Model):
+    """Single row of bookkeeping for the incremental recommender build."""
+    last_event_id = models.BigIntegerField(default=0, help_text='Highest PlayEvent id ingested')
+    built_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Recommender ingested up to event {self.last_event_id}"
+
+class TelemetryEvent(models.Model):
+    """A player interaction reported by the telemetry beacon (music/telemetry.py)."""
+    ACTION_CHOICES = [
+        ('play', 'Play'),
+        ('pause', 'Pause'),
+        ('stop', 'Stop'),
+        ('seek', 'Seek'),
+        ('speed', 'Speed change'),
+        ('progress', 'Progress'),
+        ('ended', 'Ended'),
+    ]
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    kind = models.CharField(max_length=10, choices=PLAYABLE_KINDS)
+    object_id = models.PositiveIntegerField()
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='telemetry_events')
+    position = models.FloatField(blank=True, null=True, help_text='Playback position in seconds')
+    value = models.FloatField(blank=True, null=True, help_text='Seek target or playback speed')
+    occurred_at = models.DateTimeField(help_text='Client timestamp, clamped to the receive time')
+    received_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'object_id'], name='music_telemetry_object_idx'),
+            models.Index(fields=['received_at'], name='music_telemetry_received_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.kind} {self.object_id} at {self.occurred_at}"
+
+class ListeningPosition(models.Model):
+    """Where a user last was in a song/episode; doubles as their listening history (music/listening.py)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='listening_positions')
+    kind = models.CharField(max_length=10, choices=PLAYABLE_KINDS)
+    object_id = models.PositiveIntegerField()
+    position = models.FloatField(default=0, help_text='Seconds from the start')
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind', 'object_id'], name='music_listeningposition_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'completed', '-updated_at'], name='music_listening_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.kind} {self.object_id} at {self.position:.0f}s"
+
+class ImportCheckpoint(models.Model):
+    """Progress of ``manage.py import_catalog`` through a manifest, saved with each batch."""
+    manifest = models.CharField(max_length=500, unique=True, help_text='Absolute path of the manifest')
+    size = models.BigIntegerField(help_text='Manifest size when the import started')
+    done = models.PositiveIntegerField(default=0, help_text='Manifest records processed')
+    imported = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.manifest}: {self.done} records processed"
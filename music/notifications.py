@@ -0,0 +1,208 @@
+# music/notifications.py
+
+"""
+Upload notifications for followers, and a cached unread count.
+
+When a Song or Episode is created, ``fanout.schedule()`` queues a job once the
+transaction commits. A background thread then walks the uploader's followers
+in keyset-ordered chunks of ``MUSIC_NOTIFICATION_CHUNK_SIZE``. For each chunk
+it:
+
+* skips recipients who already have this notification, so a retried or
+  repeated job never duplicates rows,
+* inserts the rest with one ``bulk_create``,
+* trims any recipient's unread backlog to ``MUSIC_NOTIFICATION_BACKLOG`` by
+  deleting their oldest unread rows,
+* drops the chunk's cached unread counts.
+
+``unread_count(user)`` caches the COUNT per user, so ``base.html`` doesn't
+count notifications on every page. Any Notification save/delete made through
+the ORM invalidates it (see music/signals.py). Bulk ``update()`` calls must
+use ``mark_all_read()`` or call ``invalidate_unread()`` themselves.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+
+from . import follows
+
+logger = logging.getLogger(__name__)
+
+UPLOAD = 'upload'
+
+UNREAD_TIMEOUT = 300
+
+
+def notification_model():
+    return apps.get_model('users', 'Notification')
+
+
+def _unread_key(user_id):
+    return f'music:unread:{user_id}'
+
+
+def unread_count(user):
+    """Number of unread notifications for ``user``, cached per user."""
+    if not user.is_authenticated:
+        return 0
+    key = _unread_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = notification_model().objects.filter(recipient_id=user.pk, is_read=False).count()
+        cache.set(key, count, UNREAD_TIMEOUT)
+    return count
+
+
+def invalidate_unread(user_ids):
+    cache.delete_many([_unread_key(user_id) for user_id in user_ids])
+
+
+def mark_all_read(user):
+    """Mark every notification of ``user`` read. Returns the number of rows changed."""
+    updated = notification_model().objects.filter(recipient_id=user.pk, is_read=False).update(is_read=True)
+    invalidate_unread([user.pk])
+    return updated
+
+
+def upload_text(kind, obj, sender):
+    if kind == 'song':
+        text = f'{sender.username} uploaded a new song: {obj.title}'
+    else:
+        text = f'{sender.username} published a new episode of {obj.podcast.title}: {obj.title}'
+    return text[:255]
+
+
+def _load(kind, pk):
+    from .models import Episode, Song
+
+    if kind == 'song':
+        obj = Song.objects.select_related('uploaded_by').filter(pk=pk).first()
+        return obj, obj and obj.uploaded_by
+    obj = Episode.objects.select_related('podcast__host').filter(pk=pk).first()
+    return obj, obj and obj.podcast.host
+
+
+def fan_out(kind, pk, chunk_size=None, backlog=None):
+    """
+    Notify every follower of the uploader of Song/Episode ``pk``.
+    Returns the number of notifications created.
+    """
+    chunk_size = chunk_size or getattr(settings, 'MUSIC_NOTIFICATION_CHUNK_SIZE', 1000)
+    backlog = backlog or getattr(settings, 'MUSIC_NOTIFICATION_BACKLOG', 200)
+    obj, sender = _load(kind, pk)
+    if obj is None:
+        return 0
+
+    Notification = notification_model()
+    text = upload_text(kind, obj, sender)
+    followers = (
+        follows.follow_model().objects
+        .filter(profile__user_id=sender.pk)
+        .exclude(user_id=sender.pk)
+        .order_by('user_id')
+        .values_list('user_id', flat=True)
+    )
+    created = 0
+    last = 0
+    while True:
+        chunk = list(followers.filter(user_id__gt=last)[:chunk_size])
+        if not chunk:
+            break
+        last = chunk[-1]
+        with transaction.atomic():
+            already = set(
+                Notification.objects.filter(
+                    recipient_id__in=chunk, sender_id=sender.pk, notification_type=UPLOAD, text=text,
+                ).values_list('recipient_id', flat=True)
+            )
+            Notification.objects.bulk_create(
+                [
+                    Notification(recipient_id=user_id, sender_id=sender.pk, notification_type=UPLOAD, text=text)
+                    for user_id in chunk if user_id not in already
+                ],
+                batch_size=chunk_size,
+            )
+            created += len(chunk) - len(already)
+            _trim_backlog(chunk, backlog)
+        invalidate_unread(chunk)
+    return created
+
+
+def _trim_backlog(recipient_ids, backlog):
+    Notification = notification_model()
+    over = (
+        Notification.objects.filter(recipient_id__in=recipient_ids, is_read=False)
+        .order_by()
+        .values('recipient_id')
+        .annotate(n=Count('pk'))
+        .filter(n__gt=backlog)
+        .values_list('recipient_id', flat=True)
+    )
+    for recipient_id in over:
+        stale = (
+            Notification.objects.filter(recipient_id=recipient_id, is_read=False)
+            .order_by('-created_at', '-pk')
+            .values_list('pk', flat=True)[backlog:]
+        )
+        Notification.objects.filter(pk__in=list(stale)).delete()
+
+
+class FanoutQueue:
+    """Runs ``fan_out`` jobs on a background thread, one at a time, in submit order."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def schedule(self, kind, pk):
+        """Queue a fan-out for when the current transaction commits."""
+        transaction.on_commit(lambda: self.submit(kind, pk))
+
+    def submit(self, kind, pk):
+        self._ensure_started()
+        self._queue.put((kind, pk))
+
+    def join(self):
+        """Block until every submitted job has run."""
+        self._queue.join()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='notification-fanout', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                fan_out(*job)
+            except Exception:
+                logger.exception('Failed to fan out notifications for %s %s', *job)
+            finally:
+                connection.close()
+                self._queue.task_done()
+
+    def shutdown(self):
+        """Finish the queued jobs and stop the worker thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+
+
+fanout = FanoutQueue()
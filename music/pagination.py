@@ -0,0 +1,101 @@
+# music/pagination.py
+
+"""
+Keyset (cursor) pagination for the newest-first feeds.
+
+A page is fetched with ``WHERE (ts, id) < (cursor_ts, cursor_id) ORDER BY ts
+DESC, id DESC LIMIT n + 1`` which walks the ``(ts, id)`` index from the cursor
+position, so the cost of a page does not depend on how deep into the feed it is
+or how large the table has grown (unlike OFFSET or rendering ``.all()``).
+
+Without a time field the order is just ``id DESC``. Items may be model
+instances or ``values()`` dicts.
+"""
+
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(timestamp, pk):
+    raw = f'{timestamp.isoformat() if timestamp else ""}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(timestamp, pk)`` for a cursor, or ``None`` if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, pk = raw.rsplit('|', 1)
+        return (datetime.fromisoformat(timestamp) if timestamp else None), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE):
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def keyset_page(queryset, time_field, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return ``(items, next_cursor)`` for one newest-first page of ``queryset``
+    ordered by ``(time_field, id)`` descending. ``next_cursor`` is ``None`` on
+    the last page.
+    """
+    if time_field is None:
+        queryset = queryset.order_by('-id')
+    else:
+        queryset = queryset.order_by(f'-{time_field}', '-id')
+    position = decode_cursor(cursor)
+    if position and time_field is None:
+        queryset = queryset.filter(id__lt=position[1])
+    elif position and position[0] is not None:
+        timestamp, pk = position
+        queryset = queryset.filter(
+            Q(**{f'{time_field}__lt': timestamp}) | Q(**{time_field: timestamp, 'id__lt': pk})
+        )
+
+    # One extra row tells us whether there is another page without a COUNT(*)
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        if isinstance(last, dict):
+            next_cursor = encode_cursor(last[time_field] if time_field else None, last['id'])
+        else:
+            next_cursor = encode_cursor(getattr(last, time_field) if time_field else None, last.pk)
+    return items, next_cursor
+
+
+class LazyKeysetPage:
+    """
+    A keyset page that runs its query on first access. Lets a template skip
+    the query entirely when the markup that uses it comes from the fragment cache.
+    """
+
+    def __init__(self, queryset, time_field, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        self._args = (queryset, time_field, cursor, page_size)
+        self._result = None
+
+    def _page(self):
+        if self._result is None:
+            self._result = keyset_page(*self._args)
+        return self._result
+
+    @property
+    def items(self):
+        return self._page()[0]
+
+    @property
+    def next_cursor(self):
+        return self._page()[1]
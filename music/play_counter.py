@@ -0,0 +1,142 @@
+# music/play_counter.py
+
+"""
+In-process write-coalescing buffer for play counts.
+
+Instead of a read-modify-write ``save()`` per play, plays are accumulated in
+memory and flushed as ``UPDATE ... SET play_count = play_count + n`` statements,
+grouped by increment so one statement covers many rows. A background thread
+flushes every ``MUSIC_PLAY_COUNT_FLUSH_INTERVAL`` seconds, or as soon as the
+buffer holds ``MUSIC_PLAY_COUNT_FLUSH_SIZE`` plays, through the shared
+database writer (music/write_queue.py). The rest is flushed at interpreter
+shutdown. Recording a play therefore never writes on the request thread.
+
+Each play is also kept as a timestamped PlayEvent, bulk-inserted in the same
+flush transaction, for the trending charts (music/charts.py).
+"""
+
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .write_queue import writer
+
+logger = logging.getLogger(__name__)
+
+
+class PlayCounterBuffer:
+    def __init__(self, flush_size=None, flush_interval=None):
+        self.flush_size = flush_size or getattr(settings, 'MUSIC_PLAY_COUNT_FLUSH_SIZE', 500)
+        self.flush_interval = flush_interval or getattr(settings, 'MUSIC_PLAY_COUNT_FLUSH_INTERVAL', 5.0)
+        self._pending = defaultdict(int)  # (app_label.model, pk) -> plays
+        self._events = []  # (model_name, pk, user_id, played_at)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, model, pk, count=1, user_id=None):
+        """Buffer ``count`` plays of ``model`` row ``pk`` (by ``user_id``, if known)."""
+        self._ensure_started()
+        event = (model._meta.model_name, pk, user_id, timezone.now())
+        with self._lock:
+            self._pending[(model._meta.label, pk)] += count
+            self._events.extend([event] * count)
+            self._size += count
+            should_flush = self._size >= self.flush_size
+        if should_flush:
+            self._wake.set()
+
+    def pending(self, model, pk):
+        """Plays recorded for a row that have not been written yet."""
+        with self._lock:
+            return self._pending.get((model._meta.label, pk), 0)
+
+    def flush(self):
+        """Write all buffered plays to the database. Returns the number of plays written."""
+        # Through the writer thread, after any flush already queued there
+        return writer.call(self._flush)
+
+    def _flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, defaultdict(int)
+                events, self._events = self._events, []
+                self._size = 0
+            if not batch:
+                return 0
+
+            # model label -> increment -> [pk, ...]
+            grouped = defaultdict(lambda: defaultdict(list))
+            for (label, pk), n in batch.items():
+                grouped[label][n].append(pk)
+
+            try:
+                with transaction.atomic():
+                    for label, by_increment in grouped.items():
+                        model = apps.get_model(label)
+                        for n, pks in by_increment.items():
+                            model.objects.filter(pk__in=pks).update(play_count=F('play_count') + n)
+                    # PlayEvent.user's SET_NULL is applied by the ORM when a user is
+                    # deleted, not by the database. A play buffered before its
+                    # listener deleted their account would fail the FK check at
+                    # COMMIT, on every retry, so keep such plays anonymously.
+                    user_ids = {user_id for _, _, user_id, _ in events if user_id is not None}
+                    if user_ids:
+                        user_ids = set(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+                    PlayEvent = apps.get_model('music', 'PlayEvent')
+                    PlayEvent.objects.bulk_create(
+                        [PlayEvent(kind=kind, object_id=pk, user_id=user_id if user_id in user_ids else None, played_at=played_at)
+                         for kind, pk, user_id, played_at in events],
+                        batch_size=1000,
+                    )
+            except Exception:
+                # Put the plays back so they are retried on the next flush
+                with self._lock:
+                    for key, n in batch.items():
+                        self._pending[key] += n
+                        self._size += n
+                    self._events[:0] = events
+                raise
+            return sum(batch.values())
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='play-counter-flush', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to flush buffered play counts')
+            finally:
+                # Flushes normally run on the writer thread; close ours if one ran inline
+                connection.close()
+
+    def shutdown(self):
+        """Stop the background thread and write whatever is still buffered."""
+        self._stop.set()
+        self._wake.set()
+        self.flush()
+
+
+play_counter = PlayCounterBuffer()
@@ -0,0 +1,329 @@
+# music/recommendations.py
+
+"""
+Item-to-item "up next" recommendations from co-listening.
+
+Song plays with a known listener are folded from the PlayEvent log into
+SongListener (user, song, plays) incrementally, like the chart rollups. A
+build loads those rows into NumPy arrays and treats them as a sparse
+user x song matrix with log(1 + plays) weights. Each listener keeps at most
+``MAX_ITEMS_PER_USER`` of their most played songs, which bounds the work a
+heavy listener adds.
+
+Cosine similarity between song columns is computed for blocks of target
+songs at a time. Each target's listeners are expanded to all their other
+songs, and the products are summed per (target, other) pair with
+``np.unique`` + ``np.bincount``. Memory therefore scales with the block's
+co-listen pairs, never with songs x songs. The top ``MUSIC_RECOMMENDATION_NEIGHBORS``
+per song are stored in SongSimilarity, and "up next" is a single indexed
+read of that table.
+
+An incremental build recomputes only the songs with new plays. Because
+similarity is symmetric, it also patches those songs' new scores into the
+neighbour lists that include them. A stored list only holds the top K, so a
+patch can't bring back a neighbour it cut earlier: a full list that loses an
+entry, or where a patched score drops to the bottom, is recomputed from the
+matrix instead. ``--full`` recomputes every song.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import PlayEvent, RecommenderState, Song, SongListener, SongSimilarity
+
+EVENT_SLICE = 50000
+LOAD_CHUNK = 100000
+MAX_ITEMS_PER_USER = 500
+DEFAULT_BLOCK_SIZE = 512
+
+
+def neighbors_per_song():
+    return getattr(settings, 'MUSIC_RECOMMENDATION_NEIGHBORS', 20)
+
+
+def get_state():
+    state = RecommenderState.objects.select_for_update().filter(pk=1).first()
+    if state is None:
+        state = RecommenderState.objects.create(pk=1)
+    return state
+
+
+def ingest():
+    """Fold new song plays by known users into SongListener. Returns the ids of songs that changed."""
+    dirty = set()
+    while True:
+        with transaction.atomic():
+            state = get_state()
+            top = PlayEvent.objects.filter(pk__gt=state.last_event_id).aggregate(top=Max('pk'))['top']
+            if top is None:
+                return dirty
+            top = min(top, state.last_event_id + EVENT_SLICE)
+            deltas = {
+                (row['user_id'], row['object_id']): row['n']
+                for row in PlayEvent.objects.filter(
+                    pk__gt=state.last_event_id, pk__lte=top, kind='song', user__isnull=False,
+                ).values('user_id', 'object_id').annotate(n=Count('pk')).order_by()
+            }
+            # Skip plays of songs deleted since
+            live = set(Song.objects.filter(pk__in={s for _, s in deltas}).values_list('pk', flat=True))
+            deltas = {key: n for key, n in deltas.items() if key[1] in live}
+
+            existing = {
+                (row.user_id, row.song_id): row
+                for row in SongListener.objects.filter(
+                    user_id__in={u for u, _ in deltas}, song_id__in={s for _, s in deltas},
+                )
+            }
+            changed, created = [], []
+            for (user_id, song_id), n in deltas.items():
+                row = existing.get((user_id, song_id))
+                if row is None:
+                    created.append(SongListener(user_id=user_id, song_id=song_id, plays=n))
+                else:
+                    row.plays += n
+                    changed.append(row)
+            SongListener.objects.bulk_update(changed, ['plays'], batch_size=1000)
+            SongListener.objects.bulk_create(created, batch_size=1000)
+            dirty.update(song_id for _, song_id in deltas)
+            state.last_event_id = top
+            state.save()
+
+
+class CoListenMatrix:
+    """
+    SongListener rows as parallel arrays sorted by user (CSR-like), plus a
+    by-song permutation (CSC-like) and per-song L2 norms.
+    """
+
+    def __init__(self, user_ids, song_ids, plays):
+        import numpy as np
+
+        self.song_ids, song_col = np.unique(song_ids, return_inverse=True)
+        user_ids, user_row = np.unique(user_ids, return_inverse=True)
+        weight = np.log1p(plays).astype(np.float64)
+
+        # Sort by user, most played first, and keep each user's top items
+        order = np.lexsort((-weight, user_row))
+        user_row, song_col, weight = user_row[order], song_col[order], weight[order]
+        counts = np.bincount(user_row, minlength=len(user_ids))
+        starts = np.cumsum(counts) - counts
+        keep = np.arange(len(user_row)) - starts[user_row] < MAX_ITEMS_PER_USER
+        self.user_row, self.song_col, self.weight = user_row[keep], song_col[keep], weight[keep]
+
+        self.user_count = np.bincount(self.user_row, minlength=len(user_ids))
+        self.user_start = np.cumsum(self.user_count) - self.user_count
+        self.by_song = np.argsort(self.song_col, kind='stable')
+        self.song_count = np.bincount(self.song_col, minlength=len(self.song_ids))
+        self.song_start = np.cumsum(self.song_count) - self.song_count
+        self.norms = np.sqrt(np.bincount(self.song_col, weights=self.weight ** 2, minlength=len(self.song_ids)))
+
+    @classmethod
+    def load(cls):
+        import numpy as np
+
+        chunks, buffer = [], []
+        rows = SongListener.objects.order_by().values_list('user_id', 'song_id', 'plays')
+        for row in rows.iterator(chunk_size=LOAD_CHUNK):
+            buffer.append(row)
+            if len(buffer) >= LOAD_CHUNK:
+                chunks.append(np.array(buffer, dtype=np.int64))
+                buffer = []
+        if buffer:
+            chunks.append(np.array(buffer, dtype=np.int64))
+        data = np.concatenate(chunks) if chunks else np.empty((0, 3), dtype=np.int64)
+        return cls(data[:, 0], data[:, 1], data[:, 2])
+
+    def columns(self, song_ids):
+        """Column indices of the given song ids that have listeners."""
+        import numpy as np
+
+        return np.flatnonzero(np.isin(self.song_ids, np.fromiter(song_ids, dtype=np.int64)))
+
+    def similarities(self, cols):
+        """
+        Sparse cosine similarities of target columns ``cols`` with every other
+        song, as arrays ``(target_position, column, score)``.
+        """
+        import numpy as np
+
+        n_songs = len(self.song_ids)
+        # Every (listener, target) entry of the block...
+        counts = self.song_count[cols]
+        entries = self.by_song[_ranges(self.song_start[cols], counts)]
+        target = np.repeat(np.arange(len(cols)), counts)
+        users, weights = self.user_row[entries], self.weight[entries]
+
+        # ...expanded to all songs of that listener
+        user_counts = self.user_count[users]
+        others = _ranges(self.user_start[users], user_counts)
+        keys = np.repeat(target, user_counts).astype(np.int64) * n_songs + self.song_col[others]
+        products = np.repeat(weights, user_counts) * self.weight[others]
+
+        pairs, inverse = np.unique(keys, return_inverse=True)
+        dots = np.bincount(inverse, weights=products)
+        position, column = pairs // n_songs, pairs % n_songs
+        scores = dots / (self.norms[cols[position]] * self.norms[column])
+        not_self = column != cols[position]
+        return position[not_self], column[not_self], scores[not_self]
+
+
+def _ranges(starts, counts):
+    """Concatenation of ``range(s, s + c)`` for each pair, vectorised."""
+    import numpy as np
+
+    out_starts = np.cumsum(counts) - counts
+    return np.repeat(starts - out_starts, counts) + np.arange(counts.sum())
+
+
+def _top_k(position, column, scores, k):
+    import numpy as np
+
+    order = np.lexsort((-scores, position))
+    position, column, scores = position[order], column[order], scores[order]
+    counts = np.bincount(position)
+    starts = np.cumsum(counts) - counts
+    keep = np.arange(len(position)) - starts[position] < k
+    return position[keep], column[keep], scores[keep]
+
+
+def _patch_reverse(song_ids, full, top, dirty, k):
+    """
+    Write the fresh scores of ``song_ids`` into the neighbour lists of
+    other, non-dirty songs: lists that already contain them, and songs they
+    now rank in their own top-K. ``full`` holds every fresh score as
+    ``(song_ids, neighbor_ids, scores)`` arrays; ``top`` the new top-K pairs.
+    Returns the songs whose patched list may now miss a better neighbour
+    (see the module docstring), to be recomputed.
+    """
+    import numpy as np
+
+    sources, neighbors, scores = full
+    reverse = set(
+        SongSimilarity.objects.filter(neighbor_id__in=song_ids.tolist())
+        .values_list('neighbor_id', 'song_id')
+    )
+    wanted = {pair for pair in top | reverse if pair[1] not in dirty}
+    if not wanted:
+        return set()
+
+    pair_keys = sources * (1 << 32) + neighbors
+    wanted_keys = np.array([a * (1 << 32) + b for a, b in wanted], dtype=np.int64)
+    hit = np.isin(pair_keys, wanted_keys)
+    fresh = dict(zip(zip(sources[hit].tolist(), neighbors[hit].tolist()), scores[hit].tolist()))
+
+    affected = {target for _, target in wanted}
+    lists = {song_id: {} for song_id in affected}
+    for song_id, neighbor_id, score in SongSimilarity.objects.filter(song_id__in=affected).values_list(
+        'song_id', 'neighbor_id', 'score'
+    ):
+        lists[song_id][neighbor_id] = score
+    truncated = {song_id for song_id, neighbors in lists.items() if len(neighbors) >= k}
+    lowered = set()
+    for source, target in wanted:
+        score = fresh.get((source, target))
+        previous = lists[target].get(source)
+        if score is not None:
+            lists[target][source] = score
+        else:
+            lists[target].pop(source, None)
+        if target in truncated and previous is not None and (score is None or score < previous):
+            lowered.add((source, target))
+    stale = {
+        target for source, target in lowered
+        if source not in lists[target] or lists[target][source] <= min(lists[target].values())
+    }
+
+    SongSimilarity.objects.filter(song_id__in=affected).delete()
+    SongSimilarity.objects.bulk_create(
+        [
+            SongSimilarity(song_id=song_id, neighbor_id=neighbor_id, score=score)
+            for song_id, neighbors in lists.items()
+            for neighbor_id, score in sorted(neighbors.items(), key=lambda item: -item[1])[:k]
+        ],
+        batch_size=1000,
+    )
+    return stale
+
+
+def _recompute(matrix, block, k):
+    """
+    Replace the stored neighbour lists of matrix columns ``block``. Returns
+    the block's song ids, every fresh score as ``(position, column, score)``
+    arrays, and the positions and columns of the stored top-K.
+    """
+    position, column, scores = matrix.similarities(block)
+    top_pos, top_col, top_scores = _top_k(position, column, scores, k)
+    block_ids = matrix.song_ids[block]
+    SongSimilarity.objects.filter(song_id__in=block_ids.tolist()).delete()
+    SongSimilarity.objects.bulk_create(
+        [
+            SongSimilarity(song_id=int(block_ids[p]), neighbor_id=int(matrix.song_ids[c]), score=float(s))
+            for p, c, s in zip(top_pos, top_col, top_scores)
+        ],
+        batch_size=1000,
+    )
+    return block_ids, (position, column, scores), (top_pos, top_col)
+
+
+def build(full=False, block_size=DEFAULT_BLOCK_SIZE, k=None):
+    """Ingest new plays and refresh neighbour lists. Returns the number of songs recomputed."""
+    import numpy as np
+
+    k = k or neighbors_per_song()
+    dirty = ingest()
+    matrix = CoListenMatrix.load()
+    if full:
+        cols = np.arange(len(matrix.song_ids))
+    else:
+        cols = matrix.columns(dirty)
+
+    stale = set()
+    for start in range(0, len(cols), block_size):
+        block = cols[start:start + block_size]
+        with transaction.atomic():
+            block_ids, (position, column, scores), (top_pos, top_col) = _recompute(matrix, block, k)
+            if not full:
+                top = set(zip(block_ids[top_pos].tolist(), matrix.song_ids[top_col].tolist()))
+                full_scores = (block_ids[position], matrix.song_ids[column], scores)
+                stale |= _patch_reverse(block_ids, full_scores, top, dirty, k)
+
+    # Patched lists that may have cut a better neighbour earlier; their own
+    # scores didn't change, so nothing else needs patching
+    stale_cols = matrix.columns(stale)
+    for start in range(0, len(stale_cols), block_size):
+        with transaction.atomic():
+            _recompute(matrix, stale_cols[start:start + block_size], k)
+
+    with transaction.atomic():
+        if full:
+            # Songs that lost all their listeners keep no neighbours
+            SongSimilarity.objects.exclude(song_id__in=SongListener.objects.values('song_id')).delete()
+        state = get_state()
+        state.built_at = timezone.now()
+        state.save()
+    return len(cols) + len(stale_cols)
+
+
+def up_next(song, limit=10, exclude=()):
+    """
+    Songs to play after ``song``: its stored neighbours, best first. Falls
+    back to the trending chart for its genre, then overall, when it has none.
+    """
+    from . import charts
+
+    exclude = set(exclude) | {song.pk}
+    similar = (
+        SongSimilarity.objects.filter(song_id=song.pk)
+        .exclude(neighbor_id__in=exclude)
+        .select_related('neighbor')
+        .order_by('-score')[:limit]
+    )
+    songs = [row.neighbor for row in similar]
+    for genre in (song.genre, ''):
+        if len(songs) >= limit:
+            break
+        seen = exclude | {s.pk for s in songs}
+        songs += [s for s in charts.chart('song', genre) if s.pk not in seen][:limit - len(songs)]
+    return songs
@@ -0,0 +1,145 @@
+# music/search.py
+
+"""
+SQLite FTS5 full-text index for songs, podcasts and users.
+
+All three are stored in one FTS5 table, ``music_search``. The rowid encodes
+the object: ``rowid = pk * 4 + kind``. Updates and deletes are therefore
+rowid lookups rather than scans. Searches rank with BM25 (title weighted
+above subtitle above body) and match every query term as a prefix.
+
+The index is kept in sync by the signals in ``music/signals.py`` and can be
+rebuilt from scratch with ``manage.py rebuild_search_index``. On databases
+without FTS5 the callers fall back to the old ``icontains`` queries.
+"""
+
+import re
+
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection, transaction
+
+from .models import Podcast, Song
+
+TABLE = 'music_search'
+
+SONG, PODCAST, USER = 1, 2, 3
+
+# bm25() column weights for (title, subtitle, body)
+BM25_WEIGHTS = (10.0, 4.0, 1.0)
+
+CREATE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+    "title, subtitle, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+# Bulk (re)population straight from the source tables
+POPULATE_SQL = [
+    f"INSERT INTO {TABLE}(rowid, title, subtitle, body) "
+    f"SELECT id * 4 + {SONG}, title, artist, genre || ' ' || album FROM music_song",
+    f"INSERT INTO {TABLE}(rowid, title, subtitle, body) "
+    f"SELECT id * 4 + {PODCAST}, title, '', description FROM music_podcast",
+    f"INSERT INTO {TABLE}(rowid, title, subtitle, body) "
+    f"SELECT id * 4 + {USER}, username, first_name || ' ' || last_name, '' FROM auth_user",
+]
+
+_available = False
+
+
+def is_available():
+    """True when the database is SQLite and the FTS5 table exists."""
+    global _available
+    if _available:
+        return True
+    if connection.vendor != 'sqlite':
+        return False
+    _available = TABLE in connection.introspection.table_names()
+    return _available
+
+
+def _document(kind, obj):
+    if kind == SONG:
+        return obj.title, obj.artist, f'{obj.genre} {obj.album}'
+    if kind == PODCAST:
+        return obj.title, '', obj.description
+    return obj.username, f'{obj.first_name} {obj.last_name}', ''
+
+
+def index_object(kind, obj):
+    if not is_available():
+        return
+    # One transaction, so a concurrent save of the same object can't insert
+    # the rowid between our DELETE and INSERT
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [obj.pk * 4 + kind])
+        cursor.execute(
+            f'INSERT INTO {TABLE}(rowid, title, subtitle, body) VALUES (%s, %s, %s, %s)',
+            [obj.pk * 4 + kind, *_document(kind, obj)],
+        )
+
+
+def unindex_object(kind, pk):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [pk * 4 + kind])
+
+
+def rebuild():
+    """Drop and repopulate the whole index. Returns the number of indexed rows."""
+    global _available
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+        cursor.execute(CREATE_SQL)
+        for sql in POPULATE_SQL:
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {TABLE}')
+        total = cursor.fetchone()[0]
+    _available = True
+    return total
+
+
+def build_match(query):
+    """
+    Turn free text into an FTS5 MATCH expression: every word becomes a quoted
+    prefix term (``"lov"*``), implicitly AND-ed. Returns '' if nothing is searchable.
+    """
+    terms = re.findall(r'\w+', query or '')
+    return ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+
+
+def _ranked_ids(kind, match, limit):
+    weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s AND rowid %% 4 = %s '
+            f'ORDER BY bm25({TABLE}, {weights}) LIMIT %s',
+            [match, kind, limit],
+        )
+        return [rowid // 4 for (rowid,) in cursor.fetchall()]
+
+
+def _in_rank_order(queryset, ids):
+    objects = queryset.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+def search(query, limit=20, querysets=None):
+    """
+    Return ``{'songs': [...], 'podcasts': [...], 'users': [...]}``, each list
+    BM25-ranked and capped at ``limit``. ``querysets`` can override the base
+    queryset per section (e.g. to add ``select_related``).
+    """
+    querysets = querysets or {}
+    match = build_match(query)
+    if not match:
+        return {'songs': [], 'podcasts': [], 'users': []}
+    try:
+        return {
+            'songs': _in_rank_order(querysets.get('songs', Song.objects.all()), _ranked_ids(SONG, match, limit)),
+            'podcasts': _in_rank_order(querysets.get('podcasts', Podcast.objects.all()), _ranked_ids(PODCAST, match, limit)),
+            'users': _in_rank_order(querysets.get('users', User.objects.all()), _ranked_ids(USER, match, limit)),
+        }
+    except DatabaseError:
+        # Malformed MATCH expression or FTS5 unavailable; let the caller fall back
+        return None
@@ -0,0 +1,164 @@
+# music/signals.py
+
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import creators, follows, fragment_cache, listening, notifications, search, storage
+from .models import CreatorPoolEntry, Episode, Podcast, Song
+
+
+@receiver(post_save, sender=Song)
+def song_saved(sender, instance, created, **kwargs):
+    if created:
+        creators.add_song(instance.uploaded_by_id)
+        notifications.fanout.schedule('song', instance.pk)
+    search.index_object(search.SONG, instance)
+
+
+@receiver(post_delete, sender=Song)
+def song_deleted(sender, instance, **kwargs):
+    creators.remove_song(instance.uploaded_by_id)
+    search.unindex_object(search.SONG, instance.pk)
+    listening.forget('song', instance.pk)
+
+
+@receiver(post_save, sender=Podcast)
+def podcast_saved(sender, instance, **kwargs):
+    search.index_object(search.PODCAST, instance)
+
+
+@receiver(post_delete, sender=Podcast)
+def podcast_deleted(sender, instance, **kwargs):
+    search.unindex_object(search.PODCAST, instance.pk)
+
+
+@receiver(post_save, sender=Episode)
+def episode_saved(sender, instance, created, **kwargs):
+    if created:
+        notifications.fanout.schedule('episode', instance.pk)
+
+
+@receiver(post_delete, sender=Episode)
+def episode_deleted(sender, instance, **kwargs):
+    listening.forget('episode', instance.pk)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login; don't rewrite the index row for those
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    search.index_object(search.USER, instance)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    search.unindex_object(search.USER, instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    # Follow rows are cascade-deleted without m2m_changed; uncount the ones
+    # where this user is the follower (their own profile is handled below)
+    follows.apply_pairs(follows.existing_pairs(instance, reverse=True), -1)
+
+
+@receiver(post_delete, sender=CreatorPoolEntry)
+def creator_pool_entry_deleted(sender, instance, **kwargs):
+    creators.fill_slot(instance.slot)
+
+
+# Follow counts: adjust FollowStats in the same transaction as the follow rows
+@receiver(m2m_changed, sender='users.Profile_followers')
+def followers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add':
+        # pk_set only holds the ids that were actually inserted
+        if pk_set:
+            follows.apply_pairs(follows.existing_pairs(instance, reverse, pk_set), 1)
+    elif action == 'pre_remove':
+        if pk_set:
+            follows.apply_pairs(follows.existing_pairs(instance, reverse, pk_set), -1)
+    elif action == 'pre_clear':
+        follows.apply_pairs(follows.existing_pairs(instance, reverse), -1)
+
+
+@receiver(pre_delete, sender='users.Profile')
+def profile_deleting(sender, instance, **kwargs):
+    follows.apply_pairs(follows.existing_pairs(instance, reverse=False), -1)
+
+
+@receiver(post_save, sender='users.Notification')
+@receiver(post_delete, sender='users.Notification')
+def notification_changed(sender, instance, **kwargs):
+    notifications.invalidate_unread([instance.recipient_id])
+
+
+# Fragment cache invalidation: bump the model's version on any write
+FRAGMENT_CACHE_SENDERS = {
+    'song': Song,
+    'podcast': Podcast,
+    'episode': Episode,
+    'profile': 'users.Profile',
+}
+
+
+def _bump_fragment_cache(dependency):
+    def handler(sender, **kwargs):
+        fragment_cache.bump(dependency)
+    return handler
+
+
+for _dependency, _sender in FRAGMENT_CACHE_SENDERS.items():
+    _handler = _bump_fragment_cache(_dependency)
+    post_save.connect(_handler, sender=_sender, weak=False, dispatch_uid=f'fragment_cache_save_{_dependency}')
+    post_delete.connect(_handler, sender=_sender, weak=False, dispatch_uid=f'fragment_cache_delete_{_dependency}')
+
+
+# Blob reference counts for content-addressed media (music.storage)
+FILE_FIELDS = {
+    Song: ('audio_file', 'cover_image'),
+    Episode: ('audio_file',),
+    Podcast: ('cover_image',),
+    'users.Profile': ('profile_image',),
+}
+
+
+def _file_names(instance, fields):
+    # Read the raw attribute values: touching a deferred field would query the row
+    names = {}
+    for field in fields:
+        if field in instance.__dict__:
+            value = instance.__dict__[field]
+            names[field] = getattr(value, 'name', value) or ''
+    return names
+
+
+def _file_field_handlers(fields):
+    def loaded(sender, instance, **kwargs):
+        instance._stored_file_names = _file_names(instance, fields)
+
+    def saved(sender, instance, created, **kwargs):
+        previous = {} if created else instance._stored_file_names
+        current = _file_names(instance, fields)
+        for field, name in current.items():
+            if created:
+                storage.retain(name)
+            elif field in previous and previous[field] != name:
+                storage.retain(name)
+                storage.release(previous[field])
+        instance._stored_file_names = current
+
+    def deleted(sender, instance, **kwargs):
+        for name in _file_names(instance, fields).values():
+            storage.release(name)
+
+    return loaded, saved, deleted
+
+
+for _sender, _fields in FILE_FIELDS.items():
+    _label = _sender if isinstance(_sender, str) else _sender._meta.label
+    _loaded, _saved, _deleted = _file_field_handlers(_fields)
+    post_init.connect(_loaded, sender=_sender, weak=False, dispatch_uid=f'blob_refs_init_{_label}')
+    post_save.connect(_saved, sender=_sender, weak=False, dispatch_uid=f'blob_refs_save_{_label}')
+    post_delete.connect(_deleted, sender=_sender, weak=False, dispatch_uid=f'blob_refs_delete_{_label}')
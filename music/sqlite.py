@@ -0,0 +1,55 @@
+# music/sqlite.py
+
+"""
+SQLite tuning for serving the site from a single database file.
+
+``configure`` is connected to ``connection_created`` (see MusicConfig.ready)
+and applies MUSIC_SQLITE_PRAGMAS to every new SQLite connection:
+
+- ``journal_mode=WAL``: readers and the writer no longer block each other.
+- ``synchronous=NORMAL``: with WAL, fsync happens at checkpoints instead of
+  every commit. A power cut can lose the last commits but cannot corrupt the file.
+- ``busy_timeout``: wait this many ms for the write lock instead of failing
+  straight away with "database is locked".
+- ``mmap_size``/``cache_size``/``temp_store``: serve reads from memory.
+
+The rest lives in DATABASES: ``transaction_mode=IMMEDIATE`` takes the write
+lock when a transaction begins. Two deferred transactions can otherwise both
+hold read locks and deadlock when upgrading, which busy_timeout cannot
+resolve. CONN_MAX_AGE keeps connections, and their page cache, across requests.
+"""
+
+from django.conf import settings
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 ** 2,
+    'cache_size': -64000,  # KiB when negative
+    'temp_store': 'MEMORY',
+}
+
+
+def pragmas():
+    return getattr(settings, 'MUSIC_SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+
+
+def configure(sender, connection, **kwargs):
+    """connection_created handler: apply the PRAGMAs to a new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas().items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def current(connection):
+    """The values in effect on ``connection`` for the configured PRAGMAs."""
+    values = {}
+    with connection.cursor() as cursor:
+        for name in pragmas():
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    return values
@@ -0,0 +1,422 @@
+# music/static_assets.py
+
+"""
+Static asset pipeline: bundles, content-hashed names and precompression.
+
+``manage.py collectstatic`` with ``BundledStaticFilesStorage`` is the build
+step. It concatenates and minifies the CSS/JS bundles in MUSIC_STATIC_BUNDLES,
+writes every file under a content-hashed name with a ``staticfiles.json``
+manifest (Django's ManifestStaticFilesStorage), and then writes ``.gz`` and
+``.br`` variants of the hashed text files. Brotli needs the optional
+``brotli`` package; without it only gzip variants are written.
+
+Templates use ``{% static_bundle 'base.css' %}`` (music/templatetags/music_static.py).
+With MUSIC_STATIC_BUNDLED (the default when DEBUG is off) it emits one tag
+for the hashed bundle, otherwise one tag per source file for development.
+
+Hashed names never change content, so they are served with
+``Cache-Control: public, max-age=31536000, immutable`` and repeat visits make
+no static requests at all. A front-end server should do that itself, e.g.
+Nginx with ``gzip_static on; brotli_static on;`` and ``expires max;`` plus
+``add_header Cache-Control immutable;`` on the static location.
+``StaticAssetsMiddleware`` does the same from Django when MUSIC_SERVE_STATIC
+is on: it negotiates the precompressed variants and honours Range requests
+for the videos.
+
+The minifiers are deliberately conservative. They drop comments and
+redundant whitespace but keep line breaks in JS, so automatic semicolon
+insertion behaves exactly as it does in the source.
+"""
+
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .streaming import iter_file_range, parse_range
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.ico', '.map')
+
+# Only keep a compressed variant that saves at least this fraction
+MIN_SAVING = 0.05
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def bundles():
+    return getattr(settings, 'MUSIC_STATIC_BUNDLES', {})
+
+
+def bundled():
+    return getattr(settings, 'MUSIC_STATIC_BUNDLED', not settings.DEBUG)
+
+
+def bundle_name(name):
+    """
+    Storage name of a bundle: ``base.css`` -> ``css/base.bundle.css``. Bundles
+    sit next to their sources, so relative ``url()`` references still resolve.
+    """
+    stem, ext = os.path.splitext(name)
+    return f'{ext.lstrip(".")}/{stem}.bundle{ext}'
+
+
+# CSS
+
+CSS_TOKEN_RE = re.compile(r'/\*.*?\*/|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'', re.S)
+CSS_CHARSET_RE = re.compile(r'@charset\s+"[^"]*"\s*;\s*', re.I)
+
+
+def minify_css(source):
+    strings = []
+
+    def keep(match):
+        token = match.group(0)
+        if token.startswith('/*'):
+            return ' '
+        strings.append(token)
+        return f'\x00{len(strings) - 1}\x00'
+
+    css = CSS_TOKEN_RE.sub(keep, source)
+    css = re.sub(r'\s+', ' ', css)
+    # Spaces around these never matter; ':' only after, since "a :hover" differs from "a:hover"
+    css = re.sub(r' ?([{};,>]) ?', r'\1', css)
+    css = re.sub(r': ', ':', css)
+    css = css.replace(';}', '}').strip()
+    return re.sub(r'\x00(\d+)\x00', lambda m: strings[int(m.group(1))], css)
+
+
+def join_css(sources):
+    """Concatenate stylesheets; ``@charset`` is only valid first, so it is hoisted."""
+    charset = any(CSS_CHARSET_RE.match(source.lstrip('\ufeff')) for source in sources)
+    body = '\n'.join(CSS_CHARSET_RE.sub('', source.lstrip('\ufeff')) for source in sources)
+    return ('@charset "UTF-8";' if charset else '') + minify_css(body)
+
+
+# JS
+
+IDENTIFIER_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$')
+
+# A '/' after one of these (or at the start) begins a regex literal, not a division
+REGEX_PRECEDERS = frozenset('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORDS = frozenset(('return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw', 'yield', 'await'))
+
+# A space next to one of these can go; '+', '-', '/' and '.' are left alone
+# because "a + +b", "a / /re/" and "1 .toString()" need theirs
+JS_PUNCTUATION = frozenset('{}()[];,:=<>!&|?*%^~')
+
+
+def _skip_string(source, i, quote):
+    i += 1
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        i += 1
+        if char == quote or char == '\n':
+            break
+    return i
+
+
+def _skip_template(source, i):
+    """End of the template literal starting at ``i``, including nested ``${...}``."""
+    i += 1
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+        elif char == '`':
+            return i + 1
+        elif source.startswith('${', i):
+            i = _skip_expression(source, i + 2)
+        else:
+            i += 1
+    return i
+
+
+def _skip_expression(source, i):
+    depth = 0
+    while i < len(source):
+        char = source[i]
+        if char in '"\'':
+            i = _skip_string(source, i, char)
+            continue
+        if char == '`':
+            i = _skip_template(source, i)
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            if depth == 0:
+                return i + 1
+            depth -= 1
+        i += 1
+    return i
+
+
+def _skip_regex(source, i):
+    i += 1
+    in_class = False
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        i += 1
+        if char == '\n':
+            break
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '/' and not in_class:
+            break
+    while i < len(source) and source[i] in IDENTIFIER_CHARS:
+        i += 1  # flags
+    return i
+
+
+def minify_js(source):
+    out = []
+    last = ''   # last significant character written
+    word = ''   # identifier/keyword that ends the output, if any
+    pending = ''  # whitespace seen since the last token: '', ' ' or '\n'
+    i, length = 0, len(source)
+
+    def emit(token, next_char):
+        nonlocal pending, last, word
+        separated = bool(pending)
+        if pending == '\n' and out:
+            out.append('\n')
+        elif pending == ' ' and out and last not in JS_PUNCTUATION and next_char not in JS_PUNCTUATION:
+            out.append(' ')
+        pending = ''
+        out.append(token)
+        if len(token) == 1 and token in IDENTIFIER_CHARS:
+            word = word + token if last in IDENTIFIER_CHARS and not separated else token
+        else:
+            word = ''
+        # Strings, templates and regexes end like an operand
+        last = token if len(token) == 1 else 'a'
+
+    while i < length:
+        char = source[i]
+        if char in ' \t\r\n\f\v\ufeff\u00a0':
+            if char == '\n':
+                pending = '\n'
+            elif not pending:
+                pending = ' '
+            i += 1
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = length if end == -1 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = length if end == -1 else end + 2
+            if '\n' in source[i:end]:
+                pending = '\n'
+            elif not pending:
+                pending = ' '
+            i = end
+        elif char in '"\'':
+            end = _skip_string(source, i, char)
+            emit(source[i:end], char)
+            i = end
+        elif char == '`':
+            end = _skip_template(source, i)
+            emit(source[i:end], char)
+            i = end
+        elif char == '/' and (not last or last in REGEX_PRECEDERS or word in REGEX_KEYWORDS):
+            end = _skip_regex(source, i)
+            emit(source[i:end], char)
+            i = end
+        else:
+            emit(char, char)
+            i += 1
+    return ''.join(out).strip() + '\n'
+
+
+def join_js(sources):
+    # ';' guards against a file that ends without one
+    return ';\n'.join(minify_js(source) for source in sources)
+
+
+def build_bundle(name, sources):
+    return join_css(sources) if name.endswith('.css') else join_js(sources)
+
+
+# Precompression
+
+def compressors():
+    """``[(suffix, compress)]`` for the available encodings, best first."""
+    found = []
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        found.append(('.br', lambda data: brotli.compress(data, quality=11)))
+    found.append(('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)))
+    return found
+
+
+def precompress(storage, name):
+    """Write ``.br``/``.gz`` siblings of ``name`` that are worth keeping; returns their names."""
+    with storage.open(name) as source:
+        data = source.read()
+    written = []
+    for suffix, compress in compressors():
+        compressed = compress(data)
+        target = name + suffix
+        if storage.exists(target):
+            storage.delete(target)
+        if len(compressed) <= len(data) * (1 - MIN_SAVING):
+            storage._save(target, ContentFile(compressed))
+            written.append(target)
+    return written
+
+
+class BundledStaticFilesStorage(ManifestStaticFilesStorage):
+    # Without manifest_strict a name missing from the manifest is hashed from
+    # the file itself, which still raises ValueError when the file was never
+    # collected
+    manifest_strict = False
+
+    def stored_name(self, name):
+        """
+        The hashed name, or ``name`` itself for a file that is not in
+        STATIC_ROOT (base.html references images static/ does not ship), so a
+        missing asset is a 404 for that asset and not a 500 for the page.
+        """
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            yield from super().post_process(paths, dry_run, **options)
+            return
+
+        for name, sources in bundles().items():
+            contents = []
+            for source in sources:
+                if source not in paths:
+                    yield name, None, RuntimeError(f'Bundle {name}: {source} not found')
+                    return
+                storage, path = paths[source]
+                with storage.open(path) as handle:
+                    contents.append(handle.read().decode('utf-8'))
+            target = bundle_name(name)
+            if self.exists(target):
+                self.delete(target)
+            self._save(target, ContentFile(build_bundle(name, contents).encode('utf-8')))
+            paths[target] = (self, target)
+
+        yield from super().post_process(paths, dry_run, **options)
+
+        for name in sorted(set(self.hashed_files.values())):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                for target in precompress(self, name):
+                    yield name, target, True
+
+
+class StaticAssetsMiddleware:
+    """
+    Serve STATIC_ROOT with immutable caching for hashed names and the
+    precompressed variants written by collectstatic. For deployments without
+    a front-end server in front of Django (MUSIC_SERVE_STATIC).
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'MUSIC_SERVE_STATIC', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+        manifest = getattr(staticfiles_storage, 'hashed_files', {})
+        self.hashed = frozenset(manifest.values())
+
+    def __call__(self, request):
+        if request.path.startswith(self.prefix) and request.method in ('GET', 'HEAD'):
+            return self.serve(request, request.path[len(self.prefix):])
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            raise Http404('Not found')
+        if not name or name.endswith(('.gz', '.br')) or not os.path.isfile(path):
+            raise Http404('Not found')
+
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json', 'image/svg+xml'):
+            content_type += '; charset=utf-8'
+        compressible = name.endswith(COMPRESSIBLE_EXTENSIONS)
+        encoding, served = None, path
+        if compressible:
+            accepted = self.accepted_encodings(request)
+            for suffix, token in (('.br', 'br'), ('.gz', 'gzip')):
+                if token in accepted and os.path.isfile(path + suffix):
+                    encoding, served = token, path + suffix
+                    break
+
+        stat = os.stat(served)
+        response = get_conditional_response(request, last_modified=int(stat.st_mtime))
+        range_header = request.META.get('HTTP_RANGE')
+        if response is not None:
+            pass
+        elif range_header and encoding is None:
+            try:
+                byte_range = parse_range(range_header, stat.st_size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{stat.st_size}'
+                return response
+            response = self.file_response(served, content_type, stat.st_size, byte_range)
+        else:
+            response = self.file_response(served, content_type, stat.st_size, None)
+
+        if encoding:
+            response['Content-Encoding'] = encoding
+        if compressible:
+            response['Vary'] = 'Accept-Encoding'
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        # Unhashed names (plain {% static %} in DEBUG, files missing from the
+        # manifest) can change in place, so they are revalidated instead
+        response['Cache-Control'] = IMMUTABLE if name in self.hashed else 'public, max-age=0, must-revalidate'
+        return response
+
+    @staticmethod
+    def accepted_encodings(request):
+        accepted = set()
+        for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+            token, _, params = part.strip().partition(';')
+            if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                accepted.add(token.strip().lower())
+        return accepted
+
+    @staticmethod
+    def file_response(path, content_type, size, byte_range):
+        response_file = open(path, 'rb')
+        if byte_range is None:
+            response = FileResponse(response_file, content_type=content_type)
+            response['Accept-Ranges'] = 'bytes'
+            return response
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            iter_file_range(response_file, start, end - start + 1), status=206, content_type=content_type,
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Accept-Ranges'] = 'bytes'
+        return response
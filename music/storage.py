@@ -0,0 +1,213 @@
+# music/storage.py
+
+"""
+Content-addressed, deduplicated media storage.
+
+``ContentAddressedStorage`` keeps the ``upload_to`` directory but stores every
+upload as ``<dir>/<aa>/<sha256><ext>``, so identical uploads to the same field
+share one file. Data that has to be written is hashed as it streams to a temp
+file, which is then renamed into place. Uploads Django already spooled to a
+temp file are hashed there and then moved. When the blob already exists the
+bytes are not written again.
+
+Blob rows count the model fields that point at each file. The signals in
+music/signals.py call ``retain``/``release`` as rows are saved and deleted.
+The file is removed, after the transaction commits, when the last reference
+goes. Files stored before this backend (and field defaults such as
+``profile_images/default.jpg``) don't match the content-addressed pattern and
+are never counted or deleted; ``manage.py dedupe_media`` moves them over.
+
+Saving a file takes its reference up front. The storage bumps the Blob count
+(creating or locking the row) before it checks whether the content is already
+on disk, so a concurrent delete can't remove a file that an upload has just
+decided to reuse. That reference is remembered as a per-thread "claim", and
+the ``retain`` from the file field signal that follows consumes it instead of
+counting a second time.
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+import threading
+from collections import Counter
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+CHUNK_SIZE = 1024 * 1024
+
+CONTENT_ADDRESSED_NAME = re.compile(r'^(?:[\w.-]+/)*[0-9a-f]{2}/[0-9a-f]{64}(?:\.[\w]+)?$')
+
+
+def is_content_addressed(name):
+    return bool(name) and bool(CONTENT_ADDRESSED_NAME.match(name))
+
+
+def content_name(name, digest):
+    directory = posixpath.dirname(name)
+    ext = os.path.splitext(name)[1].lower()
+    return posixpath.join(directory, digest[:2], digest + ext)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save(); never add suffixes
+        return name
+
+    def _save(self, name, content):
+        if hasattr(content, 'temporary_file_path'):
+            # Already on disk: hash it in place, then move it instead of copying
+            temp_path = content.temporary_file_path()
+            owns_temp = False
+            sha = hashlib.sha256()
+            with open(temp_path, 'rb') as source:
+                for block in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    sha.update(block)
+        else:
+            directory = self.path(posixpath.dirname(name))
+            os.makedirs(directory, exist_ok=True)
+            sha = hashlib.sha256()
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.upload')
+            owns_temp = True
+            try:
+                with os.fdopen(fd, 'wb') as temp:
+                    for chunk in content.chunks(CHUNK_SIZE):
+                        sha.update(chunk)
+                        temp.write(chunk)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+
+        final = content_name(name, sha.hexdigest())
+        full_path = self.path(final)
+        try:
+            # Reference first, then look at the disk, under the same row lock
+            # that delete_if_unreferenced() holds while it unlinks
+            with transaction.atomic():
+                claim(final, os.path.getsize(temp_path))
+                if not os.path.exists(full_path):
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    if owns_temp:
+                        os.replace(temp_path, full_path)
+                    else:
+                        file_move_safe(temp_path, full_path, allow_overwrite=True)
+                    self._set_permissions(full_path)
+        finally:
+            if owns_temp and os.path.exists(temp_path):
+                os.remove(temp_path)
+        _claims()[final] += 1
+        return final
+
+    def _set_permissions(self, full_path):
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+
+
+def _blob_model():
+    from .models import Blob
+    return Blob
+
+
+_local = threading.local()
+
+
+def _claims():
+    """References taken by saves on this thread that no ``retain`` has consumed yet."""
+    if not hasattr(_local, 'claims'):
+        _local.claims = Counter()
+    return _local.claims
+
+
+def claim(name, size):
+    """
+    Count one reference to ``name`` for a file being saved, creating its Blob
+    row if needed. Must run in a transaction; the row stays locked until it
+    commits.
+    """
+    Blob = _blob_model()
+    if Blob.objects.filter(name=name).update(refcount=F('refcount') + 1):
+        return
+    try:
+        with transaction.atomic():
+            Blob.objects.create(name=name, size=size, refcount=1)
+    except IntegrityError:
+        # Created concurrently by another upload of the same content
+        Blob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+
+def register(name, size):
+    """Make sure a Blob row exists for a stored file; new rows start unreferenced."""
+    Blob = _blob_model()
+    if Blob.objects.filter(name=name).exists():
+        return
+    try:
+        with transaction.atomic():
+            Blob.objects.create(name=name, size=size)
+    except IntegrityError:
+        pass  # stored concurrently by another upload of the same content
+
+
+def retain(name, count=1):
+    """
+    Count ``count`` more model fields pointing at ``name``. References already
+    taken by saving the file on this thread are used up first.
+    """
+    if not is_content_addressed(name):
+        return
+    claims = _claims()
+    taken = min(claims[name], count)
+    if taken:
+        claims[name] -= taken
+        if not claims[name]:
+            del claims[name]
+        count -= taken
+        if not count:
+            return
+    Blob = _blob_model()
+    if not Blob.objects.filter(name=name).update(refcount=F('refcount') + count):
+        size = default_storage.size(name) if default_storage.exists(name) else 0
+        register(name, size)
+        Blob.objects.filter(name=name).update(refcount=F('refcount') + count)
+
+
+def unclaim(name):
+    """
+    Give back the reference that saving ``name`` on this thread took, for
+    callers that retain it later in their own transaction. Unlike ``release``
+    it never deletes the file: an unreferenced blob stays until
+    ``dedupe_media`` prunes it, so check the file still exists before retaining.
+    """
+    claims = _claims()
+    if not claims[name]:
+        claims.pop(name, None)
+        return
+    claims[name] -= 1
+    if not claims[name]:
+        del claims[name]
+    _blob_model().objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1)
+
+
+def release(name):
+    """Drop one reference to ``name``, deleting the file once nothing points at it."""
+    if not is_content_addressed(name):
+        return
+    Blob = _blob_model()
+    Blob.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1)
+    transaction.on_commit(lambda: delete_if_unreferenced(name))
+
+
+def delete_if_unreferenced(name):
+    """Delete the blob row and file for ``name`` if nothing references it."""
+    Blob = _blob_model()
+    with transaction.atomic():
+        # Re-check after commit: a concurrent upload may have re-referenced it.
+        # The row stays locked until the file is gone, and uploads take their
+        # reference under that lock before they look for the file.
+        blob = Blob.objects.select_for_update().filter(name=name, refcount=0).first()
+        if blob is not None:
+            Blob.objects.filter(pk=blob.pk).delete()
+            default_storage.delete(name)
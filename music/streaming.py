@@ -0,0 +1,242 @@
+# music/streaming.py
+
+"""
+Byte-serving for uploaded audio (Song/Episode).
+
+Supports single-range ``Range`` requests (206 Partial Content), ``If-Range``,
+``ETag``/``Last-Modified`` conditional GETs, and an optional handoff to the
+front-end web server via ``X-Accel-Redirect`` (Nginx) or ``X-Sendfile``
+(Apache/lighttpd) so Django never touches the bytes in production.
+
+``aserve_audio`` is the ASGI variant: same headers, but the body is read in
+a small shared thread pool and yielded from an async iterator.
+"""
+
+import asyncio
+import mimetypes
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def _chunk_size():
+    return getattr(settings, 'MUSIC_STREAM_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+def file_etag(stat):
+    # mtime + size is cheap to compute and changes whenever the file is replaced
+    return quote_etag('%x-%x' % (stat.st_mtime_ns, stat.st_size))
+
+
+def parse_range(header, size):
+    """
+    Parse a single ``bytes=start-end`` range against a file of ``size`` bytes.
+
+    Returns ``(start, end)`` (inclusive), ``None`` if the header should be
+    ignored (missing, malformed or multi-range), or raises ``ValueError`` if
+    the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('Unsatisfiable range')
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError('Unsatisfiable range')
+    return start, min(end, size - 1)
+
+
+def iter_file_range(file_obj, start, length, chunk_size=None):
+    """Yield ``length`` bytes of ``file_obj`` starting at ``start``, one chunk at a time."""
+    chunk_size = chunk_size or _chunk_size()
+    try:
+        file_obj.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = file_obj.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        file_obj.close()
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE') or '')
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def _range_applies(request, etag, mtime):
+    # If-Range: only honour the Range header if the client's copy is still current
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    if_range_date = parse_http_date_safe(if_range)
+    return if_range_date is not None and int(mtime) <= if_range_date
+
+
+def _handoff_response(field_file, content_type):
+    mode = getattr(settings, 'MUSIC_STREAM_HANDOFF', '')
+    response = HttpResponse(content_type=content_type)
+    if mode == 'x-accel-redirect':
+        prefix = getattr(settings, 'MUSIC_STREAM_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + field_file.name.lstrip('/')
+    else:
+        response['X-Sendfile'] = field_file.path
+    return response
+
+
+def _prepare(request, field_file):
+    """
+    Everything up to the body: returns ``(response, None)`` when the answer
+    is complete (handoff, 304, 404, 416), or ``(response, (path, start, length))``
+    with headers set and the byte range still to be attached.
+    """
+    content_type = mimetypes.guess_type(field_file.name)[0] or 'application/octet-stream'
+
+    if getattr(settings, 'MUSIC_STREAM_HANDOFF', ''):
+        # The front-end server does ranges, conditionals and sendfile for us
+        return _handoff_response(field_file, content_type), None
+
+    path = field_file.path
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return HttpResponse(status=404), None
+
+    size = stat.st_size
+    etag = file_etag(stat)
+    last_modified = http_date(stat.st_mtime)
+
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Last-Modified'] = last_modified
+        return response, None
+
+    byte_range = None
+    if _range_applies(request, etag, stat.st_mtime):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */%d' % size
+            return response, None
+
+    if byte_range is None:
+        start, end, status = 0, size - 1, 200
+    else:
+        start, end = byte_range
+        status = 206
+    length = end - start + 1
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type, status=status)
+        body = None
+    else:
+        response = StreamingHttpResponse(content_type=content_type, status=status)
+        body = (path, start, length)
+    if byte_range is not None:
+        response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    return response, body
+
+
+def serve_audio(request, field_file):
+    """
+    Serve ``field_file`` (a FieldFile on local storage) with HTTP range support.
+    """
+    response, body = _prepare(request, field_file)
+    if body is None:
+        return response
+    path, start, length = body
+    if response.status_code == 200:
+        # Whole file: FileResponse hands the file object to wsgi.file_wrapper,
+        # which lets the server use sendfile() when it is available
+        whole = FileResponse(open(path, 'rb'), content_type=response['Content-Type'])
+        for header in ('Content-Length', 'Accept-Ranges', 'ETag', 'Last-Modified'):
+            whole[header] = response[header]
+        return whole
+    response.streaming_content = iter_file_range(open(path, 'rb'), start, length)
+    return response
+
+
+_io_executor = None
+_io_executor_lock = threading.Lock()
+
+
+def io_executor():
+    """
+    Thread pool for the blocking file calls of async streaming. Bounded by
+    MUSIC_STREAM_IO_THREADS, so thousands of open streams share a few threads.
+    """
+    global _io_executor
+    if _io_executor is None:
+        with _io_executor_lock:
+            if _io_executor is None:
+                _io_executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'MUSIC_STREAM_IO_THREADS', 32),
+                    thread_name_prefix='audio-io',
+                )
+    return _io_executor
+
+
+async def aiter_file_range(path, start, length, chunk_size=None):
+    """Async version of iter_file_range; each open/seek/read runs in io_executor()."""
+    chunk_size = chunk_size or _chunk_size()
+    loop = asyncio.get_running_loop()
+    pool = io_executor()
+    file_obj = await loop.run_in_executor(pool, open, path, 'rb')
+    try:
+        await loop.run_in_executor(pool, file_obj.seek, start)
+        remaining = length
+        while remaining > 0:
+            data = await loop.run_in_executor(pool, file_obj.read, min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        file_obj.close()
+
+
+async def aserve_audio(request, field_file):
+    """
+    Async serve_audio for ASGI: the body is an async iterator, so a slow
+    listener holds a coroutine rather than a worker thread.
+    """
+    response, body = await asyncio.get_running_loop().run_in_executor(
+        io_executor(), _prepare, request, field_file
+    )
+    if body is not None:
+        response.streaming_content = aiter_file_range(*body)
+    return response
@@ -0,0 +1,199 @@
+# music/telemetry.py
+
+"""
+Player telemetry ingestion.
+
+The media player batches its interactions (play, pause, seek, speed changes,
+progress heartbeats) and posts them to a single beacon endpoint. The view only
+validates the batch and appends it to a bounded in-memory buffer. A background
+thread drains the buffer into TelemetryEvent rows with ``bulk_create``, so no
+page or playback request ever waits on a telemetry write.
+
+The buffer holds at most ``MUSIC_TELEMETRY_BUFFER_SIZE`` events. When it is
+full, new events are dropped rather than blocking or growing memory. The view
+then answers 429 with Retry-After, and the player backs off. Every drop is
+counted by reason: invalid, buffer full, or a failed write. The counters are
+exposed to staff through ``telemetry/stats/``.
+"""
+
+import atexit
+import logging
+import math
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import PLAYABLE_KINDS, TelemetryEvent
+from .write_queue import writer
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = frozenset(action for action, _ in TelemetryEvent.ACTION_CHOICES)
+KINDS = frozenset(kind for kind, _ in PLAYABLE_KINDS)
+
+# Client clocks are trusted only this far into the past
+MAX_EVENT_AGE = timedelta(days=1)
+
+
+def max_batch():
+    return getattr(settings, 'MUSIC_TELEMETRY_MAX_BATCH', 100)
+
+
+def _number(value):
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(value)
+    return float(value)
+
+
+def parse_events(payload, user_id, now=None):
+    """
+    Validate a decoded beacon payload. Returns ``(events, invalid)``: a list
+    of event tuples ready for the buffer and the number of entries rejected.
+    """
+    now = now or timezone.now()
+    events, invalid = [], 0
+    for item in payload:
+        try:
+            action, kind, object_id = item['action'], item['kind'], item['id']
+            if action not in ACTIONS or kind not in KINDS:
+                raise ValueError(item)
+            if isinstance(object_id, bool) or not isinstance(object_id, int) or object_id <= 0:
+                raise ValueError(object_id)
+            position, value, ts = _number(item.get('position')), _number(item.get('value')), _number(item.get('ts'))
+        except (KeyError, TypeError, ValueError):
+            invalid += 1
+            continue
+        occurred_at = now
+        if ts is not None:
+            try:
+                occurred_at = datetime.fromtimestamp(ts / 1000, tz=dt_timezone.utc)
+            except (OverflowError, OSError, ValueError):
+                pass
+            if not now - MAX_EVENT_AGE <= occurred_at <= now:
+                occurred_at = now
+        events.append((action, kind, object_id, user_id, position, value, occurred_at, now))
+    return events, invalid
+
+
+class TelemetryBuffer:
+    def __init__(self, capacity=None, flush_size=None, flush_interval=None):
+        self.capacity = capacity or getattr(settings, 'MUSIC_TELEMETRY_BUFFER_SIZE', 10000)
+        self.flush_size = flush_size or getattr(settings, 'MUSIC_TELEMETRY_FLUSH_SIZE', 500)
+        self.flush_interval = flush_interval or getattr(settings, 'MUSIC_TELEMETRY_FLUSH_INTERVAL', 2.0)
+        self._events = deque()
+        self._counters = dict.fromkeys(
+            ('accepted', 'written', 'dropped_invalid', 'dropped_full', 'dropped_write_error'), 0
+        )
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def offer(self, events, invalid=0):
+        """
+        Append events without blocking. Returns how many were accepted; the
+        rest did not fit and are counted as dropped.
+        """
+        self._ensure_started()
+        with self._lock:
+            room = max(self.capacity - len(self._events), 0)
+            accepted = events[:room]
+            self._events.extend(accepted)
+            self._counters['accepted'] += len(accepted)
+            self._counters['dropped_full'] += len(events) - len(accepted)
+            self._counters['dropped_invalid'] += invalid
+            should_wake = len(self._events) >= self.flush_size
+        if should_wake:
+            self._wake.set()
+        return len(accepted)
+
+    def stats(self):
+        with self._lock:
+            return {**self._counters, 'buffered': len(self._events), 'capacity': self.capacity}
+
+    def flush(self):
+        """Write everything buffered, ``flush_size`` rows per insert. Returns the number written."""
+        # Through the writer thread, after any flush already queued there
+        return writer.call(self._flush)
+
+    def _flush(self):
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._events.popleft() for _ in range(min(self.flush_size, len(self._events)))]
+                if not batch:
+                    return written
+                try:
+                    with transaction.atomic():
+                        # SET_NULL on TelemetryEvent.user is applied by the ORM, not the
+                        # database: events from users deleted since they were buffered
+                        # would fail the FK check on every retry, so keep them anonymous
+                        user_ids = {event[3] for event in batch if event[3] is not None}
+                        if user_ids:
+                            user_ids = set(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+                        TelemetryEvent.objects.bulk_create([
+                            TelemetryEvent(
+                                action=action, kind=kind, object_id=object_id,
+                                user_id=user_id if user_id in user_ids else None,
+                                position=position, value=value, occurred_at=occurred_at, received_at=received_at,
+                            )
+                            for action, kind, object_id, user_id, position, value, occurred_at, received_at in batch
+                        ])
+                except Exception:
+                    # Requeue what still fits at the front; telemetry is never worth blocking for
+                    with self._lock:
+                        room = max(self.capacity - len(self._events), 0)
+                        self._events.extendleft(reversed(batch[:room]))
+                        self._counters['dropped_write_error'] += len(batch) - min(room, len(batch))
+                    raise
+                written += len(batch)
+                with self._lock:
+                    self._counters['written'] += len(batch)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='telemetry-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Wake on the interval, or early once a full batch is waiting
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to write buffered telemetry events')
+            finally:
+                connection.close()
+
+    def shutdown(self):
+        """Stop the writer thread and write whatever is still buffered."""
+        self._stop.set()
+        self._wake.set()
+        self.flush()
+
+
+def prune(now=None):
+    """Delete telemetry events past MUSIC_TELEMETRY_RETENTION_DAYS. Returns the number deleted."""
+    now = now or timezone.now()
+    days = getattr(settings, 'MUSIC_TELEMETRY_RETENTION_DAYS', 30)
+    deleted, _ = TelemetryEvent.objects.filter(received_at__lt=now - timedelta(days=days)).delete()
+    return deleted
+
+
+buffer = TelemetryBuffer()
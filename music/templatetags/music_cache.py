@@ -0,0 +1,49 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from music import fragment_cache
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, name, dependencies, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.dependencies = dependencies
+        self.vary_on = vary_on
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        dependencies = [d.strip() for d in self.dependencies.resolve(context).split(',') if d.strip()]
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        # Querysets inside the block are lazy, so a hit skips their queries as well
+        html = fragment_cache.get_or_render(
+            name, dependencies, vary_on, lambda: self.nodelist.render(context)
+        )
+        return mark_safe(html)
+
+
+@register.tag('fragment_cache')
+def do_fragment_cache(parser, token):
+    """
+    Cache the enclosed markup until one of the listed models changes.
+
+        {% fragment_cache "discover_songs" "song" page_cursor user.is_authenticated %}
+            ...
+        {% endfragment_cache %}
+
+    The first argument names the fragment, the second is a comma-separated list
+    of dependencies (song, podcast, episode, profile), the rest vary the key.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a name, a dependency list and optional vary-on values")
+    nodelist = parser.parse(('endfragment_cache',))
+    parser.delete_first_token()
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
@@ -0,0 +1,42 @@
+from django import template
+from django.utils.html import format_html
+
+from music import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(field_file, alt='', sizes='100vw', css_class='', style='', width=None, height=None):
+    """
+    Render a <picture> with WebP and JPEG srcsets built from resized
+    derivatives of ``field_file``, so small tiles don't download full-size uploads.
+
+        {% responsive_image song.cover_image alt=song.title sizes="(max-width: 768px) 100vw, 33vw" css_class="card-img-top" %}
+    """
+    name = getattr(field_file, 'name', '')
+    if not name:
+        # Blank field, or a missing related object resolved to ''
+        return ''
+    size_attrs = format_html(' width="{}" height="{}"', width, height) if width and height else ''
+    if not images.is_allowed_source(name):
+        try:
+            url = field_file.url
+        except ValueError:
+            return ''
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" style="{}"{} loading="lazy" decoding="async">',
+            url, alt, css_class, style, size_attrs,
+        )
+
+    def srcset(fmt):
+        return ', '.join(f'{images.derivative_url(name, w, fmt)} {w}w' for w in images.widths())
+
+    fallback = images.derivative_url(name, images.widths()[0], 'jpeg')
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" style="{}"{} loading="lazy" decoding="async">'
+        '</picture>',
+        srcset('webp'), sizes, fallback, srcset('jpeg'), sizes, alt, css_class, style, size_attrs,
+    )
@@ -0,0 +1,15 @@
+from django import template
+
+from music import notifications
+
+register = template.Library()
+
+
+@register.simple_tag
+def unread_notification_count(user):
+    """
+    Cached unread notification count for ``user``.
+
+        {% unread_notification_count user as unread_count %}
+    """
+    return notifications.unread_count(user)
@@ -0,0 +1,24 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+from music import static_assets
+
+register = template.Library()
+
+
+@register.simple_tag
+def static_bundle(name):
+    """
+    Tags for a bundle from MUSIC_STATIC_BUNDLES: the single minified, hashed
+    bundle built by collectstatic, or each source file while developing.
+
+        {% static_bundle 'base.css' %}
+    """
+    if static_assets.bundled():
+        paths = [static_assets.bundle_name(name)]
+    else:
+        paths = static_assets.bundles()[name]
+    if name.endswith('.css'):
+        return format_html_join('\n', '<link href="{}" rel="stylesheet">', ((static(path),) for path in paths))
+    return format_html_join('\n', '<script src="{}"></script>', ((static(path),) for path in paths))
@@ -0,0 +1,130 @@
+# music/uploads.py
+
+"""
+Resumable chunked uploads.
+
+A client creates an UploadSession with the file name and total size, then
+PUTs the file in chunks, each tagged with its byte offset in the
+``Upload-Offset`` header. Chunks are streamed from the request straight onto
+the end of a part file in MUSIC_UPLOAD_DIR, so memory use is bounded by the
+read size. After a dropped connection the client asks for the current offset
+and continues from there. Finalizing hands the assembled file to the normal
+upload forms as a temporary uploaded file. The default storage then moves it
+into place instead of copying it.
+
+Concurrent requests for one session are serialized by a lock on its part
+file, not by the database: the chunk is received with no transaction open
+(SQLite would otherwise hold its write lock for the whole transfer), and
+only the new offset is committed, conditional on the old one.
+"""
+
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import locks
+from django.core.files.uploadedfile import UploadedFile
+from django.utils import timezone
+
+from .models import UploadSession
+
+READ_SIZE = 64 * 1024
+
+
+class OffsetMismatch(Exception):
+    """The chunk does not start where the stored data ends."""
+
+    def __init__(self, expected):
+        super().__init__(f'Expected offset {expected}')
+        self.expected = expected
+
+
+def upload_dir():
+    return getattr(settings, 'MUSIC_UPLOAD_DIR', os.path.join(settings.BASE_DIR, 'upload_sessions'))
+
+
+def max_size():
+    return getattr(settings, 'MUSIC_UPLOAD_MAX_SIZE', 2 * 1024 ** 3)
+
+
+def max_chunk_size():
+    return getattr(settings, 'MUSIC_UPLOAD_MAX_CHUNK_SIZE', 32 * 1024 ** 2)
+
+
+def part_path(session):
+    return os.path.join(upload_dir(), f'{session.pk}.part')
+
+
+def append_chunk(session_id, offset, stream, length):
+    """
+    Append ``length`` bytes read from ``stream`` at ``offset``. Returns the
+    updated session. Raises OffsetMismatch if ``offset`` isn't the stored end,
+    and ValueError if the chunk would run past the declared size.
+    """
+    session = UploadSession.objects.get(pk=session_id)
+    if offset + length > session.size:
+        raise ValueError('Chunk runs past the declared upload size')
+
+    os.makedirs(upload_dir(), exist_ok=True)
+    path = part_path(session)
+    with open(os.open(path, os.O_RDWR | os.O_CREAT, 0o600), 'r+b') as part:
+        locks.lock(part, locks.LOCK_EX)
+        try:
+            # Re-read under the lock: another chunk may have just been committed
+            session.refresh_from_db(fields=['offset'])
+            if offset != session.offset:
+                raise OffsetMismatch(session.offset)
+
+            # Drop bytes from an earlier chunk whose offset update never committed
+            part.truncate(offset)
+            part.seek(offset)
+            remaining = length
+            while remaining:
+                data = stream.read(min(READ_SIZE, remaining))
+                if not data:
+                    break
+                part.write(data)
+                remaining -= len(data)
+            part.flush()
+            written = length - remaining
+
+            now = timezone.now()
+            # A single conditional UPDATE: the write lock is held for one statement
+            if not UploadSession.objects.filter(pk=session.pk, offset=offset).update(offset=offset + written, updated_at=now):
+                session.refresh_from_db(fields=['offset'])
+                raise OffsetMismatch(session.offset)
+        finally:
+            locks.unlock(part)
+    session.offset, session.updated_at = offset + written, now
+    return session
+
+
+class AssembledUpload(UploadedFile):
+    """A finished part file, presented to forms like a spooled upload."""
+
+    def __init__(self, session):
+        path = part_path(session)
+        super().__init__(open(path, 'rb'), name=session.filename, size=session.size,
+                         content_type='application/octet-stream')
+        self._path = path
+
+    def temporary_file_path(self):
+        return self._path
+
+
+def discard(session):
+    """Delete a session and whatever part of its file is still on disk."""
+    path = part_path(session)
+    session.delete()
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def expire(hours):
+    """Discard sessions untouched for ``hours``. Returns how many were removed."""
+    stale = UploadSession.objects.filter(updated_at__lt=timezone.now() - timedelta(hours=hours))
+    count = 0
+    for session in stale.iterator():
+        discard(session)
+        count += 1
+    return count
@@ -1,17 +1,41 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+def asgi_or_wsgi(sync_view, async_view):
+    # chatgpt/asgi.py turns MUSIC_ASYNC_VIEWS on, so WSGI keeps the sync views
+    return async_view if settings.MUSIC_ASYNC_VIEWS else sync_view
+
 app_name = 'music'
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('discover/', views.discover, name='discover'),
+    path('discover/feed/', views.discover_feed, name='discover_feed'),
     path('upload/', views.upload_song, name='upload_song'),
+    path('uploads/', views.create_upload, name='create_upload'),
+    path('uploads/<uuid:session_id>/', views.upload_session, name='upload_session'),
+    path('uploads/<uuid:session_id>/finalize/', views.finalize_upload, name='finalize_upload'),
     path('my-songs/', views.my_songs, name='my_songs'),
     path('song/<int:pk>/', views.song_detail, name='song_detail'),
     path('song/<int:pk>/delete/', views.delete_song, name='delete_song'),
-    path('song/<int:pk>/play/', views.increment_play_count, name='increment_play_count'),
-    path('search/', views.search_results, name='search_results'),
+    path('song/<int:pk>/play/', asgi_or_wsgi(views.increment_play_count, views.increment_play_count_async), name='increment_play_count'),
+    path('song/<int:pk>/stream/', asgi_or_wsgi(views.stream_song, views.stream_song_async), name='stream_song'),
+    path('song/<int:pk>/waveform/<int:bins>/', views.song_waveform, name='song_waveform'),
+    path('song/<int:pk>/up-next/', views.up_next, name='up_next'),
+    path('search/', asgi_or_wsgi(views.search_results, views.search_results_async), name='search_results'),
+    path('player/metadata/', views.player_metadata, name='player_metadata'),
+    path('charts/', views.charts, name='charts'),
+    path('cache/stats/', views.fragment_cache_stats, name='fragment_cache_stats'),
+    path('following/', views.following_status, name='following_status'),
+    path('notifications/unread/', views.unread_notifications, name='unread_notifications'),
+    path('listening/continue/', views.continue_listening, name='continue_listening'),
+    path('listening/history/', views.listening_history, name='listening_history'),
+    path('telemetry/', views.telemetry_beacon, name='telemetry_beacon'),
+    path('telemetry/stats/', views.telemetry_stats, name='telemetry_stats'),
+    path('img/<int:width>/<str:fmt>/', views.image_derivative, name='image_derivative'),
+    path('api/<slug:resource>/', views.catalog_list, name='catalog_list'),
+    path('api/<slug:resource>/<int:pk>/', views.catalog_detail, name='catalog_detail'),
     
     # Podcast URLs
     path('podcasts/', views.podcasts, name='podcasts'),
@@ -21,5 +45,7 @@ urlpatterns = [
     path('podcast/<int:podcast_pk>/episode/upload/', views.upload_episode, name='upload_episode'),
     path('episode/<int:pk>/', views.episode_detail, name='episode_detail'),
     path('episode/<int:pk>/delete/', views.delete_episode, name='delete_episode'),
-    path('episode/<int:pk>/play/', views.increment_episode_play_count, name='increment_episode_play_count'),
+    path('episode/<int:pk>/play/', asgi_or_wsgi(views.increment_episode_play_count, views.increment_episode_play_count_async), name='increment_episode_play_count'),
+    path('episode/<int:pk>/stream/', asgi_or_wsgi(views.stream_episode, views.stream_episode_async), name='stream_episode'),
+    path('episode/<int:pk>/waveform/<int:bins>/', views.episode_waveform, name='episode_waveform'),
 ]
\ No newline at end of file
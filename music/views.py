@@ -1,21 +1,65 @@
+import hashlib
+import json
+import math
+import os
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.http import JsonResponse
-from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.urls import reverse
+from django.views.decorators.http import require_POST, require_safe
+
+from . import catalog_api, charts as trending, follows, fragment_cache, images, listening, notifications, recommendations, search, telemetry, uploads, waveforms
+from .audio_metadata import read_audio_metadata
+from .creators import sample_creators
+from .models import Song, Podcast, Episode, UploadSession
+from .forms import SongUploadForm, PodcastUploadForm, EpisodeUploadForm, validate_audio_file
+from .pagination import LazyKeysetPage, keyset_page, parse_page_size
+from .play_counter import play_counter
+from .streaming import aserve_audio, serve_audio
+
+# Querysets for list/card rendering: every relation the templates touch is
+# joined or annotated up front, so the query count doesn't grow with the rows.
+def song_card_queryset():
+    return Song.objects.select_related('uploaded_by')
 
-from .models import Song, Podcast, Episode
-from .forms import SongUploadForm, PodcastUploadForm, EpisodeUploadForm
+def podcast_card_queryset():
+    # Correlated subquery rather than a JOIN + GROUP BY, so the count is only
+    # evaluated for the rows that survive the page LIMIT
+    episode_count = (
+        Episode.objects.filter(podcast=OuterRef('pk'))
+        .order_by().values('podcast').annotate(n=Count('pk')).values('n')
+    )
+    return Podcast.objects.select_related('host').annotate(
+        episode_count=Coalesce(Subquery(episode_count, output_field=IntegerField()), Value(0))
+    )
+
+def user_card_queryset():
+    song_count = (
+        Song.objects.filter(uploaded_by=OuterRef('pk'))
+        .order_by().values('uploaded_by').annotate(n=Count('pk')).values('n')
+    )
+    return User.objects.select_related('profile').annotate(
+        song_count=Coalesce(Subquery(song_count, output_field=IntegerField()), Value(0))
+    )
 
 # CORE VIEWS
 def home(request):
-    songs = Song.objects.all().order_by('-upload_date')
-    podcasts = Podcast.objects.all().order_by('-created_at')
-    
-    import random
-    users_with_songs = User.objects.filter(song__isnull=False).distinct()
-    suggested_users = random.sample(list(users_with_songs), min(4, users_with_songs.count())) if users_with_songs else []
+    songs, _ = keyset_page(song_card_queryset(), 'upload_date')
+    podcasts, _ = keyset_page(podcast_card_queryset(), 'created_at')
+    suggested_users = sample_creators(4)
     
     context = {
         'songs': songs,
@@ -24,14 +68,20 @@ def home(request):
     }
     return render(request, 'music/index.html', context)
 
+def save_song_upload(form, user):
+    """Create the Song from a valid SongUploadForm (used by the form and chunked uploads)."""
+    song = form.save(commit=False)
+    song.uploaded_by = user
+    read_audio_metadata(song, fill_tags=('album', 'genre'))
+    song.save()
+    return song
+
 @login_required
 def upload_song(request):
     if request.method == 'POST':
         form = SongUploadForm(request.POST, request.FILES)
         if form.is_valid():
-            song = form.save(commit=False)
-            song.uploaded_by = request.user
-            song.save()
+            save_song_upload(form, request.user)
             messages.success(request, 'Song uploaded successfully!')
             return redirect('music:home')
     else:
@@ -40,19 +90,20 @@ def upload_song(request):
 
 @login_required
 def my_songs(request):
-    songs = Song.objects.filter(uploaded_by=request.user)
+    songs = song_card_queryset().filter(uploaded_by=request.user)
     return render(request, 'music/my_songs.html', {'songs': songs})
 
 def song_detail(request, pk):
-    song = get_object_or_404(Song, pk=pk)
+    song = get_object_or_404(Song.objects.select_related('uploaded_by__profile'), pk=pk)
     
     is_following = False
     if request.user.is_authenticated and request.user != song.uploaded_by:
-        is_following = request.user in song.uploaded_by.profile.followers.all()
+        is_following = follows.is_following(request.user, song.uploaded_by_id)
     
     context = {
         'song': song,
-        'is_following': is_following
+        'is_following': is_following,
+        'follower_count': follows.counts(song.uploaded_by_id)[0],
     }
     return render(request, 'music/song_detail.html', context)
 
@@ -81,20 +132,30 @@ def upload_podcast(request):
     return render(request, 'music/upload_podcast.html', {'form': form})
 
 def podcast_detail(request, pk):
-    podcast = get_object_or_404(Podcast, pk=pk)
+    podcast = get_object_or_404(Podcast.objects.select_related('host__profile'), pk=pk)
     episodes = podcast.episodes.all().order_by('-published_date')
     
     is_following = False
     if request.user.is_authenticated and request.user != podcast.host:
-        is_following = request.user in podcast.host.profile.followers.all()
+        is_following = follows.is_following(request.user, podcast.host_id)
     
     context = {
         'podcast': podcast,
         'episodes': episodes,
-        'is_following': is_following
+        'is_following': is_following,
+        'follower_count': follows.counts(podcast.host_id)[0],
+        'is_host': request.user.is_authenticated and podcast.host_id == request.user.pk,
     }
     return render(request, 'music/podcast_detail.html', context)
 
+def save_episode_upload(form, podcast):
+    """Create the Episode from a valid EpisodeUploadForm (used by the form and chunked uploads)."""
+    episode = form.save(commit=False)
+    episode.podcast = podcast
+    read_audio_metadata(episode)
+    episode.save()
+    return episode
+
 @login_required
 def upload_episode(request, podcast_pk):
     podcast = get_object_or_404(Podcast, pk=podcast_pk)
@@ -102,9 +163,7 @@ def upload_episode(request, podcast_pk):
     if request.method == 'POST':
         form = EpisodeUploadForm(request.POST, request.FILES)
         if form.is_valid():
-            episode = form.save(commit=False)
-            episode.podcast = podcast
-            episode.save()
+            save_episode_upload(form, podcast)
             messages.success(request, 'Episode uploaded successfully!')
             return redirect('music:podcast_detail', pk=podcast.pk)
     else:
@@ -113,7 +172,7 @@ def upload_episode(request, podcast_pk):
     return render(request, 'music/upload_episode.html', {'form': form, 'podcast': podcast})
 
 def episode_detail(request, pk):
-    episode = get_object_or_404(Episode, pk=pk)
+    episode = get_object_or_404(Episode.objects.select_related('podcast__host'), pk=pk)
     
     context = {
         'episode': episode
@@ -124,58 +183,160 @@ def episode_detail(request, pk):
 def delete_episode(request, pk):
     episode = get_object_or_404(Episode, pk=pk, podcast__host=request.user)
     if request.method == 'POST':
-        podcast_pk = episode.podcast.pk
+        podcast_pk = episode.podcast_id
         episode.delete()
         messages.success(request, 'Episode deleted successfully!')
         return redirect('music:podcast_detail', pk=podcast_pk)
     return render(request, 'music/delete_episode.html', {'episode': episode})
 
 def podcasts(request):
-    podcasts = Podcast.objects.all().order_by('-created_at')
+    podcasts = podcast_card_queryset().order_by('-created_at')
     return render(request, 'music/podcasts.html', {'podcasts': podcasts})
 
 @login_required
 def my_podcasts(request):
-    podcasts = Podcast.objects.filter(host=request.user)
+    podcasts = podcast_card_queryset().filter(host=request.user)
     return render(request, 'music/my_podcasts.html', {'podcasts': podcasts})
 
 # SEARCH & PLAYER VIEWS
-def search_results(request):
-    query = request.GET.get('q')
-    song_results = []
-    user_results = []
-    podcast_results = []
-    
-    if query:
-        song_results = Song.objects.filter(
+SEARCH_RESULTS_LIMIT = 20
+
+def ranked_search_results(query):
+    """FTS5 results for ``query``, or None when the index can't be used."""
+    if not search.is_available():
+        return None
+    querysets = {
+        'songs': song_card_queryset(),
+        'users': user_card_queryset(),
+        'podcasts': podcast_card_queryset(),
+    }
+    return search.search(query, limit=SEARCH_RESULTS_LIMIT, querysets=querysets)
+
+def fallback_search_querysets(query):
+    # No FTS5 index (non-SQLite database or not built yet)
+    return {
+        'songs': song_card_queryset().filter(
             Q(title__icontains=query) | 
             Q(artist__icontains=query) | 
             Q(genre__icontains=query)
-        )
-        
-        user_results = User.objects.filter(
+        )[:SEARCH_RESULTS_LIMIT],
+        'users': user_card_queryset().filter(
             Q(username__icontains=query) |
             Q(first_name__icontains=query) |
             Q(last_name__icontains=query)
-        )
-        
-        podcast_results = Podcast.objects.filter(
+        )[:SEARCH_RESULTS_LIMIT],
+        'podcasts': podcast_card_queryset().filter(
             Q(title__icontains=query) |
             Q(description__icontains=query)
-        )
-    
-    context = {
-        'query': query,
-        'songs': song_results,
-        'users': user_results,
-        'podcasts': podcast_results,
+        )[:SEARCH_RESULTS_LIMIT],
     }
+
+def search_results(request):
+    query = request.GET.get('q')
+    results = {'songs': [], 'users': [], 'podcasts': []}
+    if query:
+        results = ranked_search_results(query)
+        if results is None:
+            results = fallback_search_querysets(query)
+    
+    context = {'query': query, **results}
     return render(request, 'music/search_results.html', context)
 
+# Feed name -> (queryset, keyset time field, fragment template, context name, cache dependencies)
+DISCOVER_FEEDS = {
+    'songs': (song_card_queryset, 'upload_date', 'partials/song_track_items.html', 'songs', ('song',)),
+    'podcasts': (podcast_card_queryset, 'created_at', 'partials/podcast_cards.html', 'podcasts', ('podcast', 'episode')),
+}
+
 def discover(request):
-    songs = Song.objects.all().order_by('-upload_date')
-    podcasts = Podcast.objects.all().order_by('-created_at')
-    return render(request, 'music/discover.html', {'songs': songs, 'podcasts': podcasts})
+    cursor = request.GET.get('cursor') or ''
+    page_size = parse_page_size(request.GET.get('page_size'))
+    # Pages are lazy: when the template's fragment cache hits, no feed query runs
+    context = {
+        'song_page': LazyKeysetPage(song_card_queryset(), 'upload_date', cursor, page_size),
+        'podcast_page': LazyKeysetPage(podcast_card_queryset(), 'created_at', page_size=page_size),
+        'page_cursor': cursor,
+        'page_size': page_size,
+    }
+    return render(request, 'music/discover.html', context)
+
+@require_safe
+def discover_feed(request):
+    """
+    Infinite-scroll endpoint for the discover page.
+    Returns the next page of cards as an HTML fragment plus the cursor for the page after it.
+    """
+    feed = DISCOVER_FEEDS.get(request.GET.get('kind', 'songs'))
+    if feed is None:
+        return HttpResponseBadRequest('Unknown feed')
+    queryset, time_field, template_name, context_name, dependencies = feed
+    cursor = request.GET.get('cursor') or ''
+    page_size = parse_page_size(request.GET.get('page_size'))
+
+    def render_page():
+        items, next_cursor = keyset_page(queryset(), time_field, cursor, page_size)
+        html = render_to_string(template_name, {context_name: items}, request=request)
+        return json.dumps({'html': html, 'next_cursor': next_cursor, 'count': len(items)})
+
+    payload = fragment_cache.get_or_render(
+        f'discover_feed_{request.GET.get("kind", "songs")}', dependencies, (cursor, page_size), render_page
+    )
+    return HttpResponse(payload, content_type='application/json')
+
+def song_player_data(song):
+    """Static player metadata for a song; changes only when the song is edited."""
+    return {
+        'id': song.id,
+        'title': song.title,
+        'artist': song.artist,
+        'album': song.album,
+        'audio_url': reverse('music:stream_song', args=[song.pk]),
+        'cover_url': song.cover_image.url if song.cover_image else '/static/images/default-album-art.jpg',
+        'duration': song.duration or 0,
+        'bitrate': song.bitrate,
+        'sample_rate': song.sample_rate,
+        'waveform_url': waveform_url('song', song),
+    }
+
+def episode_player_data(episode):
+    """Static player metadata for an episode (needs ``podcast`` loaded)."""
+    return {
+        'id': episode.id,
+        'title': episode.title,
+        'podcast': episode.podcast.title,
+        'audio_url': reverse('music:stream_episode', args=[episode.pk]),
+        'cover_url': episode.podcast.cover_image.url if episode.podcast.cover_image else '/static/images/default-album-art.jpg',
+        'duration': episode.duration or 0,
+        'bitrate': episode.bitrate,
+        'sample_rate': episode.sample_rate,
+        'waveform_url': waveform_url('episode', episode),
+    }
+
+def song_play_response(song, current_time):
+    # Song data for the media player
+    return JsonResponse({
+        'success': True,
+        'song': {
+            **song_player_data(song),
+            'play_count': song.play_count + play_counter.pending(Song, song.pk),
+            'current_time': current_time,
+            'is_playing': True,
+            'playback_speed': 1.0
+        },
+    })
+
+def episode_play_response(episode, current_time):
+    # Episode data for the media player
+    return JsonResponse({
+        'success': True,
+        'episode': {
+            **episode_player_data(episode),
+            'play_count': episode.play_count + play_counter.pending(Episode, episode.pk),
+            'current_time': current_time,
+            'is_playing': True,
+            'playback_speed': 1.0
+        },
+    })
 
 def increment_play_count(request, pk):
     """
@@ -184,28 +345,10 @@ def increment_play_count(request, pk):
     """
     if request.method == 'POST':
         song = get_object_or_404(Song, pk=pk)
-        song.play_count += 1
-        song.save()
+        # Buffered and flushed in batches as play_count = play_count + n
+        play_counter.record(Song, song.pk, user_id=request.user.pk)
         
-        # Return song data for the media player
-        song_data = {
-            'id': song.id,
-            'title': song.title,
-            'artist': song.artist,
-            'album': song.album,
-            'audio_url': song.audio_file.url,
-            'cover_url': song.cover_image.url if song.cover_image else '/static/images/default-album-art.jpg',
-            'duration': 0,  # You might want to add a duration field to your model
-            'play_count': song.play_count,
-            'current_time': 0,
-            'is_playing': True,
-            'playback_speed': 1.0
-        }
-        
-        return JsonResponse({
-            'success': True,
-            'song': song_data
-        })
+        return song_play_response(song, listening.resume_position(request.user.pk, 'song', song.pk))
     
     # Return an error if the request method is not POST
     return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
@@ -216,28 +359,526 @@ def increment_episode_play_count(request, pk):
     Called via JavaScript (AJAX) when an episode is played.
     """
     if request.method == 'POST':
-        episode = get_object_or_404(Episode, pk=pk)
-        episode.play_count += 1
-        episode.save()
+        episode = get_object_or_404(Episode.objects.select_related('podcast'), pk=pk)
+        play_counter.record(Episode, episode.pk, user_id=request.user.pk)
         
-        # Return episode data for the media player
-        episode_data = {
-            'id': episode.id,
-            'title': episode.title,
-            'podcast': episode.podcast.title,
-            'audio_url': episode.audio_file.url,
-            'cover_url': episode.podcast.cover_image.url if episode.podcast.cover_image else '/static/images/default-album-art.jpg',
-            'duration': 0,  # You might want to add a duration field to your model
-            'play_count': episode.play_count,
-            'current_time': 0,
-            'is_playing': True,
-            'playback_speed': 1.0
-        }
-        
-        return JsonResponse({
-            'success': True,
-            'episode': episode_data
-        })
+        return episode_play_response(episode, listening.resume_position(request.user.pk, 'episode', episode.pk))
     
     # Return an error if the request method is not POST
-    return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
\ No newline at end of file
+    return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+
+PLAYER_METADATA_MAX_IDS = 100
+
+def parse_id_list(value):
+    return {int(i) for i in value.split(',') if i.strip()}
+
+@require_safe
+def player_metadata(request):
+    """
+    Player metadata for a batch of tracks, e.g. to fill the queue:
+    ``?songs=1,2,3&episodes=4,5``. Read-only (plays are counted by the play
+    endpoints), one query per model, and revalidated with an ETag.
+    Unknown ids are left out.
+    """
+    try:
+        song_ids = parse_id_list(request.GET.get('songs', ''))
+        episode_ids = parse_id_list(request.GET.get('episodes', ''))
+    except ValueError:
+        return HttpResponseBadRequest('songs and episodes must be comma-separated lists of integers')
+    if len(song_ids) + len(episode_ids) > PLAYER_METADATA_MAX_IDS:
+        return HttpResponseBadRequest(f'At most {PLAYER_METADATA_MAX_IDS} ids per request')
+
+    songs = Song.objects.filter(pk__in=song_ids).only(
+        'title', 'artist', 'album', 'audio_file', 'cover_image', 'duration', 'bitrate', 'sample_rate',
+    ).order_by('pk') if song_ids else []
+    episodes = Episode.objects.filter(pk__in=episode_ids).select_related('podcast').only(
+        'title', 'audio_file', 'duration', 'bitrate', 'sample_rate', 'podcast__title', 'podcast__cover_image',
+    ).order_by('pk') if episode_ids else []
+    body = json.dumps({
+        'songs': [song_player_data(song) for song in songs],
+        'episodes': [episode_player_data(episode) for episode in episodes],
+    }, separators=(',', ':'))
+
+    etag = '"%s"' % hashlib.md5(body.encode()).hexdigest()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    # Same for every user; revalidation after expiry is a cheap 304
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+# STREAMING VIEWS
+@require_safe
+def stream_song(request, pk):
+    """
+    Serve a song's audio file with HTTP Range support so the player can seek
+    without re-downloading the whole track.
+    """
+    song = get_object_or_404(Song, pk=pk)
+    return serve_audio(request, song.audio_file)
+
+@require_safe
+def stream_episode(request, pk):
+    """
+    Serve an episode's audio file with HTTP Range support.
+    """
+    episode = get_object_or_404(Episode, pk=pk)
+    return serve_audio(request, episode.audio_file)
+
+# ASYNC VIEWS
+# Served instead of their sync counterparts when running under ASGI (see
+# music/urls.py and chatgpt/asgi.py). Database access goes through the async
+# ORM and file reads through a bounded thread pool, so a slow listener or
+# query waits as a coroutine instead of holding a worker thread.
+async def increment_play_count_async(request, pk):
+    """Async increment_play_count."""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    try:
+        song = await Song.objects.aget(pk=pk)
+    except Song.DoesNotExist:
+        raise Http404('No Song matches the given query.')
+    user = await request.auser()
+    # Normally an in-memory append, but a full buffer flushes to the database
+    await sync_to_async(play_counter.record)(Song, song.pk, user_id=user.pk)
+    return song_play_response(song, await listening.aresume_position(user.pk, 'song', song.pk))
+
+async def increment_episode_play_count_async(request, pk):
+    """Async increment_episode_play_count."""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    try:
+        episode = await Episode.objects.select_related('podcast').aget(pk=pk)
+    except Episode.DoesNotExist:
+        raise Http404('No Episode matches the given query.')
+    user = await request.auser()
+    await sync_to_async(play_counter.record)(Episode, episode.pk, user_id=user.pk)
+    return episode_play_response(episode, await listening.aresume_position(user.pk, 'episode', episode.pk))
+
+@require_safe
+async def stream_song_async(request, pk):
+    """Async stream_song: the file is read in chunks off the event loop."""
+    try:
+        song = await Song.objects.only('audio_file').aget(pk=pk)
+    except Song.DoesNotExist:
+        raise Http404('No Song matches the given query.')
+    return await aserve_audio(request, song.audio_file)
+
+@require_safe
+async def stream_episode_async(request, pk):
+    """Async stream_episode."""
+    try:
+        episode = await Episode.objects.only('audio_file').aget(pk=pk)
+    except Episode.DoesNotExist:
+        raise Http404('No Episode matches the given query.')
+    return await aserve_audio(request, episode.audio_file)
+
+async def search_results_async(request):
+    """Async search_results."""
+    query = request.GET.get('q')
+    results = {'songs': [], 'users': [], 'podcasts': []}
+    if query:
+        # FTS5 MATCH is raw SQL, which has no async API
+        results = await sync_to_async(ranked_search_results)(query)
+        if results is None:
+            results = {}
+            for name, queryset in fallback_search_querysets(query).items():
+                results[name] = [obj async for obj in queryset]
+    # Templates render synchronously (base.html reads the user and notifications)
+    return await sync_to_async(render)(request, 'music/search_results.html', {'query': query, **results})
+
+@staff_member_required
+def fragment_cache_stats(request):
+    """
+    Hit/miss counters for the fragment cache in this worker process.
+    """
+    return JsonResponse({'fragments': fragment_cache.stats.snapshot()})
+
+# WAVEFORM VIEWS
+def waveform_url(kind, obj, bins=waveforms.LEVELS[0]):
+    """Versioned URL of an item's peaks, or None if they haven't been built yet."""
+    version = waveforms.existing_version(kind, obj)
+    if version is None:
+        return None
+    return reverse(f'music:{kind}_waveform', args=[obj.pk, bins]) + f'?v={version}'
+
+def serve_waveform(request, kind, obj, bins):
+    if bins not in waveforms.LEVELS:
+        raise Http404('Unknown zoom level')
+    version = waveforms.existing_version(kind, obj)
+    if version is None:
+        raise Http404('Waveform not built')
+    response = FileResponse(
+        default_storage.open(waveforms.peaks_name(kind, obj.pk, version, bins), 'rb'),
+        content_type='application/octet-stream',
+    )
+    response['ETag'] = f'"{version}-{bins}"'
+    response['X-Waveform-Bins'] = str(bins)
+    response['X-Waveform-Bits'] = str(waveforms.bits())
+    if request.GET.get('v') == version:
+        # The URL names this exact version of the audio, so it can never change
+        patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=300)
+    return response
+
+@require_safe
+def song_waveform(request, pk, bins):
+    """
+    Min/max peak pairs for a song at one zoom level, as raw int8/int16 bytes.
+    """
+    song = get_object_or_404(Song, pk=pk)
+    return serve_waveform(request, 'song', song, bins)
+
+@require_safe
+def episode_waveform(request, pk, bins):
+    episode = get_object_or_404(Episode, pk=pk)
+    return serve_waveform(request, 'episode', episode, bins)
+
+# CHART VIEWS
+@require_safe
+def charts(request):
+    """Trending songs (overall or for ``?genre=``) and episodes, from the precomputed chart table."""
+    genre = request.GET.get('genre', '')
+    context = {
+        'genre': genre,
+        'genres': trending.chart_genres(),
+        'songs': trending.chart('song', genre),
+        'episodes': [] if genre else trending.chart('episode'),
+    }
+    return render(request, 'music/charts.html', context)
+
+# RECOMMENDATION VIEWS
+UP_NEXT_MAX_LIMIT = 50
+UP_NEXT_MAX_EXCLUDE = 200
+
+@require_safe
+def up_next(request, pk):
+    """
+    Songs to queue after this one (``?limit=``), skipping ``?exclude=1,2,3``
+    ids the player has already queued.
+    """
+    song = get_object_or_404(Song, pk=pk)
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), UP_NEXT_MAX_LIMIT)
+        exclude = parse_id_list(request.GET.get('exclude', ''))
+    except ValueError:
+        return HttpResponseBadRequest('limit and exclude must be integers')
+    if len(exclude) > UP_NEXT_MAX_EXCLUDE:
+        return HttpResponseBadRequest(f'At most {UP_NEXT_MAX_EXCLUDE} excluded ids per request')
+    songs = recommendations.up_next(song, limit, exclude)
+    return JsonResponse({'songs': [
+        {
+            'id': s.pk,
+            'title': s.title,
+            'artist': s.artist,
+            'cover_url': s.cover_image.url if s.cover_image else '/static/images/default-album-art.jpg',
+            'duration': s.duration or 0,
+        }
+        for s in songs
+    ]})
+
+# CHUNKED UPLOAD VIEWS
+def upload_session_data(session):
+    return {
+        'id': str(session.pk),
+        'offset': session.offset,
+        'size': session.size,
+        'upload_url': reverse('music:upload_session', args=[session.pk]),
+        'finalize_url': reverse('music:finalize_upload', args=[session.pk]),
+    }
+
+@login_required
+@require_POST
+def create_upload(request):
+    """
+    Start a resumable upload. POST ``kind`` (song/episode), ``filename``,
+    ``size`` and, for episodes, ``podcast``; then PUT the chunks to upload_url.
+    """
+    kind = request.POST.get('kind', 'song')
+    filename = os.path.basename(request.POST.get('filename', ''))
+    size = request.POST.get('size', '')
+    if kind not in ('song', 'episode'):
+        return JsonResponse({'error': 'kind must be "song" or "episode"'}, status=400)
+    if not size.isdigit() or not 0 < int(size) <= uploads.max_size():
+        return JsonResponse({'error': f'size must be between 1 and {uploads.max_size()} bytes'}, status=400)
+    try:
+        validate_audio_file(File(None, name=filename))
+    except ValidationError as exc:
+        return JsonResponse({'error': exc.messages[0]}, status=400)
+
+    podcast = None
+    if kind == 'episode':
+        podcast_pk = request.POST.get('podcast', '')
+        if not podcast_pk.isdigit():
+            return JsonResponse({'error': 'podcast is required for episodes'}, status=400)
+        podcast = get_object_or_404(Podcast, pk=podcast_pk, host=request.user)
+
+    session = UploadSession.objects.create(
+        user=request.user, kind=kind, podcast=podcast, filename=filename, size=int(size)
+    )
+    return JsonResponse(upload_session_data(session), status=201)
+
+@login_required
+def upload_session(request, session_id):
+    """
+    GET/HEAD: current offset. PUT: append the body at the ``Upload-Offset``
+    header (409 with the expected offset if it doesn't match). DELETE: abort.
+    """
+    session = get_object_or_404(UploadSession, pk=session_id, user=request.user)
+    if request.method == 'PUT':
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'Upload-Offset and Content-Length headers are required'}, status=400)
+        if length > uploads.max_chunk_size():
+            return JsonResponse({'error': f'Chunks are limited to {uploads.max_chunk_size()} bytes'}, status=413)
+        try:
+            session = uploads.append_chunk(session.pk, offset, request, length)
+        except uploads.OffsetMismatch as exc:
+            response = JsonResponse({'error': 'Offset mismatch', 'offset': exc.expected}, status=409)
+            response['Upload-Offset'] = exc.expected
+            return response
+        except ValueError as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+    elif request.method == 'DELETE':
+        uploads.discard(session)
+        return HttpResponse(status=204)
+    elif request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD', 'PUT', 'DELETE'])
+
+    response = JsonResponse(upload_session_data(session))
+    response['Upload-Offset'] = session.offset
+    response['Cache-Control'] = 'no-store'
+    return response
+
+@login_required
+@require_POST
+def finalize_upload(request, session_id):
+    """
+    Validate the assembled file and metadata with the normal upload form and
+    create the Song/Episode. POST the same fields as the upload pages.
+    """
+    session = get_object_or_404(UploadSession.objects.select_related('podcast'), pk=session_id, user=request.user)
+    if session.offset != session.size:
+        return JsonResponse({'error': 'Upload is incomplete', 'offset': session.offset}, status=409)
+
+    upload = uploads.AssembledUpload(session)
+    files = request.FILES.copy()
+    files['audio_file'] = upload
+    try:
+        if session.kind == 'song':
+            form = SongUploadForm(request.POST, files)
+            if form.is_valid():
+                song = save_song_upload(form, request.user)
+                redirect_url = reverse('music:song_detail', args=[song.pk])
+        else:
+            form = EpisodeUploadForm(request.POST, files)
+            if form.is_valid():
+                episode = save_episode_upload(form, session.podcast)
+                redirect_url = reverse('music:episode_detail', args=[episode.pk])
+    finally:
+        upload.close()
+
+    if not form.is_valid():
+        # Keep the session so the client can fix the metadata and finalize again
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+    uploads.discard(session)
+    return JsonResponse({'success': True, 'redirect_url': redirect_url}, status=201)
+
+# FOLLOW VIEWS
+FOLLOWING_STATUS_MAX_IDS = 200
+
+@login_required
+@require_safe
+def following_status(request):
+    """
+    Which of the given creators (``?ids=1,2,3`` user ids) the current user
+    follows, so list pages can render follow buttons with one request.
+    """
+    try:
+        ids = parse_id_list(request.GET.get('ids', ''))
+    except ValueError:
+        return HttpResponseBadRequest('ids must be a comma-separated list of integers')
+    if len(ids) > FOLLOWING_STATUS_MAX_IDS:
+        return HttpResponseBadRequest(f'At most {FOLLOWING_STATUS_MAX_IDS} ids per request')
+    following = follows.following_ids(request.user, ids)
+    counts = follows.counts_for(ids)
+    return JsonResponse({
+        'following': sorted(following),
+        'follower_counts': {str(i): counts.get(i, (0, 0))[0] for i in sorted(ids)},
+    })
+
+# NOTIFICATION VIEWS
+@login_required
+@require_safe
+def unread_notifications(request):
+    """Unread notification count for polling, served from the per-user cache."""
+    return JsonResponse({'unread': notifications.unread_count(request.user)})
+
+# LISTENING VIEWS
+LISTENING_MAX_LIMIT = 50
+
+def listening_items_response(request, in_progress):
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), LISTENING_MAX_LIMIT)
+    except ValueError:
+        return HttpResponseBadRequest('limit must be an integer')
+    items = []
+    for obj in listening.recent(request.user, limit, in_progress=in_progress):
+        data = song_player_data(obj) if obj.listening_kind == 'song' else episode_player_data(obj)
+        items.append({
+            **data,
+            'kind': obj.listening_kind,
+            'current_time': obj.resume_position,
+            'listened_at': obj.listened_at.isoformat(),
+        })
+    return JsonResponse({'items': items})
+
+@login_required
+@require_safe
+def continue_listening(request):
+    """Unfinished songs/episodes with the position to resume from, most recent first."""
+    return listening_items_response(request, in_progress=True)
+
+@login_required
+@require_safe
+def listening_history(request):
+    """Everything the user has played, most recent first (one entry per item)."""
+    return listening_items_response(request, in_progress=False)
+
+# TELEMETRY VIEWS
+@require_POST
+def telemetry_beacon(request):
+    """
+    Batched player events, sent with navigator.sendBeacon or fetch(keepalive)
+    as an ``events`` JSON list (form field or JSON body). They are only
+    validated and queued here; a background thread writes them. Answers 429
+    with Retry-After when the buffer is full.
+    """
+    raw = request.body if request.content_type == 'application/json' else request.POST.get('events', '')
+    try:
+        payload = json.loads(raw or '[]')
+    except ValueError:
+        return HttpResponseBadRequest('events must be a JSON list')
+    if not isinstance(payload, list):
+        return HttpResponseBadRequest('events must be a JSON list')
+    if len(payload) > telemetry.max_batch():
+        return HttpResponseBadRequest(f'At most {telemetry.max_batch()} events per request')
+
+    events, invalid = telemetry.parse_events(payload, request.user.pk)
+    # Resume positions are coalesced separately and survive telemetry drops
+    listening.positions.record_events(events)
+    accepted = telemetry.buffer.offer(events, invalid)
+    dropped = len(events) - accepted
+    response = JsonResponse({'accepted': accepted, 'invalid': invalid, 'dropped': dropped}, status=429 if dropped else 202)
+    if dropped:
+        response['Retry-After'] = str(math.ceil(telemetry.buffer.flush_interval))
+    return response
+
+@staff_member_required
+def telemetry_stats(request):
+    """Ingestion and drop counters for the telemetry buffer in this worker process."""
+    return JsonResponse(telemetry.buffer.stats())
+
+# CATALOG API VIEWS
+def catalog_response(request, resource, fields, build):
+    """
+    JSON response for ``build()``, revalidated with an ETag (and Last-Modified
+    when the resource allows it). A 304 from the pre-query validators costs
+    no database queries.
+    """
+    last_modified = None
+    if resource.cacheable(fields):
+        etag, last_modified = resource.validators(request.get_full_path())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = build()
+    else:
+        response = build()
+        if response.status_code != 200:
+            return response
+        etag = '"%s"' % hashlib.md5(response.content).hexdigest()
+        response = get_conditional_response(request, etag=etag, response=response) or response
+    if response.status_code not in (200, 304):
+        return response
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Same for every user; clients and proxies may store it but must revalidate
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+@require_safe
+def catalog_list(request, resource):
+    """
+    One page of a catalog resource (songs, podcasts, episodes, creators):
+    ``{"results": [...], "next": url or null}``. Takes ``fields``, ``cursor``,
+    ``page_size`` and the resource's filters, e.g. ``?genre=Jazz``.
+    """
+    definition = catalog_api.RESOURCES.get(resource)
+    if definition is None:
+        raise Http404('Unknown catalog resource')
+    try:
+        fields = definition.parse_fields(request.GET.get('fields', ''))
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    def build():
+        try:
+            queryset = definition.filter(definition.queryset(), request.GET)
+        except ValueError:
+            return HttpResponseBadRequest(f'Malformed filter; {resource} can be filtered by: {", ".join(definition.filters)}')
+        rows, next_cursor = keyset_page(
+            definition.rows(fields, queryset), definition.time_field,
+            request.GET.get('cursor'), parse_page_size(request.GET.get('page_size')),
+        )
+        next_url = None
+        if next_cursor:
+            params = request.GET.copy()
+            params['cursor'] = next_cursor
+            next_url = request.path + '?' + params.urlencode()
+        body = catalog_api.dumps({'results': [definition.serialize(row, fields) for row in rows], 'next': next_url})
+        return HttpResponse(body, content_type='application/json')
+
+    return catalog_response(request, definition, fields, build)
+
+@require_safe
+def catalog_detail(request, resource, pk):
+    """A single catalog item, with the same ``fields`` parameter as the list."""
+    definition = catalog_api.RESOURCES.get(resource)
+    if definition is None:
+        raise Http404('Unknown catalog resource')
+    try:
+        fields = definition.parse_fields(request.GET.get('fields', ''))
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    def build():
+        row = definition.rows(fields).filter(pk=pk).first()
+        if row is None:
+            raise Http404(f'No such item in {resource}')
+        return HttpResponse(catalog_api.dumps(definition.serialize(row, fields)), content_type='application/json')
+
+    return catalog_response(request, definition, fields, build)
+
+# IMAGE VIEWS
+@require_safe
+def image_derivative(request, width, fmt):
+    """
+    Generate (once) and serve a resized cover/profile image.
+    Templates link here only until the derivative exists on disk; after that
+    they point straight at the content-hashed media file.
+    """
+    name = request.GET.get('src', '')
+    if width not in images.widths() or fmt not in images.FORMATS or not images.is_allowed_source(name):
+        raise Http404('Unknown image derivative')
+    try:
+        target = images.generate(name, width, fmt)
+    except images.source_errors():
+        raise Http404('Image not found')
+    response = FileResponse(default_storage.open(target, 'rb'))
+    patch_cache_control(response, public=True, max_age=86400)
+    return response
@@ -0,0 +1,190 @@
+# music/waveforms.py
+
+"""
+Precomputed waveform peaks for the media player.
+
+Audio is decoded to mono 16-bit PCM at a low sample rate (via ffmpeg, or the
+stdlib ``wave`` module for .wav files) and streamed through NumPy in blocks.
+Min/max peaks are computed for the finest zoom level as the blocks arrive.
+Coarser levels are then reduced from those peaks, so the PCM never has to
+fit in memory.
+
+Each level is stored as a raw file of interleaved ``min, max`` pairs (int8 by
+default, int16 if MUSIC_WAVEFORM_BITS = 16). The 512-bin overview is 1 KB.
+File names carry a version derived from the audio file's name, size and mtime,
+so a replaced upload never serves stale peaks.
+"""
+
+import hashlib
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import wave
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+WAVEFORM_DIR = 'waveforms'
+
+# Bins per track for each zoom level, coarsest first; each is 4x the previous
+LEVELS = (512, 2048, 8192)
+
+DECODE_RATE = 8000
+BLOCK_SAMPLES = DECODE_RATE * 30
+
+
+class WaveformError(Exception):
+    pass
+
+
+def bits():
+    return getattr(settings, 'MUSIC_WAVEFORM_BITS', 8)
+
+
+def audio_version(field_file):
+    stat = os.stat(field_file.path)
+    return hashlib.sha1(f'{field_file.name}:{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()[:12]
+
+
+def peaks_name(kind, pk, version, bins):
+    return f'{WAVEFORM_DIR}/{kind}/{pk}-{version}-{bins}.i{bits()}'
+
+
+def _pcm_blocks_wave(path):
+    import numpy as np
+
+    with wave.open(path, 'rb') as wav:
+        channels, width = wav.getnchannels(), wav.getsampwidth()
+        if width not in (1, 2, 4):
+            raise WaveformError(f'Unsupported WAV sample width: {width}')
+        dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+        # Read the same number of seconds per block as the ffmpeg path
+        frames_per_block = wav.getframerate() * (BLOCK_SAMPLES // DECODE_RATE)
+        while True:
+            raw = wav.readframes(frames_per_block)
+            if not raw:
+                break
+            samples = np.frombuffer(raw, dtype=dtype).astype(np.float32)
+            if width == 1:
+                samples -= 128.0
+            samples /= float(2 ** (8 * width - 1))
+            yield samples.reshape(-1, channels).mean(axis=1)
+
+
+def _pcm_blocks_ffmpeg(path):
+    import numpy as np
+
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise WaveformError('ffmpeg is required to decode this format')
+    process = subprocess.Popen(
+        [ffmpeg, '-v', 'error', '-i', path, '-ac', '1', '-ar', str(DECODE_RATE), '-f', 's16le', '-'],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            raw = process.stdout.read(BLOCK_SAMPLES * 2)
+            if not raw:
+                break
+            if len(raw) % 2:
+                raw = raw[:-1]
+            yield np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+    finally:
+        process.stdout.close()
+        if process.wait() != 0:
+            raise WaveformError('ffmpeg failed to decode the file')
+
+
+def pcm_blocks(path):
+    if path.lower().endswith('.wav'):
+        return _pcm_blocks_wave(path), None
+    return _pcm_blocks_ffmpeg(path), DECODE_RATE
+
+
+def compute_peaks(path, duration=None):
+    """
+    Return ``{bins: (mins, maxs)}`` for every zoom level in LEVELS, as float32
+    arrays in -1..1. ``duration`` (seconds) sizes the finest bins up front.
+    Without it, an oversized first pass is folded down afterwards.
+    """
+    import numpy as np
+
+    finest = LEVELS[-1]
+    blocks, rate = pcm_blocks(path)
+    if duration and rate:
+        samples_per_bin = max(1, math.ceil(duration * rate / finest))
+    else:
+        # Unknown length: use small bins, they are folded to size below
+        samples_per_bin = 64
+
+    mins, maxs = [], []
+    carry = np.empty(0, dtype=np.float32)
+    for block in blocks:
+        block = np.concatenate((carry, block)) if carry.size else block
+        usable = block.size - block.size % samples_per_bin
+        if usable:
+            frames = block[:usable].reshape(-1, samples_per_bin)
+            mins.append(frames.min(axis=1))
+            maxs.append(frames.max(axis=1))
+        carry = block[usable:]
+    if carry.size:
+        mins.append(np.array([carry.min()], dtype=np.float32))
+        maxs.append(np.array([carry.max()], dtype=np.float32))
+    if not mins:
+        raise WaveformError('No audio decoded')
+
+    mins, maxs = np.concatenate(mins), np.concatenate(maxs)
+    levels = {}
+    for bins in reversed(LEVELS):
+        levels[bins] = _fold(mins, maxs, bins)
+        mins, maxs = levels[bins]
+    return levels
+
+
+def _fold(mins, maxs, bins):
+    """Reduce min/max arrays to at most ``bins`` entries by grouping neighbours."""
+    import numpy as np
+
+    if mins.size <= bins:
+        return mins, maxs
+    edges = np.linspace(0, mins.size, bins + 1).astype(np.int64)[:-1]
+    return np.minimum.reduceat(mins, edges), np.maximum.reduceat(maxs, edges)
+
+
+def encode_peaks(mins, maxs):
+    """Interleave min/max pairs and quantise to the configured integer width."""
+    import numpy as np
+
+    scale = 2 ** (bits() - 1) - 1
+    dtype = np.int8 if bits() == 8 else np.dtype('<i2')
+    pairs = np.empty(mins.size * 2, dtype=np.float32)
+    pairs[0::2], pairs[1::2] = mins, maxs
+    return np.clip(np.round(pairs * scale), -scale, scale).astype(dtype).tobytes()
+
+
+def build(kind, obj):
+    """Compute and store all zoom levels for a Song/Episode. Returns the version string."""
+    version = audio_version(obj.audio_file)
+    levels = compute_peaks(obj.audio_file.path, getattr(obj, 'duration', None))
+    for bins, (mins, maxs) in levels.items():
+        target = default_storage.path(peaks_name(kind, obj.pk, version, bins))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(encode_peaks(mins, maxs))
+        os.replace(tmp_path, target)
+    return version
+
+
+def existing_version(kind, obj):
+    """The current version string if peaks exist for the stored audio, else None."""
+    try:
+        version = audio_version(obj.audio_file)
+    except (OSError, ValueError):
+        return None
+    if os.path.exists(default_storage.path(peaks_name(kind, obj.pk, version, LEVELS[0]))):
+        return version
+    return None
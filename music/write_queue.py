@@ -0,0 +1,109 @@
+# music/write_queue.py
+
+"""
+A single writer thread for the background write paths.
+
+SQLite allows one writer at a time. When the play counter, telemetry and
+resume-position flushers each wrote from their own thread, they competed for
+that lock with each other and with requests. Instead they hand their flush to
+``writer``. It runs the queued jobs one after another on a single thread.
+
+The writer opens no transaction around a job: each job runs in autocommit
+mode and opens its own ``transaction.atomic()``. The flushers take rows out of
+their in-memory buffers and put them back when that block raises, so its
+COMMIT must be the outermost one; inside an enclosing transaction a failed
+COMMIT would happen after the rows were already gone.
+
+The flushers' public ``flush()`` goes through ``writer`` too, so the writer
+thread is the only one that takes a flusher's lock and then the database
+write lock, and ``flush()`` returns only once earlier queued flushes have
+committed.
+
+``call`` blocks until the job has returned. Called from the writer thread
+itself, or after shutdown, it runs the job inline.
+"""
+
+import atexit
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.db import close_old_connections, connection
+
+
+class WriteQueue:
+    def __init__(self):
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+        self.completed = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue ``fn(*args, **kwargs)``; returns a Future resolved after commit."""
+        future = Future()
+        with self._lock:
+            inline = self._stopped or threading.current_thread() is self._thread
+            if not inline:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                    self._thread.start()
+                    atexit.register(self.shutdown)
+                self._jobs.put((future, fn, args, kwargs))
+        if inline:
+            self._run_inline(future, fn, args, kwargs)
+        return future
+
+    def call(self, fn, *args, **kwargs):
+        """Run ``fn`` on the writer thread and return its result (or raise its exception)."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _run_inline(self, future, fn, args, kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as exc:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                self._jobs.task_done()
+                return
+            future, fn, args, kwargs = job
+            try:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    # No enclosing transaction: the job's own atomic() commits
+                    # before the future resolves (see the module docstring)
+                    result = fn(*args, **kwargs)
+                except Exception as exc:
+                    future.set_exception(exc)
+                    connection.close()
+                else:
+                    self.completed += 1
+                    future.set_result(result)
+            finally:
+                # Keeps a persistent connection (CONN_MAX_AGE) but drops a broken one
+                close_old_connections()
+                self._jobs.task_done()
+
+    def join(self):
+        """Block until every queued job has run."""
+        self._jobs.join()
+
+    def shutdown(self):
+        """Run the queued jobs and stop the writer; later calls run inline."""
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+            if thread is not None:
+                self._jobs.put(None)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+
+writer = WriteQueue()
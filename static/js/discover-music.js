@@ -24,45 +24,79 @@ document.addEventListener('DOMContentLoaded', function() {
     if (moodFilter) moodFilter.addEventListener('change', updateFilters);
     if (sortFilter) sortFilter.addEventListener('change', updateFilters);
 
-    // Initialize Play Buttons
-    const playButtons = document.querySelectorAll('.btn-play-pause');
-    
-    playButtons.forEach(btn => {
-        btn.addEventListener('click', function(e) {
-            e.preventDefault();
-            e.stopPropagation();
+    // Initialize Play Buttons (delegated so cards appended by infinite scroll work too)
+    document.addEventListener('click', function(e) {
+        const btn = e.target.closest('.btn-play-pause');
+        if (!btn) return;
 
-            const songId = this.dataset.songId;
-            const mediaType = this.dataset.mediaType || 'song';
+        e.preventDefault();
+        e.stopPropagation();
 
-            if (!window.mediaPlayer) {
-                console.error('MediaPlayer not initialized');
-                return;
-            }
+        const songId = btn.dataset.songId;
+        const mediaType = btn.dataset.mediaType || 'song';
+
+        if (!window.mediaPlayer) {
+            console.error('MediaPlayer not initialized');
+            return;
+        }
 
-            // If currently playing this song, toggle pause
-            if (window.mediaPlayer.currentMediaId == songId && window.mediaPlayer.isPlaying) {
-                window.mediaPlayer.pause();
-                updatePlayButtonState(this, false);
-            } else if (window.mediaPlayer.currentMediaId == songId && !window.mediaPlayer.isPlaying) {
-                window.mediaPlayer.play();
-                updatePlayButtonState(this, true);
+        // If currently playing this song, toggle pause
+        if (window.mediaPlayer.currentMediaId == songId && window.mediaPlayer.isPlaying) {
+            window.mediaPlayer.pause();
+            updatePlayButtonState(btn, false);
+        } else if (window.mediaPlayer.currentMediaId == songId && !window.mediaPlayer.isPlaying) {
+            window.mediaPlayer.play();
+            updatePlayButtonState(btn, true);
+        } else {
+            // Play new song
+            if (mediaType === 'song') {
+                window.mediaPlayer.playSong(songId);
             } else {
-                // Play new song
-                if (mediaType === 'song') {
-                    window.mediaPlayer.playSong(songId);
-                } else {
-                    // Assuming podcast support might be similar
-                    console.log('Playing podcast episode not yet fully supported in discover script');
-                }
-                
-                // Reset all other buttons
-                playButtons.forEach(b => updatePlayButtonState(b, false));
-                updatePlayButtonState(this, true);
+                // Assuming podcast support might be similar
+                console.log('Playing podcast episode not yet fully supported in discover script');
             }
-        });
+
+            // Reset all other buttons
+            document.querySelectorAll('.btn-play-pause').forEach(b => updatePlayButtonState(b, false));
+            updatePlayButtonState(btn, true);
+        }
     });
 
+    // Infinite scroll: fetch the next keyset page when a feed's sentinel comes into view
+    async function loadNextPage(feed) {
+        const cursor = feed.dataset.nextCursor;
+        if (!cursor || feed.dataset.loading === 'true') return;
+
+        feed.dataset.loading = 'true';
+        try {
+            const params = new URLSearchParams({ kind: feed.dataset.feedKind, cursor: cursor });
+            const response = await fetch(`${feed.dataset.feedUrl}?${params.toString()}`, {
+                headers: { 'Accept': 'application/json' }
+            });
+            if (!response.ok) throw new Error(`Feed request failed (${response.status})`);
+
+            const data = await response.json();
+            feed.insertAdjacentHTML('beforeend', data.html);
+            feed.dataset.nextCursor = data.next_cursor || '';
+        } catch (error) {
+            console.error('Error loading more items:', error);
+        } finally {
+            feed.dataset.loading = 'false';
+        }
+    }
+
+    if ('IntersectionObserver' in window) {
+        const observer = new IntersectionObserver(entries => {
+            entries.forEach(entry => {
+                if (!entry.isIntersecting) return;
+                const feed = document.getElementById(entry.target.dataset.feedTarget);
+                if (feed) loadNextPage(feed);
+            });
+        }, { rootMargin: '400px 0px' });
+
+        document.querySelectorAll('.feed-sentinel').forEach(sentinel => observer.observe(sentinel));
+    }
+
     // Listen for global media events to update UI state
     window.addEventListener('media:play', (e) => {
         const btn = document.querySelector(`.btn-play-pause[data-song-id="${e.detail.mediaId}"]`);
@@ -21,6 +21,8 @@ class MediaPlayer {
         this.currentQueueIndex = 0;
         this.lyrics = null;
         this.visualizer = null;
+        this.telemetry = [];
+        this.telemetryDelay = 10000;
         
         // Initialize when DOM is ready
         if (document.readyState === 'loading') {
@@ -55,6 +57,9 @@ class MediaPlayer {
         // Initialize queue
         this.initQueue();
         
+        // Start batching player telemetry
+        this.initTelemetry();
+        
         console.log('✅ Media Player initialized successfully');
     }
 
@@ -213,172 +218,54 @@ class MediaPlayer {
         }
     }
 
+    // Pause/resume/stop are local; the interaction is reported through the telemetry batch
     async pauseSong() {
-        try {
-            const response = await fetch('/users/music/song/pause/', {
-                method: 'POST',
-                headers: {
-                    'X-CSRFToken': this.getCSRFToken(),
-                    'Content-Type': 'application/json'
-                }
-            });
-            
-            const data = await response.json();
-            
-            if (data.success) {
-                await this.pause();
-                this.updateUI();
-            } else {
-                throw new Error(data.message || 'Failed to pause song');
-            }
-            
-            return data;
-        } catch (error) {
-            console.error('Error pausing song:', error);
-            this.showNotification(error.message, 'error');
-            return { success: false, message: error.message };
-        }
+        await this.pause();
+        return { success: true };
     }
 
     async resumeSong() {
-        try {
-            const response = await fetch('/users/music/song/resume/', {
-                method: 'POST',
-                headers: {
-                    'X-CSRFToken': this.getCSRFToken(),
-                    'Content-Type': 'application/json'
-                }
-            });
-            
-            const data = await response.json();
-            
-            if (data.success) {
-                await this.play();
-                this.updateUI();
-            } else {
-                throw new Error(data.message || 'Failed to resume song');
-            }
-            
-            return data;
-        } catch (error) {
-            console.error('Error resuming song:', error);
-            this.showNotification(error.message, 'error');
-            return { success: false, message: error.message };
-        }
+        await this.play();
+        return { success: true };
     }
 
     async stopSong() {
-        try {
-            const response = await fetch('/users/music/song/stop/', {
-                method: 'POST',
-                headers: {
-                    'X-CSRFToken': this.getCSRFToken(),
-                    'Content-Type': 'application/json'
-                }
-            });
-            
-            const data = await response.json();
-            
-            if (data.success) {
-                await this.stop();
-                this.updateUI();
-            } else {
-                throw new Error(data.message || 'Failed to stop song');
-            }
-            
-            return data;
-        } catch (error) {
-            console.error('Error stopping song:', error);
-            this.showNotification(error.message, 'error');
-            return { success: false, message: error.message };
-        }
+        await this.stop();
+        return { success: true };
     }
 
     async forwardSong(seconds = 10) {
-        try {
-            const response = await fetch(`/users/music/song/forward/`, {
-                method: 'POST',
-                headers: {
-                    'X-CSRFToken': this.getCSRFToken(),
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ seconds })
-            });
-            
-            const data = await response.json();
-            
-            if (data.success) {
-                this.currentTime = data.current_time;
-                this.audioElement.currentTime = this.currentTime;
-                this.updateProgress();
-            } else {
-                throw new Error(data.message || 'Failed to forward song');
-            }
-            
-            return data;
-        } catch (error) {
-            console.error('Error forwarding song:', error);
-            this.showNotification(error.message, 'error');
-            return { success: false, message: error.message };
-        }
+        // Seeking is local: the audio element fetches just the byte range it
+        // needs from the stream endpoint (HTTP 206), no server round trip here.
+        return this.seekBy(seconds);
     }
 
     async rewindSong(seconds = 10) {
+        return this.seekBy(-seconds);
+    }
+
+    seekBy(seconds) {
         try {
-            const response = await fetch(`/users/music/song/rewind/`, {
-                method: 'POST',
-                headers: {
-                    'X-CSRFToken': this.getCSRFToken(),
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ seconds })
-            });
-            
-            const data = await response.json();
-            
-            if (data.success) {
-                this.currentTime = data.current_time;
-                this.audioElement.currentTime = this.currentTime;
-                this.updateProgress();
-            } else {
-                throw new Error(data.message || 'Failed to rewind song');
+            if (!this.audioElement || !this.audioElement.src) {
+                return { success: false, message: 'Nothing is playing' };
             }
-            
-            return data;
+            const duration = isNaN(this.audioElement.duration) ? this.duration : this.audioElement.duration;
+            const target = Math.max(0, Math.min(duration || 0, this.audioElement.currentTime + seconds));
+            this.audioElement.currentTime = target;
+            this.currentTime = target;
+            this.updateProgress();
+            this.track('seek', target);
+            return { success: true, current_time: target };
         } catch (error) {
-            console.error('Error rewinding song:', error);
+            console.error('Error seeking:', error);
             this.showNotification(error.message, 'error');
             return { success: false, message: error.message };
         }
     }
 
     async changeSongSpeed(speed) {
-        try {
-            const response = await fetch('/users/music/song/speed/', {
-                method: 'POST',
-                headers: {
-                    'X-CSRFToken': this.getCSRFToken(),
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ speed })
-            });
-            
-            const data = await response.json();
-            
-            if (data.success) {
-                this.currentSpeed = speed;
-                this.audioElement.playbackRate = speed;
-                this.updateSpeedUI();
-            } else {
-                throw new Error(data.message || 'Failed to change song speed');
-            }
-            
-            return data;
-        } catch (error) {
-            console.error('Error changing song speed:', error);
-            this.showNotification(error.message, 'error');
-            return { success: false, message: error.message };
-        }
+        await this.setPlaybackSpeed(speed);
+        return { success: true, speed: this.currentSpeed };
     }
 
     // Podcast Controls (similar to song controls)
@@ -435,6 +322,9 @@ class MediaPlayer {
             this.audioElement.playbackRate = this.currentSpeed;
             this.audioElement.volume = this.volume;
             
+            // Waveform overview (a ~1 KB binary of min/max peaks)
+            this.loadWaveform(media.waveform_url);
+            
             // Load lyrics if available
             if (media.lyrics) {
                 this.lyrics = media.lyrics;
@@ -457,6 +347,49 @@ class MediaPlayer {
         }
     }
 
+    async loadWaveform(url) {
+        const progressBar = document.getElementById('media-progress-bar');
+        const canvas = document.getElementById('media-waveform');
+        if (!progressBar || !canvas) return;
+
+        progressBar.classList.remove('has-waveform');
+        if (!url) return;
+
+        try {
+            const response = await fetch(url);
+            if (!response.ok) return;
+            const bits = parseInt(response.headers.get('X-Waveform-Bits') || '8', 10);
+            const buffer = await response.arrayBuffer();
+            const peaks = bits === 16 ? new Int16Array(buffer) : new Int8Array(buffer);
+            progressBar.classList.add('has-waveform');
+            this.drawWaveform(canvas, peaks, bits === 16 ? 32767 : 127);
+        } catch (error) {
+            console.error('Error loading waveform:', error);
+        }
+    }
+
+    drawWaveform(canvas, peaks, scale) {
+        const ratio = window.devicePixelRatio || 1;
+        const width = canvas.clientWidth * ratio;
+        const height = canvas.clientHeight * ratio;
+        canvas.width = width;
+        canvas.height = height;
+
+        const ctx = canvas.getContext('2d');
+        const bins = peaks.length / 2;
+        const mid = height / 2;
+        ctx.clearRect(0, 0, width, height);
+        ctx.fillStyle = 'rgba(255, 255, 255, 0.55)';
+
+        // Peaks are interleaved [min0, max0, min1, max1, ...]
+        for (let x = 0; x < width; x++) {
+            const bin = Math.floor(x * bins / width) * 2;
+            const top = mid - (peaks[bin + 1] / scale) * mid;
+            const bottom = mid - (peaks[bin] / scale) * mid;
+            ctx.fillRect(x, top, 1, Math.max(1, bottom - top));
+        }
+    }
+
     async play() {
         try {
             await this.audioElement.play();
@@ -473,6 +406,7 @@ class MediaPlayer {
             }
             
             this.dispatchMediaEvent('play');
+            this.track('play');
             
         } catch (error) {
             console.error('Error playing media:', error);
@@ -493,6 +427,7 @@ class MediaPlayer {
             }
             
             this.dispatchMediaEvent('pause');
+            this.track('pause');
             
         } catch (error) {
             console.error('Error pausing media:', error);
@@ -515,6 +450,7 @@ class MediaPlayer {
             }
             
             this.dispatchMediaEvent('stop');
+            this.track('stop');
             
         } catch (error) {
             console.error('Error stopping media:', error);
@@ -532,9 +468,7 @@ class MediaPlayer {
             this.audioElement.currentTime = seekTime;
             this.currentTime = seekTime;
             this.updateProgress();
-            
-            // Sync with server
-            await this.syncProgressWithServer();
+            this.track('seek', seekTime);
             
         } catch (error) {
             console.error('Error seeking:', error);
@@ -587,6 +521,8 @@ class MediaPlayer {
                     await this.playFromQueue(nextIndex);
                 } else if (this.isRepeat) {
                     await this.playFromQueue(0);
+                } else if (this.currentMediaType === 'song' && await this.extendQueueWithUpNext()) {
+                    await this.playFromQueue(nextIndex);
                 }
             }
         } catch (error) {
@@ -594,6 +530,18 @@ class MediaPlayer {
         }
     }
 
+    // Append recommended songs when the queue runs out; returns true if any were added
+    async extendQueueWithUpNext() {
+        const exclude = this.queue.map(item => item.id).slice(-200).join(',');
+        const params = new URLSearchParams({ limit: 10, exclude });
+        const response = await fetch(`/song/${this.currentMediaId}/up-next/?${params.toString()}`);
+        if (!response.ok) return false;
+        const data = await response.json();
+        const before = this.queue.length;
+        data.songs.forEach(song => this.updateQueue(song));
+        return this.queue.length > before;
+    }
+
     async playPrevious() {
         try {
             const prevIndex = this.currentQueueIndex - 1;
@@ -752,6 +700,7 @@ class MediaPlayer {
     onMediaEnded() {
         this.isPlaying = false;
         this.updateUI();
+        this.track('ended');
         
         // Auto-play next media
         this.playNext();
@@ -879,25 +828,63 @@ class MediaPlayer {
         }
     }
 
-    // Server Sync
-    async syncProgressWithServer() {
+    // Telemetry: interactions are queued and sent in batches to one beacon endpoint
+    syncProgressWithServer() {
+        this.track('progress');
+    }
+
+    initTelemetry() {
+        const scheduleFlush = () => {
+            this.telemetryTimer = setTimeout(async () => {
+                await this.flushTelemetry();
+                scheduleFlush();
+            }, this.telemetryDelay);
+        };
+        scheduleFlush();
+        // The page may be going away: hand what is left to the browser
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'hidden') this.flushTelemetry(true);
+        });
+        window.addEventListener('pagehide', () => this.flushTelemetry(true));
+    }
+
+    track(action, value = null) {
+        if (!this.currentMediaId) return;
+        this.telemetry.push({
+            action,
+            kind: this.currentMediaType === 'podcast' ? 'episode' : 'song',
+            id: Number(this.currentMediaId),
+            position: this.audioElement ? this.audioElement.currentTime || 0 : 0,
+            value,
+            ts: Date.now()
+        });
+        // Keep memory bounded if the server keeps refusing events
+        if (this.telemetry.length > 500) {
+            this.telemetry.splice(0, this.telemetry.length - 500);
+        }
+    }
+
+    async flushTelemetry(useBeacon = false) {
+        if (!this.telemetry.length) return;
+        const batch = this.telemetry.splice(0, 100);
+        const form = new FormData();
+        form.append('csrfmiddlewaretoken', this.getCSRFToken());
+        form.append('events', JSON.stringify(batch));
+        if (useBeacon && navigator.sendBeacon) {
+            navigator.sendBeacon('/telemetry/', form);
+            return;
+        }
         try {
-            const endpoint = this.currentMediaType === 'song' ? 
-                '/users/music/song/sync/' : '/users/podcast/episode/sync/';
-            
-            await fetch(endpoint, {
-                method: 'POST',
-                headers: {
-                    'X-CSRFToken': this.getCSRFToken(),
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({
-                    current_time: this.currentTime,
-                    playback_speed: this.currentSpeed
-                })
-            });
+            const response = await fetch('/telemetry/', { method: 'POST', body: form, keepalive: true });
+            if (response.status === 429) {
+                // Back off while the server's buffer drains; the dropped events are not resent
+                const retryAfter = Number(response.headers.get('Retry-After')) || 10;
+                this.telemetryDelay = Math.min(Math.max(this.telemetryDelay * 2, retryAfter * 1000), 60000);
+            } else {
+                this.telemetryDelay = 10000;
+            }
         } catch (error) {
-            console.error('Error syncing progress:', error);
+            console.error('Error sending telemetry:', error);
         }
     }
 
@@ -1092,13 +1079,7 @@ class MediaPlayer {
             this.audioElement.playbackRate = this.currentSpeed;
             this.updateSpeedUI();
             this.saveSettings();
-            
-            // Sync with server
-            if (this.currentMediaType === 'song') {
-                await this.changeSongSpeed(this.currentSpeed);
-            } else {
-                await this.changePodcastSpeed(this.currentSpeed);
-            }
+            this.track('speed', this.currentSpeed);
         } catch (error) {
             console.error('Error setting playback speed:', error);
         }
@@ -1234,45 +1215,14 @@ class MediaPlayer {
         });
     }
 
-    // Public API
-    async play() {
-        if (this.currentMediaType === 'song') {
-            return await this.resumeSong();
-        } else if (this.currentMediaType === 'podcast') {
-            return await this.resumePodcast();
-        }
-    }
-
-    async pause() {
-        if (this.currentMediaType === 'song') {
-            return await this.pauseSong();
-        } else if (this.currentMediaType === 'podcast') {
-            return await this.pausePodcast();
-        }
-    }
-
-    async stop() {
-        if (this.currentMediaType === 'song') {
-            return await this.stopSong();
-        } else if (this.currentMediaType === 'podcast') {
-            return await this.stopPodcast();
-        }
-    }
-
+    // Public API (play/pause/stop are the methods defined above)
     async forward(seconds = 10) {
-        if (this.currentMediaType === 'song') {
-            return await this.forwardSong(seconds);
-        } else if (this.currentMediaType === 'podcast') {
-            return await this.forwardPodcast(seconds);
-        }
+        // Same local range-request seek for songs and episodes
+        return this.seekBy(seconds);
     }
 
     async rewind(seconds = 10) {
-        if (this.currentMediaType === 'song') {
-            return await this.rewindSong(seconds);
-        } else if (this.currentMediaType === 'podcast') {
-            return await this.rewindPodcast(seconds);
-        }
+        return this.seekBy(-seconds);
     }
 
     // Destroy method
@@ -1284,6 +1234,8 @@ class MediaPlayer {
         
         // Stop intervals
         this.stopProgressUpdate();
+        clearTimeout(this.telemetryTimer);
+        this.flushTelemetry(true);
         
         // Clean up visualizer
         if (this.visualizer) {